@@ -1,35 +1,226 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import (Blueprint, Flask, Response, current_app, g, has_app_context, has_request_context, render_template,
+                   request, jsonify, send_from_directory, session, stream_with_context, url_for)
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import date, datetime, timedelta, timezone
 import os
 import json
-from functools import wraps
-import random
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+from functools import partial, wraps
+import base64
+import csv
+import gzip
+import hashlib
+import hmac
+import heapq
+import itertools
+import io
+import mimetypes
+import sqlite3
+import threading
+import time
 
-# Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-change-this'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///smart_energy_vehicle.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+import click
 
-# Initialize extensions
-db = SQLAlchemy(app)
+import numpy as np
+
+from archive import ColumnarArchive, concat_columns, encode_columns, take_columns
+from assets import build_assets, load_manifest
+from cache import TableGenerations, create_cache
+from config import Config, engine_options
+from credentials import HasherBusy, PasswordHasher, RateLimiter
+from geo import GeohashIndex, GeoPoints, bounding_box, haversine_km
+from instrumentation import COUNT_BUCKETS, MetricsRegistry, StackSampler, write_folded
+from notifications import OutboxDispatcher, create_transport
+from overpass import OverpassClient, SingleFlight, build_query, element_to_station, tile_bbox, tiles_for_radius
+from routing import ROUTE_TYPES, RoadGraph, RouteNotFound, plan_route, synthetic_city
+from scheduler import JobScheduler
+from serialization import FastJSONProvider, compress, dumps, negotiate_encoding
+from telemetry import Broker, TelemetryBuffer
+
+try:
+    from flask_sock import Sock
+except ImportError:  # pragma: no cover - WebSocket ingestion is optional
+    Sock = None
+
+# Routes, request hooks and CLI commands live on a blueprint; create_app() builds an app around it
+bp = Blueprint('smart', __name__, cli_group=None)
+
+# Extensions are bound to each app in create_app()
+db = SQLAlchemy()
 login_manager = LoginManager()
-login_manager.init_app(app)
-CORS(app)
+sock = Sock() if Sock is not None else None
 
-# ===== CORS & STATIC FILES CONFIGURATION =====
+# ===== INSTRUMENTATION =====
 
-CORS(app, resources={
-    r"/api/*": {
-        "origins": "*",
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+request_profiler = None  # StackSampler, when create_app() enables PROFILE_SLOW_MS
+
+metrics = MetricsRegistry()
+request_latency = metrics.histogram(
+    'smart_request_duration_seconds', 'Time to build each response, by endpoint', ('endpoint', 'method'))
+request_total = metrics.counter(
+    'smart_requests_total', 'Responses by endpoint and status', ('endpoint', 'method', 'status'))
+request_queries = metrics.histogram(
+    'smart_request_sql_queries', 'SQL statements executed per request', ('endpoint',), COUNT_BUCKETS)
+request_sql_seconds = metrics.counter(
+    'smart_request_sql_seconds_total', 'Time spent in SQL while handling requests', ('endpoint',))
+request_serialize_seconds = metrics.counter(
+    'smart_request_serialize_seconds_total', 'Time spent encoding JSON responses', ('endpoint',))
+sql_latency = metrics.histogram(
+    'smart_sql_query_duration_seconds', 'Duration of every SQL statement, including background jobs')
+cache_lookups = metrics.counter(
+    'smart_response_cache_lookups_total', 'Cached endpoint lookups by result', ('endpoint', 'result'))
+
+def cache_stat(name):
+    return lambda: {(): response_cache.stats().get(name, 0)} if response_cache else {}
+
+metrics.gauge('smart_cache_hits_total', 'Response cache hits', callback=cache_stat('hits'), kind='counter')
+metrics.gauge('smart_cache_misses_total', 'Response cache misses', callback=cache_stat('misses'), kind='counter')
+metrics.gauge('smart_cache_evictions_total', 'Response cache evictions', callback=cache_stat('evictions'),
+              kind='counter')
+metrics.gauge('smart_cache_entries', 'Entries held by the in-process response cache', callback=cache_stat('entries'))
+
+class RequestStats:
+    """Timings gathered while one request is handled"""
+    __slots__ = ('started', 'queries', 'sql_seconds', 'serialize_seconds')
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    sql_latency.observe(elapsed)
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+
+def record_serialization(elapsed):
+    """FastJSONProvider timer: charge JSON encoding to the current request"""
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is not None:
+        stats.serialize_seconds += elapsed
+
+@bp.before_app_request
+def start_request_stats():
+    g.request_stats = RequestStats()
+    if request_profiler is not None:
+        request_profiler.start()
+
+@bp.after_app_request
+def record_request_stats(response):
+    """Record latency, SQL and serialization time; runs after compression so it is included"""
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats.started
+    endpoint = request.endpoint or 'unmatched'
+    request_latency.observe(elapsed, endpoint, request.method)
+    request_total.inc(endpoint, request.method, str(response.status_code))
+    request_queries.observe(stats.queries, endpoint)
+    request_sql_seconds.inc(endpoint, amount=stats.sql_seconds)
+    request_serialize_seconds.inc(endpoint, amount=stats.serialize_seconds)
+    
+    if response.status_code >= 500 and response.status_code != 503 and not response.is_streamed:
+        # Route handlers turn exceptions into {'error': ...}; keep them visible in the log.
+        # 503s are deliberate load shedding and would flood it during a storm.
+        current_app.logger.error('%s %s -> %s: %s', request.method, request.path, response.status_code,
+                                 response.get_data(as_text=True)[:500])
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries", '
+            f'json;dur={stats.serialize_seconds * 1000:.1f}, app;dur={elapsed * 1000:.1f}')
+    if request_profiler is not None:
+        save_slow_profile(request_profiler.stop(), endpoint, elapsed)
+    return response
+
+def save_slow_profile(counts, endpoint, elapsed):
+    """Write a folded-stack profile when a request exceeded PROFILE_SLOW_MS"""
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms < current_app.config['PROFILE_SLOW_MS'] or not counts:
+        return
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint.replace('.', '_')}-{elapsed_ms:.0f}ms.folded"
+    path = os.path.join(current_app.config['PROFILE_DIR'], name)
+    write_folded(path, counts)
+    current_app.logger.warning('Slow request %s %s took %.0f ms; profile written to %s',
+                               request.method, request.path, elapsed_ms, path)
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus exposition of this process's request, SQL and cache metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# ===== RESPONSE CACHE =====
+
+response_cache = None  # configured by create_app()
+
+STATIONS_CACHE_NAMESPACE = 'stations'
+
+def user_cache_namespace(user_id=None):
+    """Cache namespace for responses derived from one user's vehicles and logs"""
+    return f'user:{current_user.id if user_id is None else user_id}'
+
+def vehicle_cache_namespace(vehicle_id):
+    """Cache namespace for values derived from one vehicle's state and history"""
+    return f'vehicle:{vehicle_id}'
+
+def invalidate_cache(*namespaces):
+    """Drop every cached response in the namespaces, in every worker, once a write has committed"""
+    if namespaces:
+        response_cache.invalidate(*namespaces)
+
+def cached_response(namespace):
+    """Cache successful GET responses of a JSON view, answering If-None-Match with 304.
+
+    namespace is a callable returning the invalidation namespace for the
+    current request; the key also covers the endpoint and query arguments.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            
+            ns = namespace()
+            query = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+            key = f'{ns}:{response_cache.generation(ns)}:{request.endpoint}:{sorted(kwargs.items())}:{query}'
+            
+            cached = response_cache.get(key)
+            cache_lookups.inc(request.endpoint, 'miss' if cached is None else 'hit')
+            if cached is not None:
+                etag, body = cached.split(b'\n', 1)
+                etag = etag.decode()
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                response_cache.set(key, etag.encode() + b'\n' + body)
+            
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
 
 # ===== DATABASE MODELS =====
 
@@ -46,11 +237,12 @@ class User(UserMixin, db.Model):
     vehicles = db.relationship('Vehicle', backref='owner', lazy=True, cascade='all, delete-orphan')
     energy_logs = db.relationship('EnergyLog', backref='user', lazy=True, cascade='all, delete-orphan')
     emergency_contacts = db.relationship('EmergencyContact', backref='user', lazy=True, cascade='all, delete-orphan')
+    dashboard_metrics = db.relationship('DashboardMetric', lazy=True, cascade='all, delete-orphan')
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)[0]
     
     def to_dict(self):
         return {
@@ -64,6 +256,8 @@ class User(UserMixin, db.Model):
 
 class Vehicle(db.Model):
     """Vehicle model for storing vehicle information"""
+    api_fields = ('id', 'vehicle_name', 'vehicle_type', 'make', 'model', 'year', 'fuel_capacity',
+                  'battery_capacity', 'current_fuel', 'current_battery', 'mileage', 'created_at', 'version')
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     vehicle_name = db.Column(db.String(120), nullable=False)
@@ -77,8 +271,12 @@ class Vehicle(db.Model):
     current_battery = db.Column(db.Float, default=0)
     mileage = db.Column(db.Float, default=0)  # in km
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # bumped by every update
     
     energy_logs = db.relationship('EnergyLog', backref='vehicle', lazy=True, cascade='all, delete-orphan')
+    energy_rollups = db.relationship('EnergyRollup', lazy=True, cascade='all, delete-orphan')
+    efficiency_model = db.relationship('VehicleEfficiencyModel', uselist=False, lazy=True,
+                                       cascade='all, delete-orphan')
     routes = db.relationship('Route', backref='vehicle', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
@@ -94,11 +292,18 @@ class Vehicle(db.Model):
             'current_fuel': self.current_fuel,
             'current_battery': self.current_battery,
             'mileage': self.mileage,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'version': self.version
         }
 
 class EnergyLog(db.Model):
     """Energy consumption tracking"""
+    api_fields = ('id', 'energy_consumed', 'distance_traveled', 'cost', 'efficiency', 'co2_emissions',
+                  'date', 'notes')
+    __table_args__ = (
+        db.Index('ix_energy_log_user_vehicle_date', 'user_id', 'vehicle_id', 'date'),
+        db.Index('ix_energy_log_user_date', 'user_id', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
@@ -122,8 +327,137 @@ class EnergyLog(db.Model):
             'notes': self.notes
         }
 
+class EnergyRollup(db.Model):
+    """Per-vehicle energy totals materialized by day and month"""
+    __table_args__ = (
+        db.UniqueConstraint('period', 'user_id', 'vehicle_id', 'period_start', name='uq_energy_rollup_bucket'),
+        db.Index('ix_energy_rollup_user_period', 'user_id', 'period', 'period_start'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # day, month
+    period_start = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
+    total_energy = db.Column(db.Float, nullable=False, default=0)
+    total_distance = db.Column(db.Float, nullable=False, default=0)
+    total_cost = db.Column(db.Float, nullable=False, default=0)
+    total_co2 = db.Column(db.Float, nullable=False, default=0)
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+
+class VehicleEfficiencyModel(db.Model):
+    """Running efficiency statistics per vehicle, updated as energy logs arrive.
+
+    Holds an exponentially weighted mean/variance of km per unit of energy
+    and of price per unit, plus running distance and energy totals, so range
+    and forecast lookups are O(1).
+    """
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), primary_key=True)
+    observations = db.Column(db.Integer, nullable=False, default=0)
+    efficiency_mean = db.Column(db.Float)
+    efficiency_var = db.Column(db.Float, nullable=False, default=0)
+    price_mean = db.Column(db.Float)
+    sum_distance = db.Column(db.Float, nullable=False, default=0)
+    sum_energy = db.Column(db.Float, nullable=False, default=0)
+    first_log_at = db.Column(db.DateTime)
+    last_log_at = db.Column(db.DateTime)
+    
+    def observe(self, distance, energy, cost, logged_at, alpha):
+        """Fold one trip into the running statistics"""
+        distance = distance or 0
+        energy = energy or 0
+        self.observations = (self.observations or 0) + 1
+        self.sum_distance = (self.sum_distance or 0) + distance
+        self.sum_energy = (self.sum_energy or 0) + energy
+        self.first_log_at = min(self.first_log_at or logged_at, logged_at)
+        self.last_log_at = max(self.last_log_at or logged_at, logged_at)
+        if energy <= 0:
+            return
+        
+        efficiency = distance / energy
+        if self.efficiency_mean is None:
+            self.efficiency_mean = efficiency
+            self.efficiency_var = 0.0
+        else:
+            diff = efficiency - self.efficiency_mean
+            increment = alpha * diff
+            self.efficiency_mean += increment
+            self.efficiency_var = (1 - alpha) * ((self.efficiency_var or 0) + diff * increment)
+        
+        price = (cost or 0) / energy
+        self.price_mean = price if self.price_mean is None else self.price_mean + alpha * (price - self.price_mean)
+    
+    def predicted_efficiency(self, min_observations=5):
+        """Average km per unit of energy over every logged trip, else the weighted mean.
+
+        This is the rate range estimates multiply the whole remaining
+        energy by, so it is total distance over total energy, not a
+        marginal rate.
+        """
+        if (self.observations or 0) >= min_observations and (self.sum_energy or 0) > 0:
+            return round(self.sum_distance / self.sum_energy, 4)
+        return self.efficiency_mean
+    
+    def daily_energy(self, min_days=1.0):
+        """Average energy consumed per day over the logged history, or None when it spans under min_days"""
+        if not self.first_log_at:
+            return None
+        days = (self.last_log_at - self.first_log_at).total_seconds() / 86400
+        if days < min_days:
+            return None
+        return self.sum_energy / days
+    
+    def to_dict(self):
+        return {
+            'vehicle_id': self.vehicle_id,
+            'observations': self.observations,
+            'efficiency_mean': self.efficiency_mean,
+            'efficiency_std': self.efficiency_var ** 0.5 if self.efficiency_var else 0.0,
+            'predicted_efficiency': self.predicted_efficiency(),
+            'price_mean': self.price_mean,
+            'daily_energy': self.daily_energy()
+        }
+
+class DashboardMetric(db.Model):
+    """Precomputed dashboard metrics per user and vehicle type"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'vehicle_type', name='uq_dashboard_metric_user_type'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    vehicle_type = db.Column(db.String(50), nullable=False)
+    monthly_consumption = db.Column(db.Float, nullable=False, default=0)
+    co2_emissions = db.Column(db.Float, nullable=False, default=0)
+    savings = db.Column(db.Float, nullable=False, default=0)
+    efficiency_score = db.Column(db.Integer, nullable=False, default=0)
+    trip_count = db.Column(db.Integer, nullable=False, default=0)
+    avg_trip_distance = db.Column(db.Float, nullable=False, default=0)
+    series = db.Column(db.Text, nullable=False)  # JSON: months, energy/efficiency/savings/cost data
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        series = json.loads(self.series)
+        return {
+            'monthly_consumption': self.monthly_consumption,
+            'co2_emissions': self.co2_emissions,
+            'savings': self.savings,
+            'efficiency_score': self.efficiency_score,
+            'unit': get_unit_for_vehicle_type(self.vehicle_type),
+            'months': series['months'],
+            'energy_data': series['energy_data'],
+            'efficiency_data': series['efficiency_data'],
+            'savings_data': series['savings_data'],
+            'computed_at': self.computed_at.isoformat()
+        }
+
+class StaleDashboardMetric(db.Model):
+    """Users whose dashboard metrics lag their energy logs, until the scheduler recomputes them"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    marked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 class Route(db.Model):
     """Route optimization and history"""
+    api_fields = ('id', 'start_location', 'end_location', 'distance', 'estimated_energy', 'actual_energy',
+                  'route_type', 'timestamp', 'completed')
     id = db.Column(db.Integer, primary_key=True)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
     start_location = db.Column(db.String(255), nullable=False)
@@ -150,7 +484,15 @@ class Route(db.Model):
 
 class Station(db.Model):
     """Fuel/Charging stations"""
+    api_fields = ('id', 'name', 'latitude', 'longitude', 'station_type', 'address', 'phone', 'rating',
+                  'open_24_7', 'price_per_unit')
+    __table_args__ = (
+        db.Index('ix_station_lat_lon', 'latitude', 'longitude'),
+        db.Index('ux_station_osm_id', 'osm_id', unique=True),
+        db.Index('ix_station_updated_at', 'updated_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
+    osm_id = db.Column(db.String(32))  # e.g. node/123 for stations imported from OpenStreetMap
     name = db.Column(db.String(120), nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
@@ -160,6 +502,7 @@ class Station(db.Model):
     rating = db.Column(db.Float, default=0)
     open_24_7 = db.Column(db.Boolean, default=False)
     price_per_unit = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
         return {
@@ -175,8 +518,17 @@ class Station(db.Model):
             'price_per_unit': self.price_per_unit
         }
 
+class OsmTile(db.Model):
+    """When each map tile's stations were last fetched from Overpass"""
+    zoom = db.Column(db.Integer, primary_key=True)
+    x = db.Column(db.Integer, primary_key=True)
+    y = db.Column(db.Integer, primary_key=True)
+    station_count = db.Column(db.Integer, nullable=False, default=0)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 class EmergencyContact(db.Model):
     """Emergency contacts for SOS"""
+    api_fields = ('id', 'contact_name', 'phone', 'relationship', 'is_primary')
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     contact_name = db.Column(db.String(120), nullable=False)
@@ -195,6 +547,9 @@ class EmergencyContact(db.Model):
 
 class EmergencyAlert(db.Model):
     """Emergency alerts and incidents"""
+    __table_args__ = (
+        db.Index('ix_emergency_alert_status_timestamp', 'status', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
@@ -204,6 +559,7 @@ class EmergencyAlert(db.Model):
     description = db.Column(db.Text)
     status = db.Column(db.String(50), default='active')  # active, resolved
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime, index=True)
     
     def to_dict(self):
         return {
@@ -213,18 +569,192 @@ class EmergencyAlert(db.Model):
             'longitude': self.longitude,
             'description': self.description,
             'status': self.status,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp.isoformat(),
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None
         }
 
+class NotificationOutbox(db.Model):
+    """Pending and delivered emergency notifications, drained by the dispatcher"""
+    __table_args__ = (
+        db.Index('ix_notification_outbox_due', 'status', 'next_attempt_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.Integer, db.ForeignKey('emergency_alert.id'), nullable=False, index=True)
+    contact_id = db.Column(db.Integer, db.ForeignKey('emergency_contact.id'))
+    channel = db.Column(db.String(20), nullable=False, default='sms')  # sms, email
+    recipient = db.Column(db.String(120), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), index=True)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'contact_id': self.contact_id,
+            'channel': self.channel,
+            'recipient': self.recipient,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+class ArchivePartition(db.Model):
+    """Catalog of live archive files, one per table and month"""
+    table_name = db.Column(db.String(64), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    version = db.Column(db.Integer, nullable=False, default=1)
+    file_name = db.Column(db.String(64), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ScheduledJob(db.Model):
+    """Schedule and run history of a background job"""
+    name = db.Column(db.String(64), primary_key=True)
+    interval_seconds = db.Column(db.Integer, nullable=False)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(10))  # ok, error
+    last_error = db.Column(db.Text)
+    last_duration_ms = db.Column(db.Float)
+    total_duration_ms = db.Column(db.Float, nullable=False, default=0)
+    max_duration_ms = db.Column(db.Float, nullable=False, default=0)
+    run_count = db.Column(db.Integer, nullable=False, default=0)
+    failure_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'interval_seconds': self.interval_seconds,
+            'enabled': self.enabled,
+            'next_run_at': self.next_run_at.isoformat(),
+            'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+            'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+            'last_status': self.last_status,
+            'last_error': self.last_error,
+            'last_duration_ms': round(self.last_duration_ms, 1) if self.last_duration_ms is not None else None,
+            'avg_duration_ms': round(self.total_duration_ms / self.run_count, 1) if self.run_count else None,
+            'max_duration_ms': round(self.max_duration_ms, 1),
+            'run_count': self.run_count,
+            'failure_count': self.failure_count
+        }
+
+class SchedulerLease(db.Model):
+    """Leader lease; the worker named in holder runs scheduled jobs until expires_at"""
+    name = db.Column(db.String(32), primary_key=True)
+    holder = db.Column(db.String(128), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class CacheGeneration(db.Model):
+    """Response cache namespace generations, shared so a write in one worker retires every worker's entries"""
+    namespace = db.Column(db.String(64), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+# ===== NOTIFICATION DISPATCH =====
+
+notification_dispatcher = None  # configured by create_app()
+
+def enqueue_alert_notifications(alert):
+    """Queue one outbox row per emergency contact in the current transaction"""
+    message = f'SOS from {current_user.full_name or current_user.username}: {alert.alert_type}'
+    if alert.latitude is not None and alert.longitude is not None:
+        message += f' at {alert.latitude:.5f},{alert.longitude:.5f}'
+    if alert.description:
+        message += f' - {alert.description}'
+    
+    now = datetime.utcnow()
+    contacts = db.select(
+        db.literal(alert.id), EmergencyContact.id, db.literal('sms'), EmergencyContact.phone,
+        db.literal(message), db.literal('pending'), db.literal(0), db.literal(now), db.literal(now)
+    ).where(EmergencyContact.user_id == alert.user_id)
+    db.session.execute(db.insert(NotificationOutbox).from_select(
+        ['alert_id', 'contact_id', 'channel', 'recipient', 'message', 'status', 'attempts',
+         'next_attempt_at', 'created_at'],
+        contacts
+    ))
+
 # ===== LOGIN MANAGER =====
 
+USER_CLAIM_FIELDS = ('id', 'username', 'email', 'full_name', 'phone')
+
+class SessionUser(UserMixin):
+    """Authenticated identity rebuilt from signed session claims without a DB query"""
+    def __init__(self, claims):
+        for field in USER_CLAIM_FIELDS:
+            setattr(self, field, claims.get(field))
+        self.created_at = claims.get('created_at')
+    
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in USER_CLAIM_FIELDS}
+        data['created_at'] = self.created_at
+        return data
+
+def store_user_claims(user):
+    """Remember the user's public fields in the signed session cookie"""
+    claims = {field: getattr(user, field) for field in USER_CLAIM_FIELDS}
+    claims['created_at'] = user.created_at.isoformat()
+    claims['loaded_at'] = time.time()
+    session['user_claims'] = claims
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    claims = session.get('user_claims')
+    if (claims and str(claims.get('id')) == str(user_id)
+            and time.time() - claims.get('loaded_at', 0) < current_app.config['USER_CLAIMS_TTL']):
+        return SessionUser(claims)
+    
+    # Claims missing or stale: reload so deleted users lose access within the TTL
+    user = db.session.get(User, int(user_id))
+    if user is None:
+        session.pop('user_claims', None)
+        return None
+    store_user_claims(user)
+    return SessionUser(session['user_claims'])
+
+# ===== CREDENTIALS =====
+
+password_hasher = None  # configured by create_app()
+login_ip_limiter = None
+login_failure_limiter = None
+
+login_throttled = metrics.counter('smart_login_throttled_total', 'Login attempts refused before hashing',
+                                  ('reason',))
+metrics.gauge('smart_password_hash_in_flight', 'Password hashes running or queued in this process',
+              callback=lambda: {(): password_hasher.in_flight} if password_hasher else {})
+metrics.gauge('smart_password_hash_total', 'Password hashes and verifications completed', kind='counter',
+              callback=lambda: {(): password_hasher.counters['hashed']} if password_hasher else {})
+metrics.gauge('smart_password_hash_rejected_total', 'Hashing requests refused because every slot was busy',
+              kind='counter', callback=lambda: {(): password_hasher.counters['rejected']} if password_hasher else {})
+metrics.gauge('smart_password_rehashed_total', 'Stored hashes upgraded to PASSWORD_HASH_METHOD at login',
+              kind='counter', callback=lambda: {(): password_hasher.counters['rehashed']} if password_hasher else {})
+
+def retry_reply(error, status, retry_after):
+    response = jsonify({'error': error})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, int(np.ceil(retry_after))))
+    return response
+
+def hasher_busy_reply():
+    return retry_reply('Too many sign-ins in progress, please retry shortly', 503, HasherBusy.retry_after)
+
+def upgrade_password_hash(user_id, old_hash, new_hash):
+    """Store a rehashed password unless the password changed since it was read"""
+    db.session.execute(db.update(User).where(User.id == user_id, User.password_hash == old_hash)
+                       .values(password_hash=new_hash))
+    db.session.commit()
 
 # ===== AUTHENTICATION ROUTES =====
 
-@app.route('/api/auth/register', methods=['POST'])
+@bp.route('/api/auth/register', methods=['POST'])
 def register():
     """Register a new user"""
     try:
@@ -233,11 +763,12 @@ def register():
         if not data or not data.get('username') or not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Username already exists'}), 400
-        
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already exists'}), 400
+        existing = db.session.query(User.username).filter(
+            db.or_(User.username == data['username'], User.email == data['email'])
+        ).first()
+        if existing:
+            field = 'Username' if existing.username == data['username'] else 'Email'
+            return jsonify({'error': f'{field} already exists'}), 400
         
         user = User(
             username=data['username'],
@@ -248,18 +779,27 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent registration for the same name/email
+            db.session.rollback()
+            return jsonify({'error': 'Username or email already exists'}), 400
         
         login_user(user)
+        store_user_claims(user)
         return jsonify({
             'message': 'Registration successful',
             'user': user.to_dict()
         }), 201
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_reply()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def login():
     """Login user"""
     try:
@@ -268,27 +808,47 @@ def login():
         if not data or not data.get('username') or not data.get('password'):
             return jsonify({'error': 'Missing username or password'}), 400
         
+        retry_after = login_ip_limiter.hit(request.remote_addr)
+        if retry_after:
+            login_throttled.inc('ip')
+            return retry_reply('Too many login attempts', 429, retry_after)
+        retry_after = login_failure_limiter.retry_after(data['username'])
+        if retry_after:
+            login_throttled.inc('username')
+            return retry_reply('Too many failed attempts for this account', 429, retry_after)
+        
         user = User.query.filter_by(username=data['username']).first()
         
-        if not user or not user.check_password(data['password']):
+        # Unknown usernames are checked against a dummy hash so they take as long as a wrong password
+        stored = user.password_hash if user else None
+        matches, new_hash = password_hasher.verify(stored, data['password'])
+        if not user or not matches:
+            login_failure_limiter.hit(data['username'])
             return jsonify({'error': 'Invalid username or password'}), 401
+        if new_hash:
+            upgrade_password_hash(user.id, stored, new_hash)
         
         login_user(user)
+        store_user_claims(user)
         return jsonify({
             'message': 'Login successful',
             'user': user.to_dict()
         }), 200
+    except HasherBusy:
+        return hasher_busy_reply()
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/logout', methods=['POST'])
+@bp.route('/api/auth/logout', methods=['POST'])
 @login_required
 def logout():
     """Logout user"""
     logout_user()
+    session.pop('user_claims', None)
     return jsonify({'message': 'Logged out successfully'}), 200
 
-@app.route('/api/auth/profile', methods=['GET'])
+@bp.route('/api/auth/profile', methods=['GET'])
 @login_required
 def get_profile():
     """Get current user profile"""
@@ -296,13 +856,18 @@ def get_profile():
 
 # ===== VEHICLE ROUTES =====
 
-@app.route('/api/vehicles', methods=['GET', 'POST'])
+@bp.route('/api/vehicles', methods=['GET', 'POST'])
 @login_required
+@cached_response(user_cache_namespace)
 def vehicles():
     """Get all vehicles or create a new vehicle"""
     if request.method == 'GET':
-        vehicles = Vehicle.query.filter_by(user_id=current_user.id).all()
-        return jsonify([v.to_dict() for v in vehicles]), 200
+        try:
+            fields = selected_fields(Vehicle)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        rows = select_columns(Vehicle.query.filter_by(user_id=current_user.id), Vehicle, fields).all()
+        return jsonify(rows_to_dicts(rows, fields)), 200
     
     elif request.method == 'POST':
         try:
@@ -321,30 +886,32 @@ def vehicles():
             )
             db.session.add(vehicle)
             db.session.commit()
+            invalidate_cache(user_cache_namespace())
             return jsonify(vehicle.to_dict()), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
-@app.route('/api/vehicles/<int:vehicle_id>', methods=['GET', 'PUT', 'DELETE'])
+@bp.route('/api/vehicles/<int:vehicle_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
 def vehicle_detail(vehicle_id):
     """Get, update, or delete a specific vehicle"""
-    vehicle = Vehicle.query.get_or_404(vehicle_id)
-    
-    if vehicle.user_id != current_user.id:
-        return jsonify({'error': 'Unauthorized'}), 403
+    vehicle = Vehicle.query.filter_by(id=vehicle_id, user_id=current_user.id).first_or_404()
     
     if request.method == 'GET':
-        return jsonify(vehicle.to_dict()), 200
+        response = jsonify(vehicle.to_dict())
+        response.set_etag(str(vehicle.version))
+        return response, 200
     
     elif request.method == 'PUT':
         try:
             data = request.get_json()
             for key, value in data.items():
-                if hasattr(vehicle, key):
+                if hasattr(vehicle, key) and key not in VEHICLE_READ_ONLY_FIELDS:
                     setattr(vehicle, key, value)
+            vehicle.version = Vehicle.version + 1
             db.session.commit()
+            invalidate_cache(user_cache_namespace(), vehicle_cache_namespace(vehicle.id))
             return jsonify(vehicle.to_dict()), 200
         except Exception as e:
             db.session.rollback()
@@ -354,14 +921,307 @@ def vehicle_detail(vehicle_id):
         try:
             db.session.delete(vehicle)
             db.session.commit()
+            invalidate_cache(user_cache_namespace())
             return jsonify({'message': 'Vehicle deleted'}), 200
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+# ===== VEHICLE STATE UPDATES =====
+
+VEHICLE_READ_ONLY_FIELDS = ('id', 'user_id', 'created_at', 'version')
+VEHICLE_PATCH_FIELDS = {'vehicle_name': str, 'vehicle_type': str, 'make': str, 'model': str, 'year': int,
+                        'fuel_capacity': float, 'battery_capacity': float, 'current_fuel': float,
+                        'current_battery': float, 'mileage': float}
+VEHICLE_REQUIRED_FIELDS = ('vehicle_name', 'vehicle_type')
+VEHICLE_PATCH_MAX = 1000
+
+def vehicle_patch_values(data):
+    """Validated column values from one PATCH object (id and version excluded); raises ValueError"""
+    values = {}
+    for field, value in data.items():
+        if field in ('id', 'version'):
+            continue
+        kind = VEHICLE_PATCH_FIELDS.get(field)
+        if kind is None:
+            raise ValueError(f'Unknown or read-only field: {field}')
+        if value is None:
+            if field in VEHICLE_REQUIRED_FIELDS:
+                raise ValueError(f'{field} is required')
+        elif kind is str:
+            if not isinstance(value, str) or (field in VEHICLE_REQUIRED_FIELDS and not value.strip()):
+                raise ValueError(f'Invalid {field}')
+        elif (isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value)
+              or value < 0 or (kind is int and value != int(value))):
+            raise ValueError(f'Invalid {field}')
+        else:
+            value = kind(value)
+        values[field] = value
+    if not values:
+        raise ValueError('No fields to update')
+    return values
+
+def expected_version(data):
+    """Version the client last saw, from the body or an If-Match header; None updates unconditionally"""
+    version = data.get('version')
+    if version is None and request.if_match and not request.if_match.star_tag:
+        tags = list(request.if_match)
+        version = tags[0] if len(tags) == 1 else None
+    if version is None:
+        return None
+    try:
+        return int(version)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid version')
+
+def vehicle_update(conditional):
+    """UPDATE one of a user's vehicles by id (and version) without loading it; SET columns come from the parameters"""
+    table = Vehicle.__table__
+    stmt = db.update(table).where(table.c.id == db.bindparam('b_id'), table.c.user_id == db.bindparam('b_user_id'))
+    if conditional:
+        stmt = stmt.where(table.c.version == db.bindparam('b_version'))
+    return stmt.values(version=table.c.version + 1).returning(table.c.version)
+
+def apply_vehicle_patches(user_id, patches):
+    """Apply [(vehicle_id, expected version or None, values)] in one transaction.
+
+    Each patch is a single UPDATE ... WHERE id AND user_id [AND version]
+    that also bumps the version. Returns one (status, version) per patch,
+    in order: ('updated', new version), ('conflict', current version) when
+    another update won the race, or ('missing', None) for vehicles that do
+    not exist or belong to someone else.
+    """
+    statements = {True: vehicle_update(True), False: vehicle_update(False)}
+    versions = []
+    for vehicle_id, version, values in patches:
+        params = dict(values, b_id=vehicle_id, b_user_id=user_id)
+        if version is not None:
+            params['b_version'] = version
+        versions.append(db.session.execute(statements[version is not None], params).scalar())
+    db.session.commit()
+    
+    failed = {vehicle_id for (vehicle_id, _, _), version in zip(patches, versions) if version is None}
+    current = {}
+    if failed:
+        current = dict(db.session.query(Vehicle.id, Vehicle.version).filter(
+            Vehicle.id.in_(failed), Vehicle.user_id == user_id).all())
+    applied = {vehicle_id for (vehicle_id, _, _), version in zip(patches, versions) if version is not None}
+    if applied:
+        invalidate_cache(user_cache_namespace(user_id), *(vehicle_cache_namespace(v) for v in applied))
+        if telemetry_broker.subscriber_count():
+            for state in vehicle_states(vehicle_ids=list(applied)).values():
+                telemetry_broker.publish(user_id, state)
+    
+    results = []
+    for (vehicle_id, _, _), version in zip(patches, versions):
+        if version is not None:
+            results.append(('updated', version))
+        elif vehicle_id in current:
+            results.append(('conflict', current[vehicle_id]))
+        else:
+            results.append(('missing', None))
+    return results
+
+@bp.route('/api/vehicles/<int:vehicle_id>', methods=['PATCH'])
+@login_required
+def patch_vehicle(vehicle_id):
+    """Update some of a vehicle's fields; with a version (body or If-Match) only if nobody else has since"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        values = vehicle_patch_values(data)
+        version = expected_version(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        [(status, version)] = apply_vehicle_patches(current_user.id, [(vehicle_id, version, values)])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if status == 'conflict':
+        return jsonify({'error': 'Vehicle was modified by another update', 'version': version}), 409
+    if status == 'missing':
+        return jsonify({'error': 'Not found'}), 404
+    response = jsonify(dict(values, id=vehicle_id, version=version))
+    response.set_etag(str(version))
+    return response, 200
+
+@bp.route('/api/vehicles', methods=['PATCH'])
+@login_required
+def patch_vehicles():
+    """Apply a JSON array of {id, version?, fields...} updates; each succeeds or fails on its own"""
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a JSON array of updates'}), 400
+    if len(items) > VEHICLE_PATCH_MAX:
+        return jsonify({'error': f'At most {VEHICLE_PATCH_MAX} updates per request'}), 413
+    
+    patches, indexes, errors = [], [], []
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict) or isinstance(item.get('id'), bool) or not isinstance(item.get('id'), int):
+                raise ValueError('Each update needs an integer id')
+            version = item.get('version')
+            if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+                raise ValueError('Invalid version')
+            patches.append((item['id'], version, vehicle_patch_values(item)))
+            indexes.append(i)
+        except ValueError as e:
+            errors.append({'index': i, 'error': str(e)})
+    
+    try:
+        results = apply_vehicle_patches(current_user.id, patches)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    updated, conflicts = [], []
+    for i, (vehicle_id, _, _), (status, version) in zip(indexes, patches, results):
+        if status == 'updated':
+            updated.append({'index': i, 'id': vehicle_id, 'version': version})
+        elif status == 'conflict':
+            conflicts.append({'index': i, 'id': vehicle_id, 'version': version})
+        else:
+            errors.append({'index': i, 'error': 'Not found'})
+    errors.sort(key=lambda e: e['index'])
+    return jsonify({'updated': updated, 'conflicts': conflicts, 'errors': errors}), 200
+
+# ===== SERIALIZATION HELPERS =====
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/html')
+
+def selected_fields(model):
+    """Fields requested with ?fields=a,b (default: all of model.api_fields)"""
+    requested = request.args.get('fields')
+    if not requested:
+        return model.api_fields
+    fields = tuple(f.strip() for f in requested.split(',') if f.strip())
+    unknown = [f for f in fields if f not in model.api_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def select_columns(query, model, fields):
+    """Load only the given columns as row tuples instead of ORM entities"""
+    return query.with_entities(*[getattr(model, f) for f in fields])
+
+def rows_to_dicts(rows, fields):
+    return [dict(zip(fields, row)) for row in rows]
+
+@bp.after_app_request
+def compress_response(response):
+    """gzip/brotli-encode sizeable JSON, CSV and page responses when the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None or len(body) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(compress(body, encoding, current_app.config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# ===== PAGINATION HELPERS =====
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def encode_cursor(timestamp, row_id):
+    """Opaque keyset cursor pointing just past (timestamp, row_id)"""
+    raw = f'{timestamp.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_response(query, model, date_field, id_field='id', archived=None):
+    """Return query rows newest first, paged by ?limit=&after= or streamed as NDJSON.
+
+    Paged responses keep the JSON list body and advertise the next page in
+    the X-Next-Cursor header; without ?limit a page holds DEFAULT_PAGE_SIZE
+    rows, so clients that want everything follow the cursor. With ?format=ndjson every matching row is
+    streamed from a server-side cursor in batches of STREAM_BATCH_SIZE.
+    Only the columns named by ?fields= are loaded and returned.
+
+    archived is an optional callable taking the column names and the
+    (date, id) cursor (or None) and returning an iterator of matching
+    archived row dicts, newest first, from before that cursor; they are
+    merged in date order and only built as far as the page reads.
+    """
+    date_column = getattr(model, date_field)
+    id_column = getattr(model, id_field)
+    try:
+        fields = selected_fields(model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    after = request.args.get('after')
+    if after:
+        try:
+            after_date, after_id = decode_cursor(after)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(db.or_(
+            date_column < after_date,
+            db.and_(date_column == after_date, id_column < after_id)
+        ))
+    query = query.order_by(date_column.desc(), id_column.desc())
+    
+    # The cursor columns are always loaded, after the requested ones
+    columns = fields + tuple(f for f in (date_field, id_field) if f not in fields)
+    query = select_columns(query, model, columns)
+    
+    cold = iter(archived(columns, (after_date, after_id) if after else None) if archived else ())
+    first = next(cold, None)
+    if first is not None:
+        return merged_keyset_response(query, itertools.chain([first], cold), fields, columns, date_field, id_field)
+    
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                yield dumps(dict(zip(fields, row))) + b'\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    rows = query.limit(limit + 1).all()
+    response = jsonify(rows_to_dicts(rows[:limit], fields))
+    if len(rows) > limit:
+        last = dict(zip(columns, rows[limit - 1]))
+        response.headers['X-Next-Cursor'] = encode_cursor(last[date_field], last[id_field])
+    return response, 200
+
+def merged_keyset_response(query, cold, fields, columns, date_field, id_field):
+    """keyset_response() for hot query rows merged with archived row dicts, both newest first"""
+    order = lambda row: (row[date_field], row[id_field])
+    hot = (dict(zip(columns, row)) for row in query.yield_per(STREAM_BATCH_SIZE))
+    merged = heapq.merge(hot, cold, key=order, reverse=True)
+    
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for row in merged:
+                yield dumps({f: row[f] for f in fields}) + b'\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    rows = list(itertools.islice(merged, limit + 1))
+    response = jsonify([{f: row[f] for f in fields} for row in rows[:limit]])
+    if len(rows) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(rows[limit - 1][date_field], rows[limit - 1][id_field])
+    return response, 200
+
 # ===== ENERGY TRACKING ROUTES =====
 
-@app.route('/api/energy-logs', methods=['GET', 'POST'])
+@bp.route('/api/energy-logs', methods=['GET', 'POST'])
 @login_required
 def energy_logs():
     """Get all energy logs or create a new one"""
@@ -374,13 +1234,18 @@ def energy_logs():
             query = query.filter_by(vehicle_id=vehicle_id)
         
         since = datetime.utcnow() - timedelta(days=days)
-        logs = query.filter(EnergyLog.date >= since).all()
+        query = query.filter(EnergyLog.date >= since)
         
-        return jsonify([log.to_dict() for log in logs]), 200
+        def archived(columns, before):
+            vehicle_ids = user_vehicle_ids(current_user.id, vehicle_id)
+            return iter_archived_rows('energy_log', current_user.id, since, before, vehicle_ids, columns)
+        return keyset_response(query, EnergyLog, 'date', archived=archived)
     
     elif request.method == 'POST':
         try:
             data = request.get_json()
+            if Vehicle.query.filter_by(id=data['vehicle_id'], user_id=current_user.id).first() is None:
+                return jsonify({'error': 'Vehicle not found'}), 404
             log = EnergyLog(
                 user_id=current_user.id,
                 vehicle_id=data['vehicle_id'],
@@ -393,76 +1258,784 @@ def energy_logs():
             log.efficiency = log.distance_traveled / log.energy_consumed if log.energy_consumed > 0 else 0
             
             db.session.add(log)
+            db.session.flush()
+            record_rollups(log)
+            update_efficiency_models([(log.vehicle_id, log.distance_traveled, log.energy_consumed,
+                                       log.cost, log.date)])
+            mark_dashboard_metrics_stale([current_user.id])
             db.session.commit()
+            invalidate_cache(user_cache_namespace(), vehicle_cache_namespace(log.vehicle_id))
             return jsonify(log.to_dict()), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
-@app.route('/api/energy-summary', methods=['GET'])
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_ROWS = 100000
+
+def parse_bulk_rows():
+    """Read the request body as a JSON array, NDJSON or CSV into (rows, errors)"""
+    content_type = request.mimetype
+    body = request.get_data(as_text=True)
+    if content_type == 'text/csv':
+        return list(csv.DictReader(io.StringIO(body))), []
+    if content_type == 'application/x-ndjson':
+        rows, errors = [], []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                errors.append({'row': len(rows), 'error': 'Invalid JSON'})
+                rows.append(None)
+        return rows, errors
+    data = json.loads(body) if body else None
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array, NDJSON or CSV body')
+    return data, []
+
+def to_float(value):
+    """float(value), or NaN when it is not a number"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def float_column(rows, key, default=np.nan):
+    """Coerce one field of every row to a float array, NaN where missing or invalid"""
+    values = np.array([row.get(key) if isinstance(row, dict) else None for row in rows], dtype=object)
+    values[np.equal(values, None) | np.equal(values, '')] = default
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        # Some value is not a number: coerce element by element, NaN where it fails
+        return np.vectorize(to_float, otypes=[float])(values)
+
+def parse_log_date(value):
+    """An ISO 8601 log date as naive UTC; offsets are converted, naive values taken as UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def store_energy_logs(mappings):
+    """Insert energy log rows, fold them into rollups and efficiency models and queue a metrics refresh.
+
+    The caller commits.
+    """
+    buckets = {}
+    for m in mappings:
+        accumulate_rollups(buckets, m['user_id'], m['vehicle_id'], m['date'].date(),
+                           (m['energy_consumed'], m['distance_traveled'], m['cost'], m['co2_emissions'], 1))
+    db.session.execute(db.insert(EnergyLog), mappings)
+    apply_rollups(buckets)
+    update_efficiency_models([(m['vehicle_id'], m['distance_traveled'], m['energy_consumed'],
+                               m['cost'], m['date']) for m in mappings])
+    mark_dashboard_metrics_stale({m['user_id'] for m in mappings})
+
+@bp.route('/api/energy-logs/bulk', methods=['POST'])
 @login_required
+def energy_logs_bulk():
+    """Ingest a batch of energy logs from a JSON array, NDJSON or CSV body"""
+    started = time.perf_counter()
+    try:
+        rows, errors = parse_bulk_rows()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(rows) > BULK_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_MAX_ROWS} rows per request'}), 413
+    
+    # Validate and derive efficiency for the whole batch at once
+    vehicle_ids = float_column(rows, 'vehicle_id')
+    energy = float_column(rows, 'energy_consumed')
+    distance = float_column(rows, 'distance_traveled')
+    cost = float_column(rows, 'cost')
+    co2 = float_column(rows, 'co2_emissions', default=0.0)
+    
+    owned = [v.id for v in Vehicle.query.with_entities(Vehicle.id).filter_by(user_id=current_user.id)]
+    checks = [
+        (np.isin(vehicle_ids, owned), 'Unknown vehicle_id'),
+        (np.isfinite(energy) & (energy >= 0), 'Invalid energy_consumed'),
+        (np.isfinite(distance) & (distance >= 0), 'Invalid distance_traveled'),
+        (np.isfinite(cost), 'Invalid cost'),
+        (np.isfinite(co2), 'Invalid co2_emissions'),
+    ]
+    valid = np.array([isinstance(row, dict) for row in rows], dtype=bool)
+    for mask, _ in checks:
+        valid &= mask
+    efficiency = np.divide(distance, energy, out=np.zeros(len(rows)), where=valid & (energy > 0))
+    
+    now = datetime.utcnow()
+    dates = [now] * len(rows)
+    for i in np.flatnonzero(valid):
+        if rows[i].get('date'):
+            try:
+                dates[i] = parse_log_date(rows[i]['date'])
+            except (TypeError, ValueError):
+                valid[i] = False
+                errors.append({'row': int(i), 'error': 'Invalid date'})
+    
+    reported = {e['row'] for e in errors}
+    for i in np.flatnonzero(~valid):
+        if int(i) not in reported:
+            if not isinstance(rows[i], dict):
+                message = 'Row must be an object'
+            else:
+                message = next(msg for mask, msg in checks if not mask[i])
+            errors.append({'row': int(i), 'error': message})
+    
+    inserted = 0
+    touched_vehicles = set()
+    valid_rows = np.flatnonzero(valid)
+    for start in range(0, len(valid_rows), BULK_CHUNK_SIZE):
+        chunk = valid_rows[start:start + BULK_CHUNK_SIZE]
+        mappings = [{
+            'user_id': current_user.id,
+            'vehicle_id': int(vehicle_ids[i]),
+            'energy_consumed': float(energy[i]),
+            'distance_traveled': float(distance[i]),
+            'cost': float(cost[i]),
+            'efficiency': float(efficiency[i]),
+            'co2_emissions': float(co2[i]),
+            'date': dates[i],
+            'notes': rows[i].get('notes') or None
+        } for i in chunk]
+        try:
+            store_energy_logs(mappings)
+            db.session.commit()
+            inserted += len(mappings)
+            touched_vehicles.update(m['vehicle_id'] for m in mappings)
+        except Exception as e:
+            db.session.rollback()
+            errors.extend({'row': int(i), 'error': str(e)} for i in chunk)
+    if inserted:
+        invalidate_cache(user_cache_namespace(), *(vehicle_cache_namespace(v) for v in touched_vehicles))
+    
+    elapsed = time.perf_counter() - started
+    return jsonify({
+        'inserted': inserted,
+        'failed': len(errors),
+        'errors': sorted(errors, key=lambda e: e['row']),
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'rows_per_sec': round(inserted / elapsed, 1) if elapsed > 0 else None
+    }), 201 if inserted else 400 if errors else 200
+
+SUMMARY_GROUPINGS = ('day', 'week', 'month', 'vehicle')
+
+def date_bucket(column, group_by):
+    """SQL expression labelling a datetime column by day, week (Monday) or month"""
+    if db.engine.dialect.name == 'postgresql':
+        fmt = 'YYYY-MM' if group_by == 'month' else 'YYYY-MM-DD'
+        return db.func.to_char(db.func.date_trunc(group_by, column), fmt)
+    if group_by == 'week':
+        return db.func.date(column, 'weekday 0', '-6 days')
+    if group_by == 'month':
+        return db.func.strftime('%Y-%m', column)
+    return db.func.date(column)
+
+def summary_columns(energy, distance, cost, co2, count):
+    """Aggregate select list shared by every energy summary query"""
+    return [
+        db.func.coalesce(db.func.sum(energy), 0.0).label('total_energy'),
+        db.func.coalesce(db.func.sum(distance), 0.0).label('total_distance'),
+        db.func.coalesce(db.func.sum(cost), 0.0).label('total_cost'),
+        db.func.coalesce(db.func.sum(co2), 0.0).label('total_co2'),
+        count.label('log_count'),
+    ]
+
+def summary_totals(total_energy, total_distance, total_cost, total_co2, log_count):
+    """Shape aggregate totals into the energy summary payload"""
+    return {
+        'total_energy': total_energy,
+        'total_distance': total_distance,
+        'total_cost': total_cost,
+        'total_co2': total_co2,
+        'average_efficiency': total_distance / total_energy if total_energy > 0 else 0,
+        'log_count': log_count
+    }
+
+def aggregate_energy(model, date_column, columns, group_by, *filters):
+    """Run one summary aggregate over model, grouped by group_by when given"""
+    if group_by == 'vehicle':
+        bucket = model.vehicle_id
+    elif group_by:
+        bucket = date_bucket(date_column, group_by)
+    else:
+        bucket = db.null()
+    
+    query = db.session.query(bucket.label('bucket'), *columns).filter(*filters)
+    if group_by:
+        query = query.group_by(bucket)
+    return query.all()
+
+@bp.route('/api/energy-summary', methods=['GET'])
+@login_required
+@cached_response(user_cache_namespace)
 def energy_summary():
-    """Get energy consumption summary"""
+    """Get energy consumption summary, optionally bucketed with group_by"""
     try:
-        vehicle_id = request.args.get('vehicle_id')
+        vehicle_id = request.args.get('vehicle_id', type=int)
         days = request.args.get('days', 30, type=int)
+        group_by = request.args.get('group_by')
         
-        query = EnergyLog.query.filter_by(user_id=current_user.id)
-        if vehicle_id:
-            query = query.filter_by(vehicle_id=vehicle_id)
+        if group_by and group_by not in SUMMARY_GROUPINGS:
+            return jsonify({'error': f"group_by must be one of {', '.join(SUMMARY_GROUPINGS)}"}), 400
         
+        # Whole days come from the daily rollups; only the partial first day
+        # of the window is aggregated from raw logs.
         since = datetime.utcnow() - timedelta(days=days)
-        logs = query.filter(EnergyLog.date >= since).all()
+        first_full_day = since.date() + timedelta(days=1)
         
-        total_energy = sum(log.energy_consumed for log in logs)
-        total_distance = sum(log.distance_traveled for log in logs)
-        total_cost = sum(log.cost for log in logs)
-        total_co2 = sum(log.co2_emissions for log in logs)
-        avg_efficiency = total_distance / total_energy if total_energy > 0 else 0
+        rollup_filters = [EnergyRollup.user_id == current_user.id, EnergyRollup.period == 'day',
+                          EnergyRollup.period_start >= first_full_day]
+        log_filters = [EnergyLog.user_id == current_user.id, EnergyLog.date >= since,
+                       EnergyLog.date < datetime.combine(first_full_day, datetime.min.time())]
+        if vehicle_id:
+            rollup_filters.append(EnergyRollup.vehicle_id == vehicle_id)
+            log_filters.append(EnergyLog.vehicle_id == vehicle_id)
         
-        return jsonify({
-            'total_energy': total_energy,
-            'total_distance': total_distance,
-            'total_cost': total_cost,
-            'total_co2': total_co2,
-            'average_efficiency': avg_efficiency,
-            'days': days,
-            'log_count': len(logs)
-        }), 200
+        rows = aggregate_energy(
+            EnergyRollup, EnergyRollup.period_start,
+            summary_columns(EnergyRollup.total_energy, EnergyRollup.total_distance, EnergyRollup.total_cost,
+                            EnergyRollup.total_co2, db.func.coalesce(db.func.sum(EnergyRollup.log_count), 0)),
+            group_by, *rollup_filters
+        ) + aggregate_energy(
+            EnergyLog, EnergyLog.date,
+            summary_columns(EnergyLog.energy_consumed, EnergyLog.distance_traveled, EnergyLog.cost,
+                            EnergyLog.co2_emissions, db.func.count(EnergyLog.id)),
+            group_by, *log_filters
+        ) + archived_summary_rows(current_user.id, since, datetime.combine(first_full_day, datetime.min.time()),
+                                  user_vehicle_ids(current_user.id, vehicle_id), group_by)
+        
+        totals = {}
+        for row in rows:
+            if not row.log_count:
+                continue
+            acc = totals.setdefault(row.bucket, [0.0, 0.0, 0.0, 0.0, 0])
+            acc[0] += row.total_energy
+            acc[1] += row.total_distance
+            acc[2] += row.total_cost
+            acc[3] += row.total_co2
+            acc[4] += row.log_count
+        
+        overall = [sum(acc[i] for acc in totals.values()) for i in range(5)]
+        summary = summary_totals(*overall)
+        summary['days'] = days
+        if group_by:
+            buckets = []
+            for key in sorted(totals):
+                item = summary_totals(*totals[key])
+                item['bucket'] = key
+                buckets.append(item)
+            summary['group_by'] = group_by
+            summary['buckets'] = buckets
+        return jsonify(summary), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ===== ENERGY ROLLUPS =====
+
+ROLLUP_FIELDS = ('total_energy', 'total_distance', 'total_cost', 'total_co2', 'log_count')
+
+def rollup_periods(day):
+    """Return the (period, period_start) buckets a log on the given day belongs to"""
+    return [('day', day), ('month', day.replace(day=1))]
+
+def accumulate_rollups(buckets, user_id, vehicle_id, day, values):
+    """Add (energy, distance, cost, co2, count) for one day into a bucket dict"""
+    for period, period_start in rollup_periods(day):
+        acc = buckets.setdefault((period, user_id, vehicle_id, period_start), [0.0, 0.0, 0.0, 0.0, 0])
+        for i, value in enumerate(values):
+            acc[i] += value or 0
+
+def apply_rollups(buckets):
+    """Upsert accumulated rollup deltas in the current transaction"""
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    for (period, user_id, vehicle_id, period_start), acc in buckets.items():
+        stmt = insert(EnergyRollup).values(period=period, user_id=user_id, vehicle_id=vehicle_id,
+                                           period_start=period_start, **dict(zip(ROLLUP_FIELDS, acc)))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['period', 'user_id', 'vehicle_id', 'period_start'],
+            set_={field: getattr(EnergyRollup, field) + getattr(stmt.excluded, field) for field in ROLLUP_FIELDS}
+        )
+        db.session.execute(stmt)
+
+def record_rollups(log):
+    """Add a new log to its daily and monthly rollups in the current transaction"""
+    buckets = {}
+    accumulate_rollups(buckets, log.user_id, log.vehicle_id, log.date.date(),
+                       (log.energy_consumed, log.distance_traveled, log.cost, log.co2_emissions, 1))
+    apply_rollups(buckets)
+
+def rebuild_rollups():
+    """Recompute every rollup row from the raw energy logs.
+
+    A backfill for `flask rebuild-rollups`, not a scheduled job: it replaces
+    the whole table, so logs written while it runs can be lost from the totals.
+    """
+    day = db.func.date(EnergyLog.date)
+    daily = db.session.query(
+        EnergyLog.user_id, EnergyLog.vehicle_id, day.label('day'),
+        *summary_columns(EnergyLog.energy_consumed, EnergyLog.distance_traveled, EnergyLog.cost,
+                         EnergyLog.co2_emissions, db.func.count(EnergyLog.id))
+    ).group_by(EnergyLog.user_id, EnergyLog.vehicle_id, day)
+    
+    buckets = {}
+    for row in daily.yield_per(1000):
+        day_value = row.day if not isinstance(row.day, str) else datetime.strptime(row.day, '%Y-%m-%d').date()
+        accumulate_rollups(buckets, row.user_id, row.vehicle_id, day_value,
+                           [getattr(row, field) for field in ROLLUP_FIELDS])
+    accumulate_archived_rollups(buckets)
+    
+    EnergyRollup.query.delete()
+    mappings = [
+        dict(zip(('period', 'user_id', 'vehicle_id', 'period_start') + ROLLUP_FIELDS, key + tuple(acc)))
+        for key, acc in buckets.items()
+    ]
+    if mappings:
+        db.session.execute(db.insert(EnergyRollup), mappings)
+    db.session.commit()
+    return len(mappings)
+
+@bp.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Rebuild daily and monthly energy rollups from raw logs"""
+    count = rebuild_rollups()
+    print(f"Rebuilt {count} rollup rows")
+
+# ===== EFFICIENCY MODEL =====
+
+def update_efficiency_models(observations):
+    """Fold (vehicle_id, distance, energy, cost, date) trips into their models in order.
+
+    Runs inside the caller's transaction. Missing rows are created with an
+    insert that ignores conflicts, so two first logs for a vehicle cannot
+    both insert it; the rows are then locked for update (SQLite already holds
+    its write lock by then) so concurrent writers serialize instead of losing trips.
+    """
+    vehicle_ids = sorted({o[0] for o in observations})
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    db.session.execute(insert(VehicleEfficiencyModel).on_conflict_do_nothing(index_elements=['vehicle_id']),
+                       [{'vehicle_id': vehicle_id} for vehicle_id in vehicle_ids])
+    models = {m.vehicle_id: m for m in VehicleEfficiencyModel.query.filter(
+        VehicleEfficiencyModel.vehicle_id.in_(vehicle_ids)).with_for_update().populate_existing()}
+    alpha = current_app.config['EFFICIENCY_EWMA_ALPHA']
+    for vehicle_id, distance, energy, cost, logged_at in observations:
+        models[vehicle_id].observe(distance, energy, cost, logged_at, alpha)
+
+def efficiency_models(vehicle_ids):
+    """Efficiency models for the given vehicles, keyed by vehicle id"""
+    if not vehicle_ids:
+        return {}
+    return {m.vehicle_id: m for m in VehicleEfficiencyModel.query.filter(
+        VehicleEfficiencyModel.vehicle_id.in_(vehicle_ids))}
+
+def retrain_efficiency_models(chunk_size=5000):
+    """Rebuild every efficiency model by streaming the log table in chunks.
+
+    A backfill for `flask retrain-efficiency`, run with writes stopped; models
+    are otherwise kept current as logs arrive.
+    """
+    VehicleEfficiencyModel.query.delete()
+    alpha = current_app.config['EFFICIENCY_EWMA_ALPHA']
+    logs = db.session.query(
+        EnergyLog.vehicle_id, EnergyLog.distance_traveled, EnergyLog.energy_consumed, EnergyLog.cost, EnergyLog.date
+    ).order_by(EnergyLog.vehicle_id, EnergyLog.date, EnergyLog.id).execution_options(yield_per=chunk_size)
+    
+    # Logs arrive grouped by vehicle: one model is built at a time and finished
+    # ones are inserted as plain rows every chunk_size vehicles
+    columns = [column.name for column in VehicleEfficiencyModel.__table__.columns]
+    current, pending, count = None, [], 0
+    for vehicle_id, distance, energy, cost, logged_at in logs:
+        if current is None or current.vehicle_id != vehicle_id:
+            if current is not None:
+                pending.append({name: getattr(current, name) for name in columns})
+                if len(pending) >= chunk_size:
+                    db.session.execute(db.insert(VehicleEfficiencyModel), pending)
+                    pending = []
+            current = VehicleEfficiencyModel(vehicle_id=vehicle_id, efficiency_var=0.0)
+            count += 1
+        current.observe(distance, energy, cost, logged_at, alpha)
+    if current is not None:
+        pending.append({name: getattr(current, name) for name in columns})
+    if pending:
+        db.session.execute(db.insert(VehicleEfficiencyModel), pending)
+    db.session.commit()
+    return count
+
+@bp.cli.command('retrain-efficiency')
+def retrain_efficiency_command():
+    """Rebuild per-vehicle efficiency models from the full energy log table"""
+    count = retrain_efficiency_models()
+    print(f"Retrained {count} vehicle efficiency models")
+
+# ===== ARCHIVAL =====
+
+archive_store = None  # configured by create_app()
+
+# Tables compacted into monthly archive files, with the column their months are cut on
+ARCHIVED_TABLES = {
+    'energy_log': (EnergyLog, 'date'),
+    'emergency_alert': (EmergencyAlert, 'timestamp'),
+}
+ARCHIVE_CHUNK_SIZE = 500
+
+SummaryRow = namedtuple('SummaryRow', ('bucket',) + ROLLUP_FIELDS)
+
+def archive_schema(model):
+    """(column, kind) pairs describing how each column of a model is archived"""
+    schema = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, db.Boolean):
+            kind = 'bool'
+        elif isinstance(column.type, db.DateTime):
+            kind = 'datetime'
+        elif isinstance(column.type, db.Float):
+            kind = 'float'
+        elif isinstance(column.type, db.Integer):
+            kind = 'int'
+        else:
+            kind = 'str'
+        schema.append((column.name, kind))
+    return tuple(schema)
+
+def archive_cutoff(horizon_days=None):
+    """Start of the month containing the horizon; rows before it are archived"""
+    horizon = current_app.config['ARCHIVE_HORIZON_DAYS'] if horizon_days is None else horizon_days
+    first = (datetime.utcnow() - timedelta(days=horizon)).date().replace(day=1)
+    return datetime.combine(first, datetime.min.time())
+
+def month_start(month):
+    return datetime.strptime(month, '%Y-%m')
+
+def archive_filters(table):
+    """Extra conditions a hot row must meet before it may be archived"""
+    if table == 'emergency_alert':
+        # Active alerts and alerts with undelivered notifications stay hot
+        undelivered = db.exists().where(NotificationOutbox.alert_id == EmergencyAlert.id,
+                                        NotificationOutbox.status.in_(('pending', 'sending')))
+        return [EmergencyAlert.status == 'resolved', ~undelivered]
+    return []
+
+def archive_month(table, month, cutoff):
+    """Move one month of eligible hot rows into that month's archive file"""
+    model, date_field = ARCHIVED_TABLES[table]
+    schema = archive_schema(model)
+    date_column = getattr(model, date_field)
+    start = month_start(month)
+    end = min((start + timedelta(days=32)).replace(day=1), cutoff)
+    rows = db.session.query(*[model.__table__.c[name] for name, _ in schema]).filter(
+        date_column >= start, date_column < end, *archive_filters(table)).all()
+    if not rows:
+        return 0
+    
+    entry = db.session.get(ArchivePartition, (table, month))
+    old_file = entry.file_name if entry else None
+    parts = [encode_columns(rows, schema)]
+    if entry:
+        parts.insert(0, archive_store.load(table, entry.file_name, schema, date_field).columns)
+    arrays = concat_columns(parts, schema)
+    # A row archived again after a restore keeps only its newest copy
+    ids = arrays['id']
+    _, last = np.unique(ids[::-1], return_index=True)
+    arrays = take_columns(arrays, np.sort(len(ids) - 1 - last))
+    
+    version = entry.version + 1 if entry else 1
+    file_name = archive_store.write(table, month, version, arrays, schema, date_field)
+    try:
+        moved = [row[0] for row in rows]
+        for i in range(0, len(moved), ARCHIVE_CHUNK_SIZE):
+            chunk = moved[i:i + ARCHIVE_CHUNK_SIZE]
+            if table == 'emergency_alert':
+                NotificationOutbox.query.filter(NotificationOutbox.alert_id.in_(chunk)).delete(
+                    synchronize_session=False)
+            model.query.filter(model.id.in_(chunk)).delete(synchronize_session=False)
+        entry = entry or ArchivePartition(table_name=table, month=month)
+        entry.version = version
+        entry.file_name = file_name
+        entry.row_count = len(arrays['id'])
+        entry.archived_at = datetime.utcnow()
+        db.session.add(entry)
+        db.session.commit()
+    except Exception:
+        # The catalog still points at the previous file, so the new one is unused
+        db.session.rollback()
+        archive_store.remove(table, file_name)
+        raise
+    if old_file:
+        archive_store.remove(table, old_file)
+    return len(rows)
+
+def archive_old_rows(horizon_days=None):
+    """Compact hot rows older than the archive horizon into monthly archive files"""
+    cutoff = archive_cutoff(horizon_days)
+    moved = {}
+    for table, (model, date_field) in ARCHIVED_TABLES.items():
+        date_column = getattr(model, date_field)
+        months = db.session.query(date_bucket(date_column, 'month')).filter(
+            date_column < cutoff, *archive_filters(table)).distinct()
+        moved[table] = sum(archive_month(table, month, cutoff) for (month,) in sorted(months))
+    return moved
+
+def archive_partitions(table, start=None, end=None):
+    """Catalog entries of a table whose month overlaps [start, end)"""
+    query = ArchivePartition.query.filter_by(table_name=table)
+    if start is not None:
+        query = query.filter(ArchivePartition.month >= start.strftime('%Y-%m'))
+    if end is not None:
+        query = query.filter(ArchivePartition.month <= (end - timedelta(microseconds=1)).strftime('%Y-%m'))
+    return query.order_by(ArchivePartition.month).all()
+
+def load_partition(table, entry):
+    model, date_field = ARCHIVED_TABLES[table]
+    return archive_store.load(table, entry.file_name, archive_schema(model), date_field)
+
+def archived_rows(table, user_id, start=None, end=None, vehicle_ids=None, fields=None):
+    """Archived rows of one user dated within [start, end), as dicts"""
+    rows = []
+    for entry in archive_partitions(table, start, end):
+        partition = load_partition(table, entry)
+        rows.extend(partition.to_dicts(partition.select(user_id, start, end, vehicle_ids), fields))
+    return rows
+
+def iter_archived_rows(table, user_id, start=None, before=None, vehicle_ids=None, fields=None):
+    """Archived rows of one user dated from start and sorting before the (date, id) cursor, newest first.
+
+    Partitions are read one month at a time, newest first, and rows are
+    built STREAM_BATCH_SIZE at a time, so a caller that stops early never
+    materializes the rest.
+    """
+    end = before[0] + timedelta(microseconds=1) if before else None
+    for entry in reversed(archive_partitions(table, start, end)):
+        partition = load_partition(table, entry)
+        index = partition.select(user_id, start, vehicle_ids=vehicle_ids, before=before)[::-1]
+        for i in range(0, len(index), STREAM_BATCH_SIZE):
+            yield from partition.to_dicts(index[i:i + STREAM_BATCH_SIZE], fields)
+
+def user_vehicle_ids(user_id, vehicle_id=None):
+    """The user's current vehicle ids (or just vehicle_id if it is theirs); archived rows of
+    deleted vehicles are hidden by filtering on these"""
+    query = db.session.query(Vehicle.id).filter(Vehicle.user_id == user_id)
+    if vehicle_id:
+        query = query.filter(Vehicle.id == vehicle_id)
+    return [row[0] for row in query]
+
+def archived_summary_rows(user_id, start, end, vehicle_ids, group_by):
+    """Summary rows for archived energy logs in [start, end), bucketed like date_bucket()"""
+    if start >= end:
+        return []
+    totals = {}
+    fields = ('vehicle_id', 'date', 'energy_consumed', 'distance_traveled', 'cost', 'co2_emissions')
+    for row in archived_rows('energy_log', user_id, start, end, vehicle_ids, fields):
+        day = row['date'].date()
+        if group_by == 'vehicle':
+            bucket = row['vehicle_id']
+        elif group_by == 'week':
+            bucket = (day - timedelta(days=day.weekday())).isoformat()
+        elif group_by == 'month':
+            bucket = day.strftime('%Y-%m')
+        elif group_by:
+            bucket = day.isoformat()
+        else:
+            bucket = None
+        acc = totals.setdefault(bucket, [0.0, 0.0, 0.0, 0.0, 0])
+        acc[0] += row['energy_consumed']
+        acc[1] += row['distance_traveled']
+        acc[2] += row['cost']
+        acc[3] += row['co2_emissions'] or 0
+        acc[4] += 1
+    return [SummaryRow(bucket, *acc) for bucket, acc in totals.items()]
+
+def accumulate_archived_rollups(buckets):
+    """Add archived energy logs of existing vehicles to rollup buckets, one partition at a time"""
+    live = np.array([row[0] for row in db.session.query(Vehicle.id)], dtype=np.int64)
+    for entry in archive_partitions('energy_log'):
+        columns = load_partition('energy_log', entry).columns
+        keep = np.isin(columns['vehicle_id'], live)
+        days = columns['date'][keep] // 86_400_000_000
+        keys = np.column_stack([columns['user_id'][keep], columns['vehicle_id'][keep], days])
+        if not len(keys):
+            continue
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        sums = [np.bincount(inverse, weights=np.nan_to_num(columns[name][keep]), minlength=len(groups))
+                for name in ('energy_consumed', 'distance_traveled', 'cost', 'co2_emissions')]
+        counts = np.bincount(inverse, minlength=len(groups))
+        for i, (user_id, vehicle_id, day) in enumerate(groups.tolist()):
+            accumulate_rollups(buckets, user_id, vehicle_id, date(1970, 1, 1) + timedelta(days=day),
+                               [sums[0][i], sums[1][i], sums[2][i], sums[3][i], int(counts[i])])
+
+def export_archive(table, out, month=None):
+    """Write archived rows as NDJSON to a binary file object; returns the row count"""
+    count = 0
+    for entry in archive_partitions(table):
+        if month and entry.month != month:
+            continue
+        partition = load_partition(table, entry)
+        for row in partition.to_dicts(np.arange(len(partition))):
+            out.write(dumps(row) + b'\n')
+            count += 1
+    return count
+
+def restore_rows(table, rows):
+    """Insert archived row dicts back into the hot table, skipping ids already there"""
+    model, _ = ARCHIVED_TABLES[table]
+    restored = 0
+    for i in range(0, len(rows), ARCHIVE_CHUNK_SIZE):
+        chunk = rows[i:i + ARCHIVE_CHUNK_SIZE]
+        present = {row[0] for row in db.session.query(model.id).filter(model.id.in_([r['id'] for r in chunk]))}
+        chunk = [r for r in chunk if r['id'] not in present]
+        if table == 'energy_log' and chunk:
+            # Logs of deleted vehicles cannot come back
+            live = {row[0] for row in db.session.query(Vehicle.id).filter(
+                Vehicle.id.in_({r['vehicle_id'] for r in chunk}))}
+            chunk = [r for r in chunk if r['vehicle_id'] in live]
+        if chunk:
+            db.session.execute(db.insert(model), chunk)
+            restored += len(chunk)
+    return restored
+
+def restore_archive(table, month=None):
+    """Move archived months back into the hot table and drop their files"""
+    restored = 0
+    for entry in archive_partitions(table):
+        if month and entry.month != month:
+            continue
+        partition = load_partition(table, entry)
+        restored += restore_rows(table, partition.to_dicts(np.arange(len(partition))))
+        db.session.delete(entry)
+        db.session.commit()
+        archive_store.remove(table, entry.file_name)
+    return restored
+
+def restore_archive_file(table, path):
+    """Insert rows from an export_archive() NDJSON file (optionally .gz) into the hot table"""
+    model, _ = ARCHIVED_TABLES[table]
+    datetimes = [name for name, kind in archive_schema(model) if kind == 'datetime']
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        rows = []
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                for name in datetimes:
+                    if row.get(name):
+                        row[name] = datetime.fromisoformat(row[name])
+                rows.append(row)
+    restored = restore_rows(table, rows)
+    db.session.commit()
+    return restored
+
+@bp.cli.command('archive-old-rows')
+@click.option('--horizon-days', type=int, help='Defaults to ARCHIVE_HORIZON_DAYS')
+def archive_old_rows_command(horizon_days):
+    """Compact energy logs and resolved alerts past the horizon into archive files"""
+    moved = archive_old_rows(horizon_days)
+    print(', '.join(f'{table}: {count} rows archived' for table, count in moved.items()))
+
+@bp.cli.command('export-archive')
+@click.argument('table', type=click.Choice(sorted(ARCHIVED_TABLES)))
+@click.argument('output')
+@click.option('--month', help='YYYY-MM; defaults to every archived month')
+def export_archive_command(table, output, month):
+    """Export archived rows as NDJSON (gzip-compressed when OUTPUT ends in .gz)"""
+    opener = gzip.open if output.endswith('.gz') else open
+    with opener(output, 'wb') as f:
+        count = export_archive(table, f, month)
+    print(f"Exported {count} archived {table} rows to {output}")
+
+@bp.cli.command('restore-archive')
+@click.argument('table', type=click.Choice(sorted(ARCHIVED_TABLES)))
+@click.option('--month', help='YYYY-MM; defaults to every archived month')
+@click.option('--input', 'input_path', help='Restore from an export-archive file instead')
+def restore_archive_command(table, month, input_path):
+    """Move archived rows back into the hot table"""
+    count = restore_archive_file(table, input_path) if input_path else restore_archive(table, month)
+    print(f"Restored {count} {table} rows")
+
+# ===== GEO HELPERS =====
+
+MIN_SEARCH_RADIUS_KM = 0.1
+DEFAULT_STATION_RADIUS_KM = 50
+MAX_STATION_RADIUS_KM = 500
+DEFAULT_STATION_LIMIT = 50
+MAX_STATION_LIMIT = 500
+
+# Station types that can refuel or recharge each vehicle type
+STATION_TYPES_FOR_VEHICLE = {
+    'ev': ('EV_Charging',),
+    'petrol': ('Petrol',),
+    'cnc': ('CNC', 'Petrol'),  # OSM fuel stations selling CNG alongside petrol are typed Petrol
+    'hybrid': ('EV_Charging', 'Petrol', 'Hybrid'),  # Hybrid: stations added by hand offering both
+}
+
+def radius_arg(default, minimum, maximum):
+    """radius_km from the query string clamped to [minimum, maximum]; ValueError when it is not finite"""
+    radius_km = request.args.get('radius_km', default, type=float)
+    if not np.isfinite(radius_km):
+        raise ValueError('radius_km must be a finite number')
+    return min(max(radius_km, minimum), maximum)
+
+def filter_by_bounding_box(query, lat_column, lon_column, latitude, longitude, radius_km):
+    """Restrict a query to rows inside the bounding box of a search circle"""
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    query = query.filter(lat_column.between(min_lat, max_lat))
+    return query.filter(db.or_(*[lon_column.between(lo, hi) for lo, hi in lon_ranges]))
+
+def nearest_stations(query, latitude, longitude, radius_km, limit, fields):
+    """Station dicts from query within radius_km, nearest first, with distance_km"""
+    # Prune with an indexed bounding box, then rank candidates exactly
+    candidates = filter_by_bounding_box(query, Station.latitude, Station.longitude,
+                                        latitude, longitude, radius_km)
+    points = GeoPoints.from_rows(candidates.with_entities(Station.id, Station.latitude, Station.longitude))
+    ids, distances = points.nearest(latitude, longitude, limit, radius_km=radius_km)
+    
+    ids = ids.tolist()
+    columns = ('id',) + tuple(f for f in fields if f != 'id')
+    rows = select_columns(Station.query.filter(Station.id.in_(ids)), Station, columns).all() if ids else []
+    by_id = {row[0]: dict(zip(columns, row)) for row in rows}
+    
+    results = []
+    for i, d in zip(ids, distances.tolist()):
+        item = {f: by_id[i][f] for f in fields}
+        item['distance_km'] = round(d, 3)
+        results.append(item)
+    return results
+
 # ===== STATION FINDER ROUTES =====
 
-@app.route('/api/stations', methods=['GET', 'POST'])
+@bp.route('/api/stations', methods=['GET', 'POST'])
+@cached_response(lambda: STATIONS_CACHE_NAMESPACE)
 def stations():
-    """Get nearby stations or add a new station"""
+    """Get nearby stations or add a new station.
+
+    With latitude and longitude, GET returns up to limit stations within
+    radius_km (default 50, at most 500), nearest first; stations further
+    away are not returned even when fewer than limit are in range.
+    """
     if request.method == 'GET':
         station_type = request.args.get('station_type')
         latitude = request.args.get('latitude', type=float)
         longitude = request.args.get('longitude', type=float)
+        limit = min(max(request.args.get('limit', DEFAULT_STATION_LIMIT, type=int), 1), MAX_STATION_LIMIT)
+        try:
+            radius_km = radius_arg(DEFAULT_STATION_RADIUS_KM, MIN_SEARCH_RADIUS_KM, MAX_STATION_RADIUS_KM)
+            fields = selected_fields(Station)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         query = Station.query
         if station_type:
             query = query.filter_by(station_type=station_type)
         
-        all_stations = query.all()
-        
-        # Simple distance calculation (can be improved with geopy)
-        if latitude and longitude:
-            def distance(lat1, lon1, lat2, lon2):
-                from math import radians, sin, cos, sqrt, atan2
-                R = 6371  # Earth radius in km
-                lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-                dlat = lat2 - lat1
-                dlon = lon2 - lon1
-                a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-                c = 2 * atan2(sqrt(a), sqrt(1-a))
-                return R * c
-            
-            all_stations.sort(key=lambda s: distance(latitude, longitude, s.latitude, s.longitude))
+        if latitude is None or longitude is None:
+            return jsonify(rows_to_dicts(select_columns(query, Station, fields).limit(limit).all(), fields)), 200
         
-        return jsonify([s.to_dict() for s in all_stations[:50]]), 200
+        # SQL only until this worker's station index has loaded
+        if sync_station_index():
+            found = indexed_nearest_stations(station_type or None, latitude, longitude, radius_km, limit, fields)
+            return jsonify(found), 200
+        return jsonify(nearest_stations(query, latitude, longitude, radius_km, limit, fields)), 200
     
     elif request.method == 'POST':
         try:
@@ -479,29 +2052,157 @@ def stations():
             )
             db.session.add(station)
             db.session.commit()
+            invalidate_cache(STATIONS_CACHE_NAMESPACE)
+            if None in station_indexes:
+                index_station(station)
             return jsonify(station.to_dict()), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+# ===== OPENSTREETMAP STATION PROXY =====
+
+MIN_OSM_RADIUS_KM = 0.1
+DEFAULT_OSM_RADIUS_KM = 5
+MAX_OSM_RADIUS_KM = 25
+OSM_UPSERT_CHUNK = 500
+OSM_FETCH_WORKERS = 4  # stale tiles fetched in parallel per request
+
+overpass_client = None  # configured by create_app()
+osm_tile_flight = SingleFlight()
+
+def merge_osm_stations(bbox, elements):
+    """Upsert stations from one tile's Overpass elements and drop ones no longer mapped.
+
+    Returns (stations upserted, ids of stations dropped).
+    """
+    rows = {}
+    now = datetime.utcnow()
+    for element in elements:
+        row = element_to_station(element)
+        if row is not None:
+            rows[row['osm_id']] = dict(row, updated_at=now)
+    rows = list(rows.values())
+    
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    for start in range(0, len(rows), OSM_UPSERT_CHUNK):
+        stmt = insert(Station).values(rows[start:start + OSM_UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['osm_id'],
+            set_={field: getattr(stmt.excluded, field) for field in rows[0] if field != 'osm_id'}
+        )
+        db.session.execute(stmt)
+    
+    south, west, north, east = bbox
+    stale = Station.query.filter(
+        Station.osm_id.isnot(None), Station.latitude.between(south, north), Station.longitude.between(west, east))
+    if rows:
+        stale = stale.filter(Station.osm_id.notin_([row['osm_id'] for row in rows]))
+    dropped = [station_id for (station_id,) in stale.with_entities(Station.id)]
+    if dropped:
+        Station.query.filter(Station.id.in_(dropped)).delete(synchronize_session=False)
+    return len(rows), dropped
+
+def stale_osm_tiles(zoom, tiles):
+    """The tiles that were never fetched or whose copy is older than OSM_TILE_TTL"""
+    xs, ys = [x for x, _ in tiles], [y for _, y in tiles]
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['OSM_TILE_TTL'])
+    fresh = set(db.session.query(OsmTile.x, OsmTile.y).filter(
+        OsmTile.zoom == zoom, OsmTile.x.between(min(xs), max(xs)), OsmTile.y.between(min(ys), max(ys)),
+        OsmTile.fetched_at > cutoff
+    ).all())
+    return [tile for tile in tiles if tile not in fresh]
+
+def refresh_osm_tile(zoom, x, y):
+    """Fetch a tile from Overpass unless its cached copy is still fresh.
+
+    Returns True when Overpass was queried. A failed fetch falls back to
+    the stale copy if the tile was ever fetched before.
+    """
+    tile = db.session.get(OsmTile, (zoom, x, y))
+    if tile is not None and tile.fetched_at > datetime.utcnow() - timedelta(seconds=current_app.config['OSM_TILE_TTL']):
+        return False
+    bbox = tile_bbox(x, y, zoom)
+    try:
+        elements = overpass_client.query(build_query(bbox))
+    except (OSError, ValueError) as e:
+        if tile is None:
+            raise
+        current_app.logger.warning('Overpass refresh of tile %s/%s/%s failed, serving stale copy: %s', zoom, x, y, e)
+        return False
+    
+    count, dropped = merge_osm_stations(bbox, elements)
+    tile = tile or OsmTile(zoom=zoom, x=x, y=y)
+    tile.station_count = count
+    tile.fetched_at = datetime.utcnow()
+    db.session.add(tile)
+    db.session.commit()
+    unindex_stations(dropped)
+    return True
+
+def refresh_osm_tile_shared(app, zoom, x, y):
+    """refresh_osm_tile() for app from a worker thread, coalesced with concurrent callers"""
+    def refresh():
+        with app.app_context():
+            return refresh_osm_tile(zoom, x, y)
+    return osm_tile_flight.do((zoom, x, y), refresh)
+
+@bp.route('/api/stations/osm', methods=['GET'])
+def osm_stations():
+    """Nearby stations from OpenStreetMap, fetched per map tile through a shared cache"""
+    latitude = request.args.get('latitude', type=float)
+    longitude = request.args.get('longitude', type=float)
+    if latitude is None or longitude is None:
+        return jsonify({'error': 'latitude and longitude are required'}), 400
+    try:
+        radius_km = radius_arg(DEFAULT_OSM_RADIUS_KM, MIN_OSM_RADIUS_KM, MAX_OSM_RADIUS_KM)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(max(request.args.get('limit', DEFAULT_STATION_LIMIT, type=int), 1), MAX_STATION_LIMIT)
+    vehicle_type = (request.args.get('vehicle_type') or '').lower()
+    
+    try:
+        # Requests snap to fixed tiles so nearby users share the same upstream fetches
+        zoom = current_app.config['OSM_TILE_ZOOM']
+        stale = stale_osm_tiles(zoom, tiles_for_radius(*bounding_box(latitude, longitude, radius_km), zoom))
+        if stale:
+            app = current_app._get_current_object()
+            with ThreadPoolExecutor(max_workers=min(len(stale), OSM_FETCH_WORKERS)) as pool:
+                fetched = list(pool.map(lambda tile: refresh_osm_tile_shared(app, zoom, *tile), stale))
+            if any(fetched):
+                invalidate_cache(STATIONS_CACHE_NAMESPACE)
+                sync_station_index(force=True)
+        
+        query = Station.query.filter(Station.osm_id.isnot(None))
+        if vehicle_type in STATION_TYPES_FOR_VEHICLE:
+            query = query.filter(Station.station_type.in_(STATION_TYPES_FOR_VEHICLE[vehicle_type]))
+        return jsonify(nearest_stations(query, latitude, longitude, radius_km, limit, Station.api_fields)), 200
+    except (OSError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Station lookup failed upstream: {e}'}), 502
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # ===== ROUTE OPTIMIZATION ROUTES =====
 
-@app.route('/api/routes', methods=['GET', 'POST'])
+@bp.route('/api/routes', methods=['GET', 'POST'])
 @login_required
 def routes():
     """Get routes or create a new route"""
     if request.method == 'GET':
         vehicle_id = request.args.get('vehicle_id')
-        query = Route.query
+        query = Route.query.join(Vehicle).filter(Vehicle.user_id == current_user.id)
         if vehicle_id:
-            query = query.filter_by(vehicle_id=vehicle_id)
+            query = query.filter(Route.vehicle_id == vehicle_id)
         
-        all_routes = query.all()
-        return jsonify([r.to_dict() for r in all_routes]), 200
+        return keyset_response(query, Route, 'timestamp')
     
     elif request.method == 'POST':
         try:
             data = request.get_json()
+            if Vehicle.query.filter_by(id=data['vehicle_id'], user_id=current_user.id).first() is None:
+                return jsonify({'error': 'Vehicle not found'}), 404
             route = Route(
                 vehicle_id=data['vehicle_id'],
                 start_location=data['start_location'],
@@ -517,15 +2218,351 @@ def routes():
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+# ===== ROUTE PLANNING =====
+
+ROUTE_MAX_SNAP_KM = 2  # start/end must be this close to a road graph node
+ROUTE_STOP_DETOUR_KM = 3
+ROUTE_RESERVE_FRACTION = 0.1  # arrive at every stop with this share of a full tank/battery left
+
+road_graph = None
+road_graph_lock = threading.Lock()
+
+def get_road_graph():
+    """Load the preprocessed road graph on first use; None when none is configured"""
+    global road_graph
+    if road_graph is None:
+        with road_graph_lock:
+            path = current_app.config['ROAD_GRAPH_PATH']
+            if road_graph is None and path and os.path.exists(path):
+                road_graph = RoadGraph.load(path)
+    return road_graph
+
+def vehicle_ranges(vehicle, efficiency):
+    """(current, full) range in km for a vehicle, using the learned efficiency if known"""
+    vehicle_type = vehicle.vehicle_type.lower()
+    current = calculate_remaining_range(vehicle_type, vehicle.fuel_capacity, vehicle.current_fuel,
+                                        vehicle.battery_capacity, vehicle.current_battery, efficiency)
+    full = calculate_remaining_range(vehicle_type, vehicle.fuel_capacity, vehicle.fuel_capacity,
+                                     vehicle.battery_capacity, vehicle.battery_capacity, efficiency)
+    return current['range_km'], full['range_km']
+
+def parse_point(data, key):
+    """Read {"latitude", "longitude"} from a request body field"""
+    point = data.get(key)
+    if not isinstance(point, dict):
+        raise ValueError(f'{key} must be an object with latitude and longitude')
+    return float(point['latitude']), float(point['longitude'])
+
+@bp.route('/api/routes/plan', methods=['POST'])
+@login_required
+def plan_vehicle_route():
+    """Plan an energy-aware route, with charging/refuelling stops when range runs short"""
+    graph = get_road_graph()
+    if graph is None:
+        return jsonify({'error': 'No road graph is loaded'}), 503
+    try:
+        data = request.get_json() or {}
+        route_type = data.get('route_type', 'efficient')
+        if route_type not in ROUTE_TYPES:
+            return jsonify({'error': f"route_type must be one of: {', '.join(ROUTE_TYPES)}"}), 400
+        try:
+            start = parse_point(data, 'start')
+            end = parse_point(data, 'end')
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        vehicle = Vehicle.query.filter_by(id=data.get('vehicle_id'), user_id=current_user.id).first()
+        if vehicle is None:
+            return jsonify({'error': 'Vehicle not found'}), 404
+        vehicle_type = vehicle.vehicle_type.lower()
+        
+        source, source_km = graph.nearest_node(*start)
+        target, target_km = graph.nearest_node(*end)
+        if max(source_km, target_km) > ROUTE_MAX_SNAP_KM:
+            return jsonify({'error': 'Start or end is outside the road network'}), 400
+        
+        efficiency = historical_efficiency([vehicle.id]).get(vehicle.id)
+        range_km, full_range_km = vehicle_ranges(vehicle, efficiency)
+        
+        # Only stations around the trip can be useful stops
+        mid_lat, mid_lon = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+        radius = haversine_km(*start, *end) / 2 + ROUTE_STOP_DETOUR_KM
+        candidates = filter_by_bounding_box(
+            Station.query.filter(Station.station_type.in_(STATION_TYPES_FOR_VEHICLE.get(vehicle_type, ()))),
+            Station.latitude, Station.longitude, mid_lat, mid_lon, radius)
+        stations = GeoPoints.from_rows(candidates.with_entities(Station.id, Station.latitude, Station.longitude))
+        
+        try:
+            legs, stops = plan_route(graph, source, target, route_type, range_km, full_range_km, stations,
+                                     reserve_km=full_range_km * ROUTE_RESERVE_FRACTION,
+                                     detour_km=ROUTE_STOP_DETOUR_KM)
+        except RouteNotFound as e:
+            return jsonify({'error': str(e)}), 422
+        
+        # Energy weights are km of reference driving; the vehicle's efficiency turns them into units
+        km_per_unit = efficiency or REFERENCE_EFFICIENCY.get(vehicle_type, 1)
+        leg_results = []
+        for leg in legs:
+            distance, minutes, energy = graph.summarize(leg.edges)
+            leg_results.append({'distance_km': round(distance, 2), 'duration_min': round(minutes, 1),
+                                'estimated_energy': round(energy / km_per_unit, 2)})
+        
+        station_rows = {s.id: s for s in Station.query.filter(Station.id.in_([s['station_id'] for s in stops]))}
+        path = [legs[0].nodes[0]] + [node for leg in legs for node in leg.nodes[1:]]
+        result = {
+            'route_type': route_type,
+            'distance_km': round(sum(leg['distance_km'] for leg in leg_results), 2),
+            'duration_min': round(sum(leg['duration_min'] for leg in leg_results), 1),
+            'estimated_energy': round(sum(leg['estimated_energy'] for leg in leg_results), 2),
+            'unit': get_unit_for_vehicle_type(vehicle_type),
+            'range_km': range_km,
+            'stops': [dict(station_rows[s['station_id']].to_dict(), arrival_range_km=s['arrival_range_km'])
+                      for s in stops],
+            'legs': leg_results,
+            'path': graph.coordinates(path)
+        }
+        
+        if data.get('save'):
+            route = Route(
+                vehicle_id=vehicle.id,
+                start_location=data.get('start_location') or f'{start[0]:.6f},{start[1]:.6f}',
+                end_location=data.get('end_location') or f'{end[0]:.6f},{end[1]:.6f}',
+                distance=result['distance_km'],
+                estimated_energy=result['estimated_energy'],
+                route_type=route_type
+            )
+            db.session.add(route)
+            db.session.commit()
+            result['route'] = route.to_dict()
+        return jsonify(result), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.cli.command('build-road-graph')
+@click.argument('source', required=False)
+@click.option('--synthetic', metavar='ROWSxCOLS', help='Generate a grid city instead of reading SOURCE')
+@click.option('--landmarks', default=8, show_default=True, help='ALT landmarks to precompute')
+@click.option('--output', help='Defaults to ROAD_GRAPH_PATH')
+def build_road_graph_command(source, synthetic, landmarks, output):
+    """Preprocess an OSM (.osm) or JSON road graph for route planning"""
+    started = time.perf_counter()
+    if synthetic:
+        rows, cols = (int(n) for n in synthetic.lower().split('x'))
+        graph = synthetic_city(rows, cols)
+    elif source:
+        graph = RoadGraph.load(source)
+    else:
+        raise click.UsageError('Pass a SOURCE file or --synthetic ROWSxCOLS')
+    graph.preprocess(landmarks=landmarks)
+    graph.save(output or current_app.config['ROAD_GRAPH_PATH'])
+    print(f"Built road graph with {len(graph)} nodes and {graph.edge_count} edges "
+          f"in {time.perf_counter() - started:.1f}s")
+
+# ===== EMERGENCY GEO INDEX =====
+
+# Active alerts and stations live in per-process geohash indexes, so an SOS is answered
+# without a spatial query. Alerts raised or resolved in other workers are picked up by
+# polling at most GEO_INDEX_SYNC_SECONDS late, stations added or changed by polling
+# updated_at every STATION_INDEX_SYNC_SECONDS. Stations are loaded in full only on a
+# background thread; until that finishes lookups use the SQL bounding-box path.
+alert_index = GeohashIndex()
+station_indexes = {}  # station_type -> GeohashIndex, None -> every station; replaced whole on reload
+geo_index_state = {'alerts_synced': None, 'alerts_checked': 0.0, 'stations_synced': None, 'stations_checked': 0.0,
+                   'stations_loading': False, 'stations_generation': None}
+alert_index_lock = threading.Lock()
+station_index_lock = threading.Lock()
+station_load_lock = threading.Lock()
+# The station index carries every API field, so station searches never go back to the table
+STATION_INDEX_COLUMNS = tuple(getattr(Station, field) for field in Station.api_fields)
+SOS_STATION_FIELDS = ('id', 'name', 'station_type', 'latitude', 'longitude', 'address', 'phone')
+
+GEO_SYNC_OVERLAP = timedelta(seconds=5)  # re-read window for rows committed after their timestamp
+DEFAULT_NEARBY_ALERT_LIMIT = 50
+MAX_NEARBY_ALERT_RADIUS_KM = 50
+
+metrics.gauge('smart_active_alerts_indexed', "Active emergency alerts in this process's geo index",
+              callback=lambda: {(): len(alert_index)})
+metrics.gauge('smart_stations_indexed', "Stations in this process's geo index",
+              callback=lambda: {(): len(station_indexes[None])} if None in station_indexes else {})
+
+def index_alert(alert_id, latitude, longitude, alert_type, timestamp, user_id):
+    if latitude is not None and longitude is not None:
+        alert_index.add(alert_id, latitude, longitude, (alert_type, timestamp, user_id))
+
+def sync_due(synced_key, checked_key, interval):
+    state = geo_index_state
+    return state[synced_key] is None or time.monotonic() - state[checked_key] >= interval
+
+def sync_alert_index():
+    """Catch the alert index up with alerts raised or resolved since the last sync.
+
+    Only the first load makes callers wait; after that one thread syncs
+    while the others answer from the index as it is.
+    """
+    state = geo_index_state
+    if not sync_due('alerts_synced', 'alerts_checked', current_app.config['GEO_INDEX_SYNC_SECONDS']):
+        return
+    if not alert_index_lock.acquire(blocking=state['alerts_synced'] is None):
+        return
+    try:
+        if not sync_due('alerts_synced', 'alerts_checked', current_app.config['GEO_INDEX_SYNC_SECONDS']):
+            return
+        synced = datetime.utcnow()
+        raised = db.session.query(
+            EmergencyAlert.id, EmergencyAlert.latitude, EmergencyAlert.longitude, EmergencyAlert.alert_type,
+            EmergencyAlert.timestamp, EmergencyAlert.user_id
+        ).filter(EmergencyAlert.status == 'active', EmergencyAlert.latitude.isnot(None),
+                 EmergencyAlert.longitude.isnot(None))
+        since = state['alerts_synced']
+        if since is not None:
+            raised = raised.filter(EmergencyAlert.timestamp >= since - GEO_SYNC_OVERLAP)
+        for row in raised:
+            index_alert(*row)
+        if since is not None:
+            resolved = db.session.query(EmergencyAlert.id).filter(
+                EmergencyAlert.resolved_at >= since - GEO_SYNC_OVERLAP)
+            for (alert_id,) in resolved:
+                alert_index.remove(alert_id)
+        state['alerts_synced'] = synced
+        state['alerts_checked'] = time.monotonic()
+    finally:
+        alert_index_lock.release()
+
+def index_station(row, indexes=None):
+    """Insert or move one station (a row of STATION_INDEX_COLUMNS or a Station) in the station indexes"""
+    indexes = station_indexes if indexes is None else indexes
+    data = {field: getattr(row, field) for field in Station.api_fields if field != 'id'}
+    for station_type, index in list(indexes.items()):
+        if station_type is not None and station_type != row.station_type:
+            index.remove(row.id)
+    indexes.setdefault(None, GeohashIndex()).add(row.id, row.latitude, row.longitude, data)
+    indexes.setdefault(row.station_type, GeohashIndex()).add(row.id, row.latitude, row.longitude, data)
+
+def unindex_stations(station_ids):
+    for index in list(station_indexes.values()):
+        for station_id in station_ids:
+            index.remove(station_id)
+
+def load_station_index():
+    """Build the station indexes from the whole table and swap them in"""
+    global station_indexes
+    synced = datetime.utcnow()
+    generation = response_cache.generation(STATIONS_CACHE_NAMESPACE)
+    indexes = {None: GeohashIndex()}
+    for row in db.session.query(*STATION_INDEX_COLUMNS):
+        index_station(row, indexes)
+    station_indexes = indexes
+    # Changes committed while the table was read are caught by the next poll's overlap
+    geo_index_state['stations_synced'] = synced
+    geo_index_state['stations_checked'] = 0.0
+    geo_index_state['stations_generation'] = generation
+
+def start_station_index_load():
+    """Run load_station_index() on a background thread unless one is already running"""
+    state = geo_index_state
+    with station_load_lock:
+        if state['stations_loading']:
+            return
+        state['stations_loading'] = True
+    
+    app = current_app._get_current_object()
+    def load():
+        try:
+            with app.app_context():
+                load_station_index()
+        except Exception as e:
+            app.logger.error('Loading the station index failed: %s', e)
+        finally:
+            state['stations_loading'] = False
+    threading.Thread(target=load, name='station-index-load', daemon=True).start()
+
+def sync_station_index(force=False):
+    """Apply stations added or changed in any worker since the last poll; False while not yet loaded.
+
+    The first call starts a full load in the background. After that one
+    caller per STATION_INDEX_SYNC_SECONDS reads rows by updated_at while the
+    others answer from the index as it is; force, or a station write in any
+    worker (seen as a new stations cache generation), polls at once. Deletions
+    leave no row to read, so when the table's row count no longer matches
+    the index a background reload follows.
+    """
+    state = geo_index_state
+    if state['stations_synced'] is None:
+        start_station_index_load()
+        return False
+    generation = response_cache.generation(STATIONS_CACHE_NAMESPACE)
+    if (not force and generation == state['stations_generation']
+            and time.monotonic() - state['stations_checked'] < current_app.config['STATION_INDEX_SYNC_SECONDS']):
+        return True
+    if not station_index_lock.acquire(blocking=False):
+        return True
+    try:
+        synced = datetime.utcnow()
+        for row in db.session.query(*STATION_INDEX_COLUMNS).filter(
+                Station.updated_at >= state['stations_synced'] - GEO_SYNC_OVERLAP):
+            index_station(row)
+        state['stations_synced'] = synced
+        state['stations_checked'] = time.monotonic()
+        state['stations_generation'] = generation
+        if db.session.query(db.func.count(Station.id)).scalar() != len(station_indexes[None]):
+            start_station_index_load()
+    finally:
+        station_index_lock.release()
+    return True
+
+def nearby_alerts(latitude, longitude, radius_km, limit=DEFAULT_NEARBY_ALERT_LIMIT, exclude=None):
+    """Active alerts within radius_km, nearest first; own marks the current user's alerts"""
+    sync_alert_index()
+    found = alert_index.within(latitude, longitude, radius_km, limit + 1)
+    return [{'id': alert_id, 'alert_type': alert_type, 'distance_km': round(distance, 3),
+             'timestamp': timestamp.isoformat(), 'own': user_id == current_user.id}
+            for alert_id, distance, (alert_type, timestamp, user_id) in found if alert_id != exclude][:limit]
+
+def nearest_responder_stations(latitude, longitude, station_types=None, limit=None):
+    """The nearest stations of station_types (any type when None), nearest first, with distance_km"""
+    limit = limit or current_app.config['SOS_NEAREST_STATIONS']
+    if not sync_station_index():
+        query = Station.query.filter(Station.station_type.in_(station_types)) if station_types else Station.query
+        return nearest_stations(query, latitude, longitude, current_app.config['SOS_STATION_MAX_RADIUS_KM'], limit,
+                                SOS_STATION_FIELDS)
+    indexes = station_indexes
+    found = []
+    for station_type in station_types or [None]:
+        index = indexes.get(station_type)
+        if index is not None:
+            found += index.nearest(latitude, longitude, limit,
+                                   max_radius_km=current_app.config['SOS_STATION_MAX_RADIUS_KM'])
+    found = heapq.nsmallest(limit, found, key=lambda item: item[1])
+    return [station_result(station_id, distance, data, SOS_STATION_FIELDS) for station_id, distance, data in found]
+
+def station_result(station_id, distance, data, fields):
+    """An API dict of fields from a station index entry, with distance_km"""
+    item = {field: station_id if field == 'id' else data[field] for field in fields}
+    item['distance_km'] = round(distance, 3)
+    return item
+
+def indexed_nearest_stations(station_type, latitude, longitude, radius_km, limit, fields):
+    """nearest_stations() answered from the station index; station_type None searches every type"""
+    index = station_indexes.get(station_type)
+    if index is None:
+        return []
+    return [station_result(station_id, distance, data, fields)
+            for station_id, distance, data in index.nearest(latitude, longitude, limit, max_radius_km=radius_km)]
+
 # ===== EMERGENCY ROUTES =====
 
-@app.route('/api/emergency-contacts', methods=['GET', 'POST'])
+@bp.route('/api/emergency-contacts', methods=['GET', 'POST'])
 @login_required
 def emergency_contacts():
     """Get emergency contacts or add a new one"""
     if request.method == 'GET':
-        contacts = EmergencyContact.query.filter_by(user_id=current_user.id).all()
-        return jsonify([c.to_dict() for c in contacts]), 200
+        try:
+            fields = selected_fields(EmergencyContact)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        rows = select_columns(EmergencyContact.query.filter_by(user_id=current_user.id),
+                              EmergencyContact, fields).all()
+        return jsonify(rows_to_dicts(rows, fields)), 200
     
     elif request.method == 'POST':
         try:
@@ -544,7 +2581,7 @@ def emergency_contacts():
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
-@app.route('/api/emergency-alert', methods=['POST'])
+@bp.route('/api/emergency-alert', methods=['POST'])
 @login_required
 def emergency_alert():
     """Create an emergency alert"""
@@ -559,15 +2596,107 @@ def emergency_alert():
             description=data.get('description')
         )
         db.session.add(alert)
+        db.session.flush()
+        enqueue_alert_notifications(alert)
         db.session.commit()
+        notification_dispatcher.wake()
         
-        # TODO: Send SMS/Email notifications to emergency contacts
-        
-        return jsonify(alert.to_dict()), 201
+        result = alert.to_dict()
+        if alert.latitude is not None and alert.longitude is not None:
+            index_alert(alert.id, alert.latitude, alert.longitude, alert.alert_type, alert.timestamp, alert.user_id)
+            result.update(sos_responders(alert))
+        return jsonify(result), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def sos_responders(alert):
+    """Nearest stations for the alert's vehicle and other active alerts nearby, e.g. a multi-vehicle incident"""
+    try:
+        station_types = None
+        if alert.vehicle_id is not None:
+            vehicle_type = db.session.query(Vehicle.vehicle_type).filter_by(
+                id=alert.vehicle_id, user_id=alert.user_id).scalar()
+            station_types = STATION_TYPES_FOR_VEHICLE.get((vehicle_type or '').lower())
+        return {
+            'nearest_stations': nearest_responder_stations(alert.latitude, alert.longitude, station_types),
+            'nearby_alerts': nearby_alerts(alert.latitude, alert.longitude,
+                                           current_app.config['ALERT_NEARBY_RADIUS_KM'], exclude=alert.id),
+        }
+    except Exception as e:
+        # The alert is already saved and its contacts notified; don't fail the SOS over the extras
+        current_app.logger.error('Responder lookup for alert %s failed: %s', alert.id, e)
+        return {}
+
+@bp.route('/api/emergency-alert/<int:alert_id>/resolve', methods=['POST'])
+@login_required
+def resolve_emergency_alert(alert_id):
+    """Mark an alert resolved; it stops showing up as a nearby alert"""
+    try:
+        alert = EmergencyAlert.query.filter_by(id=alert_id, user_id=current_user.id).first()
+        if alert is None:
+            return jsonify({'error': 'Not found'}), 404
+        if alert.status != 'resolved':
+            alert.status = 'resolved'
+            alert.resolved_at = datetime.utcnow()
+            db.session.commit()
+        alert_index.remove(alert.id)
+        return jsonify(alert.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/emergency-alerts/nearby', methods=['GET'])
+@login_required
+def emergency_alerts_nearby():
+    """Active alerts within radius_km and the nearest stations for vehicle_type"""
+    latitude = request.args.get('latitude', type=float)
+    longitude = request.args.get('longitude', type=float)
+    if latitude is None or longitude is None:
+        return jsonify({'error': 'latitude and longitude are required'}), 400
+    try:
+        radius_km = radius_arg(current_app.config['ALERT_NEARBY_RADIUS_KM'], MIN_SEARCH_RADIUS_KM,
+                               MAX_NEARBY_ALERT_RADIUS_KM)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(max(request.args.get('limit', DEFAULT_NEARBY_ALERT_LIMIT, type=int), 1), MAX_STATION_LIMIT)
+    vehicle_type = (request.args.get('vehicle_type') or '').lower()
+    try:
+        return jsonify({
+            'alerts': nearby_alerts(latitude, longitude, radius_km, limit),
+            'stations': nearest_responder_stations(latitude, longitude, STATION_TYPES_FOR_VEHICLE.get(vehicle_type)),
+        }), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/emergency-alert/<int:alert_id>/notifications', methods=['GET'])
+@login_required
+def emergency_alert_notifications(alert_id):
+    """Get delivery status of the notifications sent for an alert"""
+    alert = EmergencyAlert.query.filter_by(id=alert_id, user_id=current_user.id).first()
+    if alert is None:
+        # Archived alerts keep no notification rows
+        if any(row['id'] == alert_id for row in archived_rows('emergency_alert', current_user.id, fields=('id',))):
+            return jsonify([]), 200
+        return jsonify({'error': 'Not found'}), 404
+    notifications = NotificationOutbox.query.filter_by(alert_id=alert.id).order_by(NotificationOutbox.id).all()
+    return jsonify([n.to_dict() for n in notifications]), 200
+
+@bp.cli.command('drain-notifications')
+def drain_notifications_command():
+    """Send every due emergency notification and exit"""
+    count = notification_dispatcher.drain()
+    print(f"Dispatched {count} notifications")
+
+# ===== CACHE STATS =====
+
+@bp.route('/api/cache/stats', methods=['GET'])
+@login_required
+def cache_stats():
+    """Report response cache hit/miss/eviction counters"""
+    return jsonify(response_cache.stats()), 200
+
 # ===== UTILITY FUNCTIONS FOR DASHBOARD & RANGE CALCULATION =====
 
 def get_unit_for_vehicle_type(vehicle_type):
@@ -620,117 +2749,317 @@ def calculate_remaining_range(vehicle_type, fuel_capacity=None, current_fuel=Non
     
     return result
 
-def generate_random_series(length, base, variance):
-    """Generate a series of random numbers for mock dashboard data"""
-    series = []
-    value = base
-    for _ in range(length):
-        change = (random.random() - 0.5) * variance
-        value = max(0, value + change)
-        series.append(round(value, 1))
-    return series
-
-def generate_mock_dashboard_data(vehicle_type='ev'):
-    """Generate mock dashboard metrics for a given vehicle type"""
-    unit = get_unit_for_vehicle_type(vehicle_type)
-    
-    monthly_consumption = round(random.random() * 120 + 80, 1)
-    co2 = round(random.random() * 180 + 90)
-    savings = round(random.random() * 1200 + 300)
-    efficiency_score = round(random.random() * 35 + 60)
-    
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
-    energy_base = 210 if vehicle_type == 'ev' else 45
-    energy_variance = 40 if vehicle_type == 'ev' else 8
-    
-    energy_data = generate_random_series(len(months), energy_base, energy_variance)
-    efficiency_data = generate_random_series(len(months), 72, 10)
-    savings_data = generate_random_series(len(months), 800, 250)
-    
-    return {
-        'monthly_consumption': monthly_consumption,
-        'co2_emissions': co2,
-        'savings': savings,
-        'efficiency_score': efficiency_score,
-        'unit': unit,
-        'months': months,
-        'energy_data': energy_data,
-        'efficiency_data': efficiency_data,
-        'savings_data': savings_data
-    }
+RANGE_INPUT_FIELDS = ('fuel_capacity', 'current_fuel', 'battery_capacity', 'current_battery', 'efficiency')
+
+def calculate_remaining_ranges(vehicle_types, fuel_capacity, current_fuel, battery_capacity,
+                               current_battery, efficiency):
+    """Vectorized calculate_remaining_range() over parallel arrays.
 
-def generate_mock_forecast_data(vehicle_type='ev'):
-    """Generate mock forecast data for price and consumption"""
-    unit = get_unit_for_vehicle_type(vehicle_type)
-    months = ['Next 1', 'Next 2', 'Next 3', 'Next 4', 'Next 5', 'Next 6']
+    Numeric inputs are float arrays with NaN where a value is missing; the
+    same defaults as the scalar version apply. Returns (range_km, fuel,
+    battery) arrays, where fuel/battery are the levels actually used.
+    """
+    types = np.char.lower(np.asarray(vehicle_types, dtype=str))
+    is_ev = types == 'ev'
+    is_fuel = (types == 'petrol') | (types == 'cnc')
+    is_hybrid = types == 'hybrid'
     
-    if vehicle_type == 'petrol':
-        price_base = 100
-    elif vehicle_type == 'ev':
-        price_base = 9
-    elif vehicle_type == 'cnc':
-        price_base = 70
-    else:
-        price_base = 50
+    fuel_cap = np.where(np.isnan(fuel_capacity) | (fuel_capacity == 0), np.where(is_hybrid, 40, 50), fuel_capacity)
+    bat_cap = np.where(np.isnan(battery_capacity) | (battery_capacity == 0), np.where(is_hybrid, 20, 60),
+                       battery_capacity)
+    fuel = np.where(np.isnan(current_fuel), fuel_cap * 0.75, current_fuel)
+    battery = np.where(np.isnan(current_battery), bat_cap * 0.75, current_battery)
+    has_eff = ~np.isnan(efficiency) & (efficiency != 0)
     
-    price_data = generate_random_series(len(months), price_base, 5)
-    consumption_base = 220 if vehicle_type == 'ev' else 50
-    consumption_data = generate_random_series(len(months), consumption_base, 20)
+    ev_range = np.trunc(battery * np.where(has_eff, efficiency, 6))
+    fuel_range = np.trunc(fuel * np.where(has_eff, efficiency, 15))
+    hybrid_range = (np.trunc(battery * np.where(has_eff, efficiency, 5))
+                    + np.trunc(fuel * np.where(has_eff, efficiency, 12)))
     
+    range_km = np.select([is_ev, is_fuel, is_hybrid], [ev_range, fuel_range, hybrid_range], 0)
+    return range_km.astype(np.int64), fuel, battery
+
+def range_results(vehicle_types, fuel_capacity, current_fuel, battery_capacity, current_battery, efficiency):
+    """Shape calculate_remaining_ranges() output like calculate_remaining_range() dicts"""
+    range_km, fuel, battery = calculate_remaining_ranges(
+        vehicle_types, fuel_capacity, current_fuel, battery_capacity, current_battery, efficiency)
+    results = []
+    for i, vehicle_type in enumerate(vehicle_types):
+        vehicle_type = (vehicle_type or '').lower()
+        if vehicle_type == 'ev':
+            details, unit = f'{battery[i]:.1f} kWh available', 'kWh'
+        elif vehicle_type in ('petrol', 'cnc'):
+            details, unit = f'{fuel[i]:.1f} L available', 'L'
+        elif vehicle_type == 'hybrid':
+            details, unit = f'{battery[i]:.1f} kWh + {fuel[i]:.1f} L', 'hybrid'
+        else:
+            details, unit = '--', 'units'
+        results.append({'range_km': int(range_km[i]), 'details': details, 'unit': unit})
+    return results
+
+VEHICLE_RANGE_FIELDS = ('id', 'vehicle_name', 'vehicle_type') + RANGE_INPUT_FIELDS[:-1]
+
+def vehicle_range_results(vehicles):
+    """range_results() for vehicle dicts holding VEHICLE_RANGE_FIELDS, using learned efficiency"""
+    if not vehicles:
+        return []
+    efficiency = historical_efficiency([v['id'] for v in vehicles])
+    for v in vehicles:
+        v['efficiency'] = efficiency.get(v['id'])
+    columns = {field: float_column(vehicles, field) for field in RANGE_INPUT_FIELDS}
+    results = range_results([v['vehicle_type'] for v in vehicles], **columns)
+    for v, result in zip(vehicles, results):
+        result.update(vehicle_id=v['id'], vehicle_name=v['vehicle_name'], efficiency=v['efficiency'])
+    return results
+
+def historical_efficiency(vehicle_ids):
+    """Learned km per unit of energy for each vehicle that has logged trips"""
+    models = efficiency_models(vehicle_ids)
+    return {vehicle_id: m.predicted_efficiency() for vehicle_id, m in models.items()
+            if m.predicted_efficiency() is not None}
+
+# ===== DASHBOARD METRICS PIPELINE =====
+
+METRIC_MONTHS = 6
+METRIC_BATCH_USERS = 500
+METRIC_STALE_USERS_PER_RUN = 5000
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# km per unit a typical vehicle of each type achieves; matches the range defaults
+REFERENCE_EFFICIENCY = {'ev': 6, 'petrol': 15, 'cnc': 15, 'hybrid': 12}
+
+def metric_month_starts(today=None):
+    """First day of each of the last METRIC_MONTHS months, oldest first"""
+    month = (today or datetime.utcnow().date()).replace(day=1)
+    starts = []
+    for _ in range(METRIC_MONTHS):
+        starts.append(month)
+        month = (month - timedelta(days=1)).replace(day=1)
+    return starts[::-1]
+
+def efficiency_score(vehicle_type, distance, energy):
+    """0-100 score; matching the reference efficiency for the type scores 80"""
+    reference = REFERENCE_EFFICIENCY.get(vehicle_type)
+    if not reference or energy <= 0:
+        return 0
+    return max(0, min(100, round(80 * (distance / energy) / reference)))
+
+def build_dashboard_metric(user_id, vehicle_type, months, monthly, now):
+    """Turn per-month totals for one user and vehicle type into a DashboardMetric"""
+    baseline = current_app.config['BASELINE_COST_PER_KM']
+    energy_data, efficiency_data, savings_data, cost_data = [], [], [], []
+    trips = 0
+    distance_total = 0.0
+    for month in months:
+        energy, distance, cost, co2, count = monthly.get(month, (0.0, 0.0, 0.0, 0.0, 0))
+        energy_data.append(round(energy, 1))
+        efficiency_data.append(efficiency_score(vehicle_type, distance, energy))
+        savings_data.append(round(max(0.0, distance * baseline - cost), 1))
+        cost_data.append(round(cost / energy, 2) if energy > 0 else None)
+        trips += count
+        distance_total += distance
+    
+    current = monthly.get(months[-1], (0.0, 0.0, 0.0, 0.0, 0))
     return {
-        'months': months,
-        'unit': unit,
-        'price_data': price_data,
-        'consumption_data': consumption_data
+        'user_id': user_id,
+        'vehicle_type': vehicle_type,
+        'monthly_consumption': round(current[0], 1),
+        'co2_emissions': round(current[3], 1),
+        'savings': savings_data[-1],
+        'efficiency_score': efficiency_data[-1],
+        'trip_count': trips,
+        'avg_trip_distance': round(distance_total / trips, 1) if trips else 0.0,
+        'series': json.dumps({
+            'months': [MONTH_LABELS[m.month - 1] for m in months],
+            'energy_data': energy_data,
+            'efficiency_data': efficiency_data,
+            'savings_data': savings_data,
+            'price_data': cost_data
+        }),
+        'computed_at': now
     }
 
-def generate_mock_behavior_data():
-    """Generate mock driving behavior snapshot"""
-    avg_speed = round(random.random() * 40 + 30)
-    harsh_braking = round(random.random() * 8)
-    idle_time = round(random.random() * 18 + 5)
-    accel_styles = ['Smooth', 'Moderate', 'Aggressive']
-    accel_style = random.choice(accel_styles)
+def compute_dashboard_metrics(user_ids=None):
+    """Recompute dashboard metrics from monthly rollups, in batches of users.
+
+    Reads only the last METRIC_MONTHS monthly rollup rows per vehicle, so a
+    run over every user costs O(users x vehicles x months) regardless of how
+    many raw logs exist. Returns the number of metric rows written.
+    """
+    months = metric_month_starts()
+    vehicle_type = db.func.lower(Vehicle.vehicle_type)
+    if user_ids is None:
+        user_ids = [row[0] for row in db.session.query(EnergyRollup.user_id).filter(
+            EnergyRollup.period == 'month', EnergyRollup.period_start >= months[0]
+        ).distinct().order_by(EnergyRollup.user_id)]
     
+    written = 0
+    for start in range(0, len(user_ids), METRIC_BATCH_USERS):
+        batch = list(user_ids[start:start + METRIC_BATCH_USERS])
+        monthly = {}
+        for user_id, vtype, period_start, energy, distance, cost, co2, count in db.session.query(
+            EnergyRollup.user_id, vehicle_type, EnergyRollup.period_start,
+            db.func.sum(EnergyRollup.total_energy), db.func.sum(EnergyRollup.total_distance),
+            db.func.sum(EnergyRollup.total_cost), db.func.sum(EnergyRollup.total_co2),
+            db.func.sum(EnergyRollup.log_count)
+        ).join(Vehicle, Vehicle.id == EnergyRollup.vehicle_id).filter(
+            EnergyRollup.period == 'month', EnergyRollup.period_start >= months[0],
+            EnergyRollup.user_id.in_(batch)
+        ).group_by(EnergyRollup.user_id, vehicle_type, EnergyRollup.period_start):
+            monthly.setdefault((user_id, vtype), {})[period_start] = (energy, distance, cost, co2, count)
+        
+        now = datetime.utcnow()
+        rows = [
+            build_dashboard_metric(user_id, vtype, months, by_month, now)
+            for (user_id, vtype), by_month in monthly.items()
+        ]
+        DashboardMetric.query.filter(DashboardMetric.user_id.in_(batch)).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(db.insert(DashboardMetric), rows)
+        db.session.commit()
+        written += len(rows)
+    return written
+
+def mark_dashboard_metrics_stale(user_ids):
+    """Queue users for refresh_stale_dashboard_metrics() in the current transaction"""
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    stmt = insert(StaleDashboardMetric)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id'], set_={'marked_at': stmt.excluded.marked_at})
+    now = datetime.utcnow()
+    db.session.execute(stmt, [{'user_id': user_id, 'marked_at': now} for user_id in sorted(user_ids)])
+
+def refresh_stale_dashboard_metrics():
+    """Recompute dashboard metrics for users whose energy logs changed since their last refresh.
+
+    Writes only mark users stale, so the recompute stays off the request
+    path. Marks made while a refresh runs are newer than its start and
+    survive for the next run; the hourly full recompute covers the rest.
+    """
+    started = datetime.utcnow()
+    user_ids = [row[0] for row in db.session.query(StaleDashboardMetric.user_id).order_by(
+        StaleDashboardMetric.user_id).limit(METRIC_STALE_USERS_PER_RUN)]
+    if not user_ids:
+        return {'users': 0, 'rows': 0}
+    written = compute_dashboard_metrics(user_ids)
+    StaleDashboardMetric.query.filter(
+        StaleDashboardMetric.user_id.in_(user_ids), StaleDashboardMetric.marked_at <= started
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return {'users': len(user_ids), 'rows': written}
+
+@bp.cli.command('refresh-dashboard-metrics')
+def refresh_dashboard_metrics_command():
+    """Recompute dashboard metrics for every user"""
+    started = time.perf_counter()
+    count = compute_dashboard_metrics()
+    print(f"Computed {count} dashboard metric rows in {time.perf_counter() - started:.1f}s")
+
+def empty_dashboard_metrics(vehicle_type):
+    """Metrics payload for a user with no logged trips"""
+    months = metric_month_starts()
+    zeros = [0] * len(months)
     return {
-        'avg_speed': avg_speed,
-        'harsh_braking': harsh_braking,
-        'idle_time': idle_time,
-        'acceleration_style': accel_style
+        'monthly_consumption': 0,
+        'co2_emissions': 0,
+        'savings': 0,
+        'efficiency_score': 0,
+        'unit': get_unit_for_vehicle_type(vehicle_type),
+        'months': [MONTH_LABELS[m.month - 1] for m in months],
+        'energy_data': zeros,
+        'efficiency_data': zeros,
+        'savings_data': zeros,
+        'computed_at': None
     }
 
+def linear_forecast(values, steps):
+    """Extend a series by least-squares trend, clamped at zero"""
+    if len(values) < 2:
+        return [round(values[0] if values else 0, 1)] * steps
+    x = np.arange(len(values))
+    slope, intercept = np.polyfit(x, values, 1)
+    future = intercept + slope * np.arange(len(values), len(values) + steps)
+    return [round(max(0.0, v), 1) for v in future]
+
 # ===== NEW DASHBOARD & METRICS ROUTES =====
 
-@app.route('/api/dashboard/metrics', methods=['GET'])
+@bp.route('/api/dashboard/metrics', methods=['GET'])
+@login_required
 def dashboard_metrics():
-    """Get dashboard metrics for the current user's vehicle"""
+    """Get dashboard metrics for the current user's vehicles of a type"""
     try:
-        vehicle_type = request.args.get('vehicle_type', 'ev')
-        data = generate_mock_dashboard_data(vehicle_type)
-        return jsonify(data), 200
+        vehicle_type = request.args.get('vehicle_type', 'ev').lower()
+        metric = DashboardMetric.query.filter_by(user_id=current_user.id, vehicle_type=vehicle_type).first()
+        if metric is None:
+            return jsonify(empty_dashboard_metrics(vehicle_type)), 200
+        return jsonify(metric.to_dict()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/dashboard/forecast', methods=['GET'])
+@bp.route('/api/dashboard/forecast', methods=['GET'])
+@login_required
 def dashboard_forecast():
     """Get forecast data for price and consumption"""
     try:
-        vehicle_type = request.args.get('vehicle_type', 'ev')
-        data = generate_mock_forecast_data(vehicle_type)
-        return jsonify(data), 200
+        vehicle_type = request.args.get('vehicle_type', 'ev').lower()
+        vehicle_id = request.args.get('vehicle_id', type=int)
+        months = ['Next 1', 'Next 2', 'Next 3', 'Next 4', 'Next 5', 'Next 6']
+        
+        if vehicle_id:
+            row = db.session.query(VehicleEfficiencyModel, Vehicle.vehicle_type).join(Vehicle).filter(
+                VehicleEfficiencyModel.vehicle_id == vehicle_id, Vehicle.user_id == current_user.id).first()
+            if row is None:
+                return jsonify({'error': 'No trip history for this vehicle'}), 404
+            model, own_type = row
+            min_days = current_app.config['FORECAST_MIN_HISTORY_DAYS']
+            daily = model.daily_energy(min_days)
+            if daily is None:
+                return jsonify({'error': f'Need at least {min_days:g} days of trip history to forecast'}), 422
+            monthly = round(daily * 30, 1)
+            return jsonify({
+                'months': months,
+                'unit': get_unit_for_vehicle_type(own_type),
+                'price_data': [round(model.price_mean or 0, 2)] * len(months),
+                'consumption_data': [monthly] * len(months),
+                'model': model.to_dict()
+            }), 200
+        
+        metric = DashboardMetric.query.filter_by(user_id=current_user.id, vehicle_type=vehicle_type).first()
+        series = json.loads(metric.series) if metric else {'energy_data': [], 'price_data': []}
+        prices = [p for p in series['price_data'] if p is not None][-3:]
+        price = round(sum(prices) / len(prices), 2) if prices else 0
+        return jsonify({
+            'months': months,
+            'unit': get_unit_for_vehicle_type(vehicle_type),
+            'price_data': [price] * len(months),
+            'consumption_data': linear_forecast(series['energy_data'], len(months))
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/dashboard/behavior', methods=['GET'])
+@bp.route('/api/dashboard/behavior', methods=['GET'])
+@login_required
 def dashboard_behavior():
-    """Get mock driving behavior snapshot"""
+    """Get driving behavior snapshot derived from logged trips.
+
+    Speed, braking and idle time need telemetry that isn't recorded yet and
+    are returned as null.
+    """
     try:
-        data = generate_mock_behavior_data()
-        return jsonify(data), 200
+        rows = DashboardMetric.query.filter_by(user_id=current_user.id).all()
+        trips = sum(m.trip_count for m in rows)
+        distance = sum(m.trip_count * m.avg_trip_distance for m in rows)
+        
+        return jsonify({
+            'avg_speed': None,
+            'harsh_braking': None,
+            'idle_time': None,
+            'trip_count': trips,
+            'avg_trip_distance': round(distance / trips, 1) if trips else 0
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/vehicle/remaining-range', methods=['POST'])
+@bp.route('/api/vehicle/remaining-range', methods=['POST'])
 def vehicle_remaining_range():
     """Calculate remaining range based on vehicle specifications"""
     try:
@@ -742,6 +3071,13 @@ def vehicle_remaining_range():
         current_battery = data.get('current_battery')
         efficiency = data.get('efficiency')
         
+        # Fall back to the vehicle's learned efficiency when none is supplied
+        if efficiency is None and data.get('vehicle_id') and current_user.is_authenticated:
+            owned = Vehicle.query.with_entities(Vehicle.id).filter_by(
+                id=data['vehicle_id'], user_id=current_user.id).first()
+            if owned:
+                efficiency = historical_efficiency([owned.id]).get(owned.id)
+        
         range_result = calculate_remaining_range(
             vehicle_type=vehicle_type,
             fuel_capacity=fuel_capacity,
@@ -754,7 +3090,44 @@ def vehicle_remaining_range():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/vehicle/unit', methods=['GET'])
+@bp.route('/api/vehicles/remaining-range', methods=['GET', 'POST'])
+@login_required
+def fleet_remaining_range():
+    """Calculate remaining range for all of the user's vehicles, or an uploaded array"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json()
+            if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+                return jsonify({'error': 'Expected a JSON array of vehicle objects'}), 400
+            columns = {field: float_column(data, field) for field in RANGE_INPUT_FIELDS}
+            return jsonify(range_results([item.get('vehicle_type') for item in data], **columns)), 200
+        
+        vehicles = rows_to_dicts(select_columns(
+            Vehicle.query.filter_by(user_id=current_user.id), Vehicle, VEHICLE_RANGE_FIELDS).all(),
+            VEHICLE_RANGE_FIELDS)
+        
+        # Serve unchanged vehicles from cache; each entry dies when the vehicle's
+        # levels are updated or a new energy log changes its efficiency.
+        results, keys, misses = {}, {}, []
+        generations = response_cache.generations([vehicle_cache_namespace(v['id']) for v in vehicles])
+        for v in vehicles:
+            ns = vehicle_cache_namespace(v['id'])
+            keys[v['id']] = f"{ns}:{generations[ns]}:remaining-range"
+            cached = response_cache.get(keys[v['id']])
+            if cached is None:
+                misses.append(v)
+            else:
+                results[v['id']] = json.loads(cached)
+        
+        for v, result in zip(misses, vehicle_range_results(misses)):
+            response_cache.set(keys[v['id']], dumps(result))
+            results[v['id']] = result
+        
+        return jsonify([results[v['id']] for v in vehicles]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/vehicle/unit', methods=['GET'])
 def vehicle_unit():
     """Get energy unit for a vehicle type"""
     try:
@@ -764,19 +3137,383 @@ def vehicle_unit():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ===== LIVE TELEMETRY =====
+
+telemetry_buffer = None  # configured by create_app()
+telemetry_broker = Broker()
+telemetry_stream_slots = None  # configured by create_app(); None when open streams are unbounded
+
+TELEMETRY_LEVEL_FIELDS = ('current_fuel', 'current_battery', 'mileage')
+TELEMETRY_TRIP_FIELDS = ('energy_consumed', 'distance_traveled', 'cost', 'co2_emissions')
+TELEMETRY_CHUNK_SIZE = 500
+
+metrics.gauge('smart_telemetry_pending_frames', 'Telemetry frames buffered and not yet written',
+              callback=lambda: {(): telemetry_buffer.pending} if telemetry_buffer else {})
+metrics.gauge('smart_telemetry_frames_total', 'Telemetry frames accepted', kind='counter',
+              callback=lambda: {(): telemetry_buffer.stats['frames']} if telemetry_buffer else {})
+metrics.gauge('smart_telemetry_rejected_total', 'Telemetry frames refused because the buffer was full',
+              kind='counter', callback=lambda: {(): telemetry_buffer.stats['rejected']} if telemetry_buffer else {})
+metrics.gauge('smart_telemetry_flushes_total', 'Telemetry batches written', kind='counter',
+              callback=lambda: {(): telemetry_buffer.stats['flushes']} if telemetry_buffer else {})
+metrics.gauge('smart_telemetry_dropped_total', 'Telemetry frames dead-lettered after repeated flush failures',
+              kind='counter', callback=lambda: {(): telemetry_buffer.stats['dropped']} if telemetry_buffer else {})
+metrics.gauge('smart_telemetry_subscribers', 'Open live update streams in this process',
+              callback=lambda: {(): telemetry_broker.subscriber_count()})
+
+def telemetry_number(frame, field, allow_negative=False):
+    try:
+        value = float(frame[field])
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {field}')
+    if not np.isfinite(value) or (value < 0 and not allow_negative):
+        raise ValueError(f'Invalid {field}')
+    return value
+
+def parse_telemetry(frame, owned):
+    """Split a frame into (vehicle_id, level readings, energy log row or None); raises ValueError"""
+    if not isinstance(frame, dict):
+        raise ValueError('Frame must be an object')
+    vehicle_id = frame.get('vehicle_id')
+    if vehicle_id not in owned:
+        raise ValueError('Unknown vehicle_id')
+    
+    levels = {field: telemetry_number(frame, field) for field in TELEMETRY_LEVEL_FIELDS
+              if frame.get(field) is not None}
+    trip = None
+    if frame.get('distance_traveled') is not None or frame.get('energy_consumed') is not None:
+        trip = {field: telemetry_number(frame, field, allow_negative=field == 'cost') if frame.get(field) is not None
+                else 0.0 for field in TELEMETRY_TRIP_FIELDS}
+        try:
+            trip['date'] = parse_log_date(frame['timestamp']) if frame.get('timestamp') else datetime.utcnow()
+        except (TypeError, ValueError):
+            raise ValueError('Invalid timestamp')
+        trip['vehicle_id'] = vehicle_id
+        trip['notes'] = None
+    if not levels and trip is None:
+        raise ValueError('Frame carries no telemetry')
+    return vehicle_id, levels, trip
+
+def ingest_telemetry(user_id, frames, owned):
+    """Validate frames and buffer them for the next flush; returns (accepted, errors, busy)"""
+    telemetry_buffer.start()
+    if any(isinstance(f, dict) and f.get('vehicle_id') not in owned for f in frames):
+        # A vehicle may have been added since the connection opened
+        owned.update(user_vehicle_ids(user_id))
+    accepted, errors, busy = 0, [], False
+    for i, frame in enumerate(frames):
+        try:
+            vehicle_id, levels, trip = parse_telemetry(frame, owned)
+        except ValueError as e:
+            errors.append({'frame': i, 'error': str(e)})
+            continue
+        if ((levels and not telemetry_buffer.add_level(user_id, vehicle_id, levels))
+                or (trip and not telemetry_buffer.add_trip(dict(trip, user_id=user_id)))):
+            errors.append({'frame': i, 'error': 'Telemetry buffer full, retry later'})
+            busy = True
+            continue
+        accepted += 1
+    return accepted, errors, busy
+
+def vehicle_states(user_id=None, vehicle_ids=None):
+    """Live-update 'vehicle' events (levels and remaining range) keyed by vehicle id"""
+    fields = VEHICLE_RANGE_FIELDS + ('user_id', 'mileage')
+    query = Vehicle.query
+    if user_id is not None:
+        query = query.filter(Vehicle.user_id == user_id)
+    if vehicle_ids is not None:
+        query = query.filter(Vehicle.id.in_(vehicle_ids))
+    vehicles = rows_to_dicts(select_columns(query, Vehicle, fields).all(), fields)
+    states = {}
+    for v, result in zip(vehicles, vehicle_range_results(vehicles)):
+        states[v['id']] = dict(result, type='vehicle', user_id=v['user_id'], current_fuel=v['current_fuel'],
+                               current_battery=v['current_battery'], mileage=v['mileage'])
+    return states
+
+def flush_telemetry(app, levels, trips):
+    """TelemetryBuffer flush for app: write one batch, then push updates to subscribed dashboards.
+
+    Only a failed write raises, so the buffer retries a batch only when
+    none of it was committed.
+    """
+    with app.app_context():
+        touched = set(levels) | {t['vehicle_id'] for t in trips}
+        owners = dict(db.session.query(Vehicle.id, Vehicle.user_id).filter(Vehicle.id.in_(touched)).all())
+        # Telemetry for vehicles deleted since it was buffered is dropped
+        updates = [dict(values, b_id=vehicle_id) for vehicle_id, (user_id, values) in levels.items()
+                   if owners.get(vehicle_id) == user_id]
+        trips = [t for t in trips if owners.get(t['vehicle_id']) == t['user_id']]
+        for t in trips:
+            t['efficiency'] = t['distance_traveled'] / t['energy_consumed'] if t['energy_consumed'] > 0 else 0
+        
+        # Bump versions too, so a PATCH based on pre-telemetry state gets a conflict
+        table = Vehicle.__table__
+        bump = db.update(table).where(table.c.id == db.bindparam('b_id')).values(version=table.c.version + 1)
+        for fields in {tuple(sorted(u)) for u in updates}:
+            db.session.execute(bump, [u for u in updates if tuple(sorted(u)) == fields])
+        if trips:
+            store_energy_logs(trips)
+        db.session.commit()
+        
+        # The batch is stored; failures past this point are logged, never retried, so no trip is written twice
+        try:
+            touched = {u['b_id'] for u in updates} | {t['vehicle_id'] for t in trips}
+            invalidate_cache(*(user_cache_namespace(owners[v]) for v in touched),
+                             *(vehicle_cache_namespace(v) for v in touched))
+            for vehicle_id, state in vehicle_states(vehicle_ids=touched).items():
+                telemetry_broker.publish(state['user_id'], state)
+            totals = {}
+            for t in trips:
+                acc = totals.setdefault((t['user_id'], t['vehicle_id']), [0, 0.0, 0.0, 0.0])
+                acc[0] += 1
+                acc[1] += t['distance_traveled']
+                acc[2] += t['energy_consumed']
+                acc[3] += t['cost']
+            for (user_id, vehicle_id), (count, distance, energy, cost) in totals.items():
+                telemetry_broker.publish(user_id, {'type': 'energy', 'vehicle_id': vehicle_id, 'logs': count,
+                                                   'distance_traveled': distance, 'energy_consumed': energy,
+                                                   'cost': cost})
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error('Telemetry batch stored, but cache invalidation or live updates failed: %s', e)
+        db.session.remove()
+
+def dead_letter_telemetry(app, levels, trips, error):
+    """Write a batch the buffer gave up on to TELEMETRY_DEAD_LETTER_DIR as NDJSON, for inspection or replay"""
+    app.logger.error('Dropping %d vehicle level updates and %d trips after repeated flush failures: %s',
+                     len(levels), len(trips), error)
+    directory = app.config['TELEMETRY_DEAD_LETTER_DIR']
+    if not directory:
+        return
+    path = os.path.join(directory, f"telemetry-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}.ndjson")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            for vehicle_id, (user_id, values) in levels.items():
+                f.write(dumps(dict(values, kind='level', user_id=user_id, vehicle_id=vehicle_id)) + b'\n')
+            for trip in trips:
+                f.write(dumps(dict(trip, kind='trip')) + b'\n')
+    except OSError as e:
+        app.logger.error('Could not write telemetry dead letter %s: %s', path, e)
+
+def acquire_stream_slot():
+    """Reserve one of this process's TELEMETRY_MAX_STREAMS; returns a release function, or None when all are taken"""
+    slots = telemetry_stream_slots
+    if slots is None:
+        return lambda: None
+    if not slots.acquire(blocking=False):
+        return None
+    return slots.release
+
+def telemetry_reply(accepted, errors, busy):
+    body = {'accepted': accepted, 'failed': len(errors), 'errors': errors}
+    if busy and not accepted:
+        response = jsonify(body)
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    return jsonify(body), 202
+
+@bp.route('/api/telemetry', methods=['POST'])
+@login_required
+def telemetry_ingest():
+    """Buffer telemetry frames from a JSON array or an NDJSON body read as it streams in.
+
+    202 means the frames are buffered, not yet stored: they are written
+    within TELEMETRY_FLUSH_SECONDS, and a worker killed before then loses
+    them (see TelemetryBuffer). A graceful shutdown flushes first.
+    """
+    owned = set(user_vehicle_ids(current_user.id))
+    if request.mimetype != 'application/x-ndjson':
+        frames = request.get_json(silent=True)
+        if not isinstance(frames, (list, dict)):
+            return jsonify({'error': 'Expected a JSON object or array, or an NDJSON body'}), 400
+        return telemetry_reply(*ingest_telemetry(current_user.id, frames if isinstance(frames, list) else [frames],
+                                                 owned))
+    
+    accepted, errors, busy, chunk, offset = 0, [], False, [], 0
+    def ingest_chunk():
+        nonlocal accepted, busy
+        count, chunk_errors, chunk_busy = ingest_telemetry(current_user.id, chunk, owned)
+        accepted += count
+        busy = busy or chunk_busy
+        errors.extend(dict(e, frame=e['frame'] + offset) for e in chunk_errors)
+    
+    for line in request.stream:
+        if not line.strip():
+            continue
+        try:
+            chunk.append(json.loads(line))
+        except ValueError:
+            chunk.append(None)  # reported as an invalid frame
+        if len(chunk) == TELEMETRY_CHUNK_SIZE:
+            ingest_chunk()
+            offset += len(chunk)
+            chunk = []
+    ingest_chunk()
+    return telemetry_reply(accepted, errors, busy)
+
+if sock is not None:
+    @sock.route('/api/telemetry/ws', bp=bp)
+    def telemetry_socket(ws):
+        """Receive telemetry frames, one JSON object or array per message, until the client disconnects.
+
+        Messages are only answered when frames are rejected.
+        """
+        if not current_user.is_authenticated:
+            ws.close(reason=1008, message='Login required')
+            return
+        release = acquire_stream_slot()
+        if release is None:
+            ws.close(reason=1013, message='Too many open streams, retry later')
+            return
+        try:
+            user_id = current_user.id
+            owned = set(user_vehicle_ids(user_id))
+            db.session.close()
+            while True:
+                message = ws.receive()
+                try:
+                    frames = json.loads(message)
+                except (TypeError, ValueError):
+                    ws.send(dumps({'accepted': 0, 'failed': 1,
+                                   'errors': [{'frame': 0, 'error': 'Invalid JSON'}]}).decode())
+                    continue
+                accepted, errors, busy = ingest_telemetry(user_id, frames if isinstance(frames, list) else [frames],
+                                                          owned)
+                db.session.close()
+                if errors:
+                    ws.send(dumps({'accepted': accepted, 'failed': len(errors), 'errors': errors,
+                                   'retry_after': 1 if busy else None}).decode())
+        finally:
+            release()
+
+def sse_event(event, data):
+    return b'event: ' + event.encode() + b'\ndata: ' + dumps(data) + b'\n\n'
+
+@bp.route('/api/telemetry/stream', methods=['GET'])
+@login_required
+def telemetry_stream():
+    """Server-sent events with live level, range and energy-log updates for the user's vehicles.
+
+    Starts with a 'snapshot' of every vehicle, then sends 'vehicle' and
+    'energy' events as telemetry is flushed. Every TELEMETRY_SSE_POLL
+    seconds the stream also re-reads the vehicles, so updates written by
+    other worker processes arrive too.
+    
+    A stream occupies its worker thread until the client leaves, so beyond
+    TELEMETRY_MAX_STREAMS per process it answers 503 (see gunicorn.conf.py).
+    """
+    release = acquire_stream_slot()
+    if release is None:
+        response = jsonify({'error': 'Too many open streams, retry later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    user_id = current_user.id
+    poll = current_app.config['TELEMETRY_SSE_POLL']
+    heartbeat = current_app.config['TELEMETRY_SSE_HEARTBEAT']
+    subscription = telemetry_broker.subscribe(user_id)
+    
+    def generate():
+        try:
+            states = vehicle_states(user_id)
+            db.session.close()
+            yield sse_event('snapshot', list(states.values()))
+            last_poll = last_sent = time.monotonic()
+            while True:
+                event = subscription.get(timeout=min(poll or heartbeat, heartbeat))
+                now = time.monotonic()
+                if event is not None:
+                    if event['type'] == 'vehicle':
+                        states[event['vehicle_id']] = event
+                    yield sse_event(event['type'], event)
+                    last_sent = now
+                if poll and now - last_poll >= poll:
+                    last_poll = now
+                    current = vehicle_states(user_id)
+                    db.session.close()
+                    for vehicle_id, state in current.items():
+                        if states.get(vehicle_id) != state:
+                            yield sse_event('vehicle', state)
+                            last_sent = now
+                    states = current
+                if now - last_sent >= heartbeat:
+                    yield b': keep-alive\n\n'
+                    last_sent = now
+        finally:
+            telemetry_broker.unsubscribe(subscription)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.call_on_close(release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# ===== STATIC ASSETS =====
+
+asset_manifest = {}  # logical name -> fingerprinted name, loaded by create_app()
+
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+def assets_dir():
+    return os.path.join(current_app.root_path, current_app.config['ASSETS_DIR'])
+
+def build_static_assets():
+    """Rebuild the fingerprinted assets from static/ and start using the new manifest"""
+    global asset_manifest
+    report = build_assets(current_app.static_folder, assets_dir())
+    asset_manifest = load_manifest(assets_dir())
+    return report
+
+@bp.app_template_global()
+def asset_url(name):
+    """URL of a static asset: fingerprinted once built, the plain source file otherwise or in debug"""
+    built = asset_manifest.get(name)
+    if built is None or current_app.debug:
+        return url_for('static', filename=name)
+    return url_for('smart.built_asset', filename=built)
+
+@bp.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it; cacheable forever"""
+    directory = assets_dir()
+    suffix, encoding = '', None
+    for candidate, extension in PRECOMPRESSED:
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(directory, filename + extension)):
+            suffix, encoding = extension, candidate
+            break
+    response = send_from_directory(directory, filename + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=current_app.config['ASSETS_MAX_AGE'])
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress the JS/CSS under static/"""
+    started = time.perf_counter()
+    report = build_static_assets()
+    for asset in report:
+        br = f"{asset['br']:>8}" if asset['br'] is not None else f"{'-':>8}"
+        print(f"{asset['file']:<40} {asset['source']:>8} -> {asset['minified']:>8}  gzip {asset['gzip']:>7}  br {br}")
+    print(f"Built {len(report)} assets into {assets_dir()} in {time.perf_counter() - started:.2f}s")
+
 # ===== TEMPLATE ROUTES =====
 
-@app.route('/')
+@bp.route('/')
 def landing():
     """Serve landing page"""
     return render_template('landing.html')
 
 # Serve the main application UI after user clicks "Get Started"
-@app.route('/app')
+@bp.route('/app')
 def app_index():
     return render_template('index.html')
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
     """Serve dashboard (to be created)"""
@@ -784,21 +3521,214 @@ def dashboard():
 
 # ===== ERROR HANDLERS =====
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return jsonify({'error': 'Internal server error'}), 500
 
+# ===== BACKGROUND JOBS =====
+
+job_scheduler = None  # configured by create_app()
+
+def compact_logs():
+    """Purge delivered notifications past retention and compact the database"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['OUTBOX_RETENTION_DAYS'])
+    purged = NotificationOutbox.query.filter(
+        NotificationOutbox.status.in_(('sent', 'failed')), NotificationOutbox.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.exec_driver_sql('PRAGMA optimize')
+    return {'outbox_purged': purged}
+
+def drain_notifications():
+    """Send any emergency notifications the dispatcher threads have not picked up"""
+    return {'sent': notification_dispatcher.drain()}
+
+def register_jobs(scheduler):
+    """Periodic maintenance and precomputation, run off the request path"""
+    scheduler.register('drain-notifications', drain_notifications, interval=60, initial_delay=10)
+    scheduler.register('refresh-stale-dashboard-metrics', refresh_stale_dashboard_metrics, interval=30,
+                       initial_delay=15)
+    scheduler.register('refresh-dashboard-metrics', compute_dashboard_metrics, interval=3600)
+    scheduler.register('compact-logs', compact_logs, interval=86400)
+    scheduler.register('archive-old-rows', archive_old_rows, interval=86400)
+
+def has_ops_token():
+    """Whether the request carries OPS_TOKEN as its bearer token"""
+    token = current_app.config['OPS_TOKEN']
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+@bp.route('/api/jobs', methods=['GET'])
+def job_stats():
+    """Report background job schedules and timings.
+
+    Errors, worker ids and the current leader are only shown with the
+    OPS_TOKEN bearer token; signed-in users get the schedule alone.
+    """
+    stats = job_scheduler.stats()
+    if has_ops_token():
+        return jsonify(stats), 200
+    if not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    return jsonify({'jobs': [{k: v for k, v in job.items() if k != 'last_error'} for job in stats['jobs']]}), 200
+
+@bp.cli.command('run-job')
+@click.argument('name', required=False)
+def run_job_command(name):
+    """Run a background job now, or list jobs when no NAME is given"""
+    if name is None:
+        for job in job_scheduler.stats()['jobs']:
+            print(f"{job['name']:<28} every {job['interval_seconds']:>6}s  "
+                  f"runs={job['run_count']} avg={job['avg_duration_ms']}ms  {job['description']}")
+        return
+    try:
+        result = job_scheduler.run_now(name)
+    except KeyError as e:
+        raise click.BadParameter(str(e.args[0]), param_hint='NAME')
+    if result['status'] != 'ok':
+        raise click.ClickException(f"{name} failed after {result['duration_ms']}ms:\n{result['error']}")
+    print(f"{name} finished in {result['duration_ms']}ms: {result['result']}")
+
+# ===== APPLICATION FACTORY =====
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Enable WAL and a busy timeout so concurrent workers don't hit 'database is locked'"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    config = current_app.config if has_app_context() else {}
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.execute(f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    cursor.close()
+
+def create_app(config=None):
+    """Build a new app from the environment-driven Config and bind the extensions to it.
+
+    config is an optional mapping applied over Config. Engine pool options
+    are re-derived when only the database URI is overridden. The services
+    below are module-level, so they follow the most recently created app.
+    """
+    global response_cache, notification_dispatcher, overpass_client, job_scheduler, archive_store, request_profiler
+    global telemetry_buffer, telemetry_stream_slots, password_hasher, login_ip_limiter, login_failure_limiter
+    global asset_manifest
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+        if 'SQLALCHEMY_DATABASE_URI' in config and 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config['SQLALCHEMY_DATABASE_URI'])
+    
+    if app.config['PROXY_FIX_HOPS']:
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    app.json = FastJSONProvider(app)
+    app.json.timer = record_serialization
+    db.init_app(app)
+    login_manager.init_app(app)
+    if sock is not None:
+        sock.init_app(app)
+    CORS(app)
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": "*",
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["X-Next-Cursor"]
+        }
+    })
+    app.register_blueprint(bp)
+    
+    if app.config['CACHE_BACKEND'] == 'redis':
+        response_cache = create_cache('redis', url=app.config['CACHE_REDIS_URL'], ttl=app.config['CACHE_TTL'])
+    else:
+        response_cache = create_cache('memory', max_entries=app.config['CACHE_MAX_ENTRIES'],
+                                      ttl=app.config['CACHE_TTL'], generations=TableGenerations(db, CacheGeneration))
+    
+    if app.config['NOTIFY_TRANSPORT'] == 'http':
+        transport = create_transport('http', url=app.config['NOTIFY_GATEWAY_URL'])
+    else:
+        transport = create_transport('fake')
+    request_profiler = None
+    if app.config['PROFILE_SLOW_MS'] > 0:
+        request_profiler = StackSampler(app.config['PROFILE_INTERVAL_MS'] / 1000)
+    telemetry_buffer = TelemetryBuffer(
+        partial(flush_telemetry, app), max_batch=app.config['TELEMETRY_FLUSH_FRAMES'],
+        max_delay=app.config['TELEMETRY_FLUSH_SECONDS'], max_pending=app.config['TELEMETRY_MAX_PENDING'],
+        max_retries=app.config['TELEMETRY_MAX_RETRIES'], on_drop=partial(dead_letter_telemetry, app),
+        on_error=lambda e: app.logger.error('Telemetry flush failed: %s', e))
+    max_streams = app.config['TELEMETRY_MAX_STREAMS']
+    telemetry_stream_slots = threading.Semaphore(max_streams) if max_streams > 0 else None
+    password_hasher = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'], workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        admission_timeout=app.config['PASSWORD_HASH_ADMISSION_TIMEOUT'], timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    login_ip_limiter = RateLimiter(app.config['LOGIN_IP_RATE'], app.config['LOGIN_IP_BURST'])
+    login_failure_limiter = RateLimiter(app.config['LOGIN_FAILURE_RATE'], app.config['LOGIN_FAILURE_BURST'])
+    archive_store = ColumnarArchive(app.config['ARCHIVE_DIR'])
+    with app.app_context():
+        asset_manifest = load_manifest(assets_dir())
+    overpass_client = OverpassClient(app.config['OVERPASS_URL'], timeout=app.config['OVERPASS_TIMEOUT'])
+    notification_dispatcher = OutboxDispatcher(
+        app, db, NotificationOutbox, transport,
+        batch_size=app.config['NOTIFY_BATCH_SIZE'], workers=app.config['NOTIFY_WORKERS']
+    )
+    job_scheduler = JobScheduler(app, db, ScheduledJob, SchedulerLease,
+                                 poll_interval=app.config['SCHEDULER_POLL_INTERVAL'],
+                                 lease_seconds=app.config['SCHEDULER_LEASE_SECONDS'])
+    register_jobs(job_scheduler)
+    return app
+
 # ===== DATABASE INITIALIZATION =====
 
-def init_db():
-    """Initialize the database"""
+def ensure_columns():
+    """Add nullable or server-defaulted model columns that are missing from tables in an existing database"""
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                if column.nullable:
+                    conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                elif column.server_default is not None:
+                    conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} '
+                                         f'NOT NULL DEFAULT {column.server_default.arg}'))
+
+def ensure_indexes():
+    """Create indexes declared on models that are missing from an existing database"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+def init_db(app):
+    """Create missing tables, columns and indexes for an app from create_app(), then backfill and seed"""
     with app.app_context():
         db.create_all()
+        ensure_columns()
+        ensure_indexes()
+        
+        # Backfill rollups and models for databases created before they existed
+        if EnergyRollup.query.first() is None and EnergyLog.query.first() is not None:
+            rebuild_rollups()
+        if VehicleEfficiencyModel.query.first() is None and EnergyLog.query.first() is not None:
+            retrain_efficiency_models()
+        if DashboardMetric.query.first() is None and EnergyLog.query.first() is not None:
+            compute_dashboard_metrics()
         
         # Add sample stations if they don't exist
         if Station.query.count() == 0:
@@ -814,5 +3744,10 @@ def init_db():
         print("Database initialized!")
 
 if __name__ == '__main__':
-    init_db()
+    app = create_app()
+    init_db(app)
+    # The reloader runs the app in a child process; only start workers there
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        notification_dispatcher.start()
+        job_scheduler.start()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,187 @@
+"""Compressed columnar archive files for rows compacted out of hot tables.
+
+Each partition holds one month of one table as a zip-deflated NumPy .npz
+with one array per column plus a null mask for nullable columns. Rows are
+sorted by (user_id, date, id) so a user's rows are found by binary search.
+Partition files are immutable; rewriting a month writes a new version and
+the caller's catalog decides which version is live.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+KINDS = ('int', 'float', 'bool', 'datetime', 'str')
+
+
+def to_micros(value):
+    """Naive UTC datetime -> integer microseconds since the epoch"""
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def encode_columns(rows, schema):
+    """Turn row tuples ordered like schema [(name, kind), ...] into column arrays"""
+    arrays = {}
+    for i, (name, kind) in enumerate(schema):
+        values = [row[i] for row in rows]
+        nulls = np.array([v is None for v in values], dtype=bool)
+        if kind == 'str':
+            data = np.array(['' if v is None else v for v in values], dtype=str)
+        elif kind == 'datetime':
+            data = np.array([0 if v is None else to_micros(v) for v in values], dtype=np.int64)
+        elif kind == 'float':
+            data = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        elif kind == 'bool':
+            data = np.array([bool(v) for v in values], dtype=bool)
+        else:
+            data = np.array([0 if v is None else v for v in values], dtype=np.int64)
+        arrays[name] = data
+        if nulls.any():
+            arrays[f'{name}__null'] = nulls
+    return arrays
+
+
+def concat_columns(parts, schema):
+    """Concatenate column dicts from encode_columns()/Partition.columns"""
+    parts = [p for p in parts if p and len(p[schema[0][0]])]
+    if not parts:
+        return encode_columns([], schema)
+    arrays = {}
+    for name, _ in schema:
+        arrays[name] = np.concatenate([p[name] for p in parts])
+        if any(f'{name}__null' in p for p in parts):
+            arrays[f'{name}__null'] = np.concatenate([
+                p.get(f'{name}__null', np.zeros(len(p[name]), dtype=bool)) for p in parts])
+    return arrays
+
+
+def take_columns(arrays, index):
+    return {name: values[index] for name, values in arrays.items()}
+
+
+class Partition:
+    """One loaded archive partition"""
+
+    def __init__(self, arrays, schema, date_field):
+        self.schema = schema
+        self.kinds = dict(schema)
+        self.date_field = date_field
+        self.columns = arrays
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def user_range(self, user_id):
+        """(start, stop) of the user's rows"""
+        users = self.columns['user_id']
+        return int(np.searchsorted(users, user_id, 'left')), int(np.searchsorted(users, user_id, 'right'))
+
+    def select(self, user_id=None, start=None, end=None, vehicle_ids=None, before=None):
+        """Row indexes within [start, end), optionally restricted to a user and vehicle_ids.
+
+        before=(date, id) keeps only rows that sort before that keyset
+        cursor. A user's rows are stored in date order, so their date bounds
+        are found by binary search instead of a scan.
+        """
+        dates = self.columns[self.date_field]
+        upper = None if end is None else to_micros(end)
+        if before is not None:
+            upper = min(upper, to_micros(before[0]) + 1) if upper is not None else to_micros(before[0]) + 1
+        lo, hi = self.user_range(user_id) if user_id is not None else (0, len(self))
+        if user_id is not None:
+            if start is not None:
+                lo += int(np.searchsorted(dates[lo:hi], to_micros(start), 'left'))
+            if upper is not None:
+                hi = lo + int(np.searchsorted(dates[lo:hi], upper, 'left'))
+        index = np.arange(lo, hi)
+        dates = dates[lo:hi]
+        mask = np.ones(hi - lo, dtype=bool)
+        if user_id is None:
+            if start is not None:
+                mask &= dates >= to_micros(start)
+            if upper is not None:
+                mask &= dates < upper
+        if before is not None:
+            cursor = to_micros(before[0])
+            mask &= (dates < cursor) | (self.columns['id'][lo:hi] < before[1])
+        if vehicle_ids is not None:
+            mask &= np.isin(self.columns['vehicle_id'][lo:hi], list(vehicle_ids))
+        return index[mask]
+
+    def to_dicts(self, index, fields=None):
+        """Rows at index as dicts of Python values (None for nulls)"""
+        fields = fields or [name for name, _ in self.schema]
+        columns = {}
+        for name in fields:
+            values = self.columns[name][index]
+            if self.kinds[name] == 'datetime':
+                values = [from_micros(v) for v in values.tolist()]
+            else:
+                values = values.tolist()
+            nulls = self.columns.get(f'{name}__null')
+            if nulls is not None:
+                values = [None if n else v for v, n in zip(values, nulls[index].tolist())]
+            columns[name] = values
+        return [dict(zip(fields, row)) for row in zip(*(columns[f] for f in fields))]
+
+
+class ColumnarArchive:
+    """Read and write partition files under root/<table>/<YYYY-MM>.v<N>.npz"""
+
+    def __init__(self, root, cache_partitions=32):
+        self.root = root
+        self.cache_partitions = cache_partitions
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, table, file_name):
+        return os.path.join(self.root, table, file_name)
+
+    def write(self, table, month, version, arrays, schema, date_field):
+        """Sort and write a partition; returns its file name"""
+        order = np.lexsort((arrays['id'], arrays[date_field], arrays['user_id']))
+        arrays = take_columns(arrays, order)
+        file_name = f'{month}.v{version}.npz'
+        path = self.path(table, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+        return file_name
+
+    def load(self, table, file_name, schema, date_field):
+        """Load a partition, keeping recently used ones in memory"""
+        key = (table, file_name)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        with np.load(self.path(table, file_name)) as data:
+            arrays = {name: data[name] for name in data.files}
+        for name, kind in schema:
+            if name not in arrays:
+                # Column added to the model after this partition was written
+                arrays.update(encode_columns([(None,)] * len(arrays['id']), [(name, kind)]))
+        partition = Partition(arrays, schema, date_field)
+        with self._lock:
+            self._cache[key] = partition
+            while len(self._cache) > self.cache_partitions:
+                self._cache.popitem(last=False)
+        return partition
+
+    def remove(self, table, file_name):
+        with self._lock:
+            self._cache.pop((table, file_name), None)
+        try:
+            os.remove(self.path(table, file_name))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,247 @@
+"""Static asset build: minify, content-hash fingerprint and precompress JS/CSS.
+
+build_assets() walks a source directory, writes name.<hash>.ext files
+with .gz (and .br when brotli is installed) siblings to an output
+directory, and records logical name -> fingerprinted name in
+manifest.json. Because a file's name changes whenever its content does,
+the built files can be cached by browsers forever.
+
+The minifiers are conservative, token-aware passes (comments and
+redundant whitespace only, no renaming); rjsmin and rcssmin are used
+instead when they are installed.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - optional, the built-in minifier is used instead
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - optional, the built-in minifier is used instead
+    rjsmin = None
+
+ASSET_EXTENSIONS = ('.css', '.js')
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+_CSS_TOKENS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\([^)]*\))|(/\*.*?\*/)|(\s+)''', re.S)
+_CSS_TIGHT = set('{};,>~')  # no whitespace needed on either side
+
+# A '/' after one of these (or after nothing) starts a regex literal rather than a division
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case',
+                      'do', 'else', 'yield', 'await')
+# Whitespace touching these can go; + - / . are left alone (a + +b, a - -b, 1 .toFixed)
+_JS_TIGHT = set('{}()[];,:=<>?!&|*%^~')
+_JS_WORD = re.compile(r'[\w$]+|.', re.S)
+
+
+def minify_css(text):
+    """Drop comments and whitespace that CSS does not need"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    literals = []
+
+    def replace(match):
+        literal, comment, space = match.groups()
+        if literal:
+            literals.append(literal)
+            return f'\0{len(literals) - 1}\0'
+        return ' '
+
+    css = _CSS_TOKENS.sub(replace, text)
+    tight = []
+    for i, char in enumerate(css):
+        if char == ' ':
+            prev = tight[-1] if tight else ''
+            following = css[i + 1] if i + 1 < len(css) else ''
+            # Keep the space before ':' so descendant selectors like 'a :hover' survive
+            if prev in _CSS_TIGHT or prev in (':', ' ', '') or following in _CSS_TIGHT or not following:
+                continue
+        elif char == '}' and tight and tight[-1] == ';':
+            tight.pop()
+        tight.append(char)
+    return re.sub('\0(\\d+)\0', lambda m: literals[int(m.group(1))], ''.join(tight).strip())
+
+
+def minify_js(text):
+    """Drop comments, indentation and whitespace next to punctuation.
+
+    Line breaks that automatic semicolon insertion may rely on are kept;
+    strings, template literals and regex literals are copied unchanged.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    out = []
+    n = len(text)
+    i = 0
+    braces = []  # brace depth at which each open template literal's ${ } expression closes
+    pending = ''  # whitespace seen since the last token: '', ' ' or '\n'
+
+    def last_significant():
+        return out[-1][-1] if out else ''
+
+    def emit(token):
+        nonlocal pending
+        if pending and out:
+            prev = last_significant()
+            if pending == '\n':
+                if prev not in '{;,([' and token[0] not in '})],;':
+                    out.append('\n')
+            elif prev not in _JS_TIGHT and token[0] not in _JS_TIGHT:
+                out.append(' ')
+        pending = ''
+        out.append(token)
+
+    def regex_allowed():
+        prev = last_significant()
+        if not prev or prev in _JS_REGEX_AFTER:
+            return True
+        word = re.search(r'[A-Za-z_$][\w$]*$', out[-1])
+        return bool(word) and word.group() in _JS_REGEX_KEYWORDS
+
+    def template(start):
+        """Copy a template literal body from start up to its end or a '${'; returns the new index"""
+        j = start
+        while j < n:
+            if text[j] == '\\':
+                j += 2
+            elif text[j] == '`':
+                return j + 1, False
+            elif text.startswith('${', j):
+                return j + 2, True
+            else:
+                j += 1
+        return n, False
+
+    depth = 0
+    while i < n:
+        char = text[i]
+        if char in ' \t\r\n':
+            if char == '\n' or pending != '\n':
+                pending = '\n' if char == '\n' else (pending or ' ')
+            i += 1
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            pending = '\n' if '\n' in text[i:end] else (pending or ' ')
+            i = end
+        elif char in '"\'':
+            j = i + 1
+            while j < n and text[j] != char and text[j] != '\n':
+                j += 2 if text[j] == '\\' else 1
+            emit(text[i:j + 1])
+            i = j + 1
+        elif char == '`' or (char == '}' and braces and braces[-1] == depth):
+            if char == '}':
+                braces.pop()
+            end, opened = template(i + 1)
+            emit(text[i:end])
+            if opened:
+                braces.append(depth)
+            i = end
+        elif char == '/' and regex_allowed():
+            j = i + 1
+            in_class = False
+            while j < n and text[j] != '\n':
+                if text[j] == '\\':
+                    j += 2
+                    continue
+                if text[j] == '[':
+                    in_class = True
+                elif text[j] == ']':
+                    in_class = False
+                elif text[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (text[j].isalnum() or text[j] == '_'):
+                j += 1  # flags
+            emit(text[i:j])
+            i = j
+        else:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            match = _JS_WORD.match(text, i)
+            emit(match.group())
+            i = match.end()
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(name, digest):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+def build_assets(source_dir, output_dir, gzip_level=9, brotli_quality=11):
+    """Minify, fingerprint and precompress every asset under source_dir; returns one report dict per asset.
+
+    Files already under output_dir are skipped, so the output may live
+    inside the source tree. The manifest is replaced last, so a server
+    reading it never sees names whose files are not written yet.
+    """
+    source_dir = os.path.abspath(source_dir)
+    output_dir = os.path.abspath(output_dir)
+    manifest, report = {}, []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output_dir)
+        for filename in sorted(files):
+            ext = os.path.splitext(filename)[1]
+            if ext not in ASSET_EXTENSIONS:
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            data = MINIFIERS[ext](source).encode()
+            built = fingerprinted_name(name, fingerprint(data))
+            target = os.path.join(output_dir, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            variants = {'': data, '.gz': gzip.compress(data, compresslevel=gzip_level, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(data, quality=brotli_quality)
+            for suffix, body in variants.items():
+                with open(target + suffix, 'wb') as f:
+                    f.write(body)
+            manifest[name] = built
+            report.append({'name': name, 'file': built, 'source': len(source.encode()), 'minified': len(data),
+                           'gzip': len(variants['.gz']), 'br': len(variants['.br']) if '.br' in variants else None})
+
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+    return report
+
+
+def load_manifest(output_dir):
+    """Logical name -> fingerprinted name, or {} when the assets have not been built"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
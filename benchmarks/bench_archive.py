@@ -0,0 +1,105 @@
+"""Hot-path query latency and storage before and after archiving old rows.
+
+Usage: python benchmarks/bench_archive.py [--logs-per-day 40] [--years 3] [--repeat 20]
+
+Seeds one user's energy logs spread over several years, then times the
+recent-window endpoints and a query reaching into archived months before
+and after compaction, and reports database and archive file sizes.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as smart
+
+
+def seed(app, logs_per_day, years):
+    with app.app_context():
+        user = smart.User(username='bench', email='bench@example.com', password_hash='-')
+        smart.db.session.add(user)
+        smart.db.session.flush()
+        vehicles = [smart.Vehicle(user_id=user.id, vehicle_name=f'car {i}', vehicle_type='ev') for i in range(3)]
+        smart.db.session.add_all(vehicles)
+        smart.db.session.flush()
+        now = datetime.utcnow()
+        rows = []
+        for day in range(years * 365):
+            for i in range(logs_per_day):
+                rows.append({'user_id': user.id, 'vehicle_id': vehicles[i % 3].id,
+                             'date': now - timedelta(days=day, minutes=i * 17),
+                             'energy_consumed': 4 + i % 5, 'distance_traveled': 25 + i % 11,
+                             'cost': 30 + i % 7, 'co2_emissions': 0.5})
+        smart.db.session.execute(smart.db.insert(smart.EnergyLog), rows)
+        smart.db.session.commit()
+        smart.rebuild_rollups()
+        return user.id, len(rows)
+
+
+def timed(client, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        smart.response_cache.clear()
+        start = time.perf_counter()
+        resp = client.get(path)
+        resp.get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, resp.get_data()
+    return statistics.median(samples)
+
+
+def directory_size(path):
+    if not os.path.isdir(path):
+        return 0
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logs-per-day', type=int, default=40)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    paths = [
+        ('energy-logs, last 30 days', '/api/energy-logs?days=30&limit=100'),
+        ('energy-summary, last 30 days', '/api/energy-summary?days=30&group_by=day'),
+        ('energy-logs, 2 years (ndjson)', '/api/energy-logs?days=730&format=ndjson'),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        archive_dir = os.path.join(tmp, 'archive')
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}', 'ARCHIVE_DIR': archive_dir})
+        smart.init_db(app)
+        user_id, total = seed(app, args.logs_per_day, args.years)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+
+        def report(label):
+            with app.app_context(), smart.db.engine.connect() as conn:
+                conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+            archive_bytes = directory_size(archive_dir)
+            print(f"\n{label}: database {directory_size(tmp) - archive_bytes:,} bytes, archive {archive_bytes:,} bytes")
+            for name, path in paths:
+                print(f"  {name:<32} {timed(client, path, args.repeat):>9.2f} ms")
+
+        print(f"{total:,} energy logs over {args.years} years")
+        report('before archiving')
+        with app.app_context():
+            start = time.perf_counter()
+            moved = smart.archive_old_rows()
+            elapsed = time.perf_counter() - start
+        with app.app_context(), smart.db.engine.connect() as conn:
+            conn.exec_driver_sql('VACUUM')
+        print(f"\narchived {moved} in {elapsed:.2f} s")
+        report('after archiving')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Page weight and modelled load time of the UI pages, from plain sources vs built assets.
+
+Usage: python benchmarks/bench_assets.py [--network slow-4g cable]
+
+"before" serves the pages as the tree did without a build: CSS/JS straight
+from static/, nothing compressed, nothing cacheable beyond revalidation.
+The bytes equal the old inline pages; only the request count differs.
+"after" runs `flask build-assets` and fetches with Accept-Encoding: br,
+gzip. For each page the report gives same-origin requests and bytes on
+the wire for a first visit and a repeat visit (cached assets: revalidated
+with If-None-Match before, not requested at all when immutable after).
+
+Load time is a model, not a browser measurement: the HTML round trip,
+then one more round trip for the render-blocking CSS/JS fetched in
+parallel, plus all bytes at the network's bandwidth, using Lighthouse's
+throttling presets. Third-party CDN files (Chart.js, Leaflet, fonts)
+are the same in both modes and left out. For real time-to-interactive
+run Lighthouse against a gunicorn started with gunicorn.conf.py.
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as smart
+from serialization import brotli
+
+PAGES = ['/', '/app', '/dashboard']
+NETWORKS = {'slow-4g': (150, 1.6), 'fast-3g': (563, 1.44), 'cable': (28, 5.0)}  # RTT ms, Mbps down
+HEADER_BYTES = 300  # rough size of a response's status line and headers
+SAME_ORIGIN_ASSET = re.compile(r'<(?:link[^>]+href|script[^>]+src)="(/[^"]+)"')
+
+
+def fetch(client, path, encodings, headers=None):
+    resp = client.get(path, headers=dict(headers or {}, **({'Accept-Encoding': encodings} if encodings else {})))
+    return resp, len(resp.get_data()) + HEADER_BYTES
+
+
+def visit(client, page, encodings, cache=None):
+    """(requests, bytes) for one page load; fills or uses cache {url: ETag, or None when immutable}"""
+    resp, total = fetch(client, page, encodings)
+    html = resp.get_data()
+    if resp.headers.get('Content-Encoding') == 'gzip':
+        html = gzip.decompress(html)
+    elif resp.headers.get('Content-Encoding') == 'br':
+        html = brotli.decompress(html)
+    requests = 1
+    for url in SAME_ORIGIN_ASSET.findall(html.decode()):
+        if cache is not None and url in cache:
+            if cache[url] is None:
+                continue  # immutable: served from the browser cache
+            _, size = fetch(client, url, encodings, {'If-None-Match': cache[url]})
+        else:
+            asset, size = fetch(client, url, encodings)
+            if asset.status_code != 200:
+                raise RuntimeError(f'{url} -> {asset.status_code}')
+            immutable = 'immutable' in asset.headers.get('Cache-Control', '')
+            if cache is not None:
+                cache[url] = None if immutable else asset.headers.get('ETag')
+        requests += 1
+        total += size
+    return requests, total
+
+
+def modelled_ms(requests, total, network):
+    rtt, mbps = NETWORKS[network]
+    rounds = 1 if requests == 1 else 2
+    return rounds * rtt + total * 8 / (mbps * 1000)
+
+
+def measure(client, encodings):
+    results = {}
+    for page in PAGES:
+        cache = {}
+        first = visit(client, page, encodings, cache)
+        repeat = visit(client, page, encodings, cache)
+        results[page] = (first, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--network', nargs='+', default=['slow-4g', 'cable'], choices=sorted(NETWORKS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'ASSETS_DIR': os.path.join(tmp, 'dist')})
+        smart.init_db(app)
+        client = app.test_client()
+        client.post('/api/auth/register', json={'username': 'bench', 'email': 'bench@example.com',
+                                                'password': 'bench-password'})
+
+        smart.asset_manifest = {}
+        before = measure(client, None)
+        started = time.perf_counter()
+        with app.app_context():
+            report = smart.build_static_assets()
+        build_ms = (time.perf_counter() - started) * 1000
+        after = measure(client, 'br, gzip' if brotli else 'gzip')
+
+    print(f"built {len(report)} assets in {build_ms:.0f} ms:")
+    for asset in report:
+        br = f", br {asset['br']}" if asset['br'] is not None else ''
+        print(f"  {asset['name']:<20} {asset['source']:>7} B -> minified {asset['minified']:>7}, "
+              f"gzip {asset['gzip']:>6}{br}")
+    print()
+    header = f"{'page':<11} {'visit':<7} {'mode':<7} {'requests':>8} {'KB':>8}"
+    header += ''.join(f" {network + ' ms':>13}" for network in args.network)
+    print(header)
+    for page in PAGES:
+        for index, visit_name in enumerate(('first', 'repeat')):
+            for mode, results in (('before', before), ('after', after)):
+                requests, total = results[page][index]
+                row = f"{page:<11} {visit_name:<7} {mode:<7} {requests:>8} {total / 1024:>8.1f}"
+                row += ''.join(f" {modelled_ms(requests, total, network):>13.0f}" for network in args.network)
+                print(row)
+
+
+if __name__ == '__main__':
+    main()
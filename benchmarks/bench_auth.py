@@ -0,0 +1,134 @@
+"""Login storm throughput and its effect on other endpoints, hashing inline vs in the process pool.
+
+Usage: python benchmarks/bench_auth.py [--storm 16] [--probes 4] [--duration 10] [--workers 2] [--threads 4]
+
+Seeds a scratch SQLite database with benchmarks/datagen.py, then for each
+PASSWORD_HASH_WORKERS setting boots gunicorn and runs --probes logged-in
+clients cycling through cheap read endpoints, first alone and then while
+--storm clients log in as fast as they can. The report gives login
+throughput, how many logins were shed with 503, and the probes' p50/p95
+latency with and without the storm. Login rate limits are lifted so the
+storm reaches the hasher.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as smart
+import datagen
+import loadtest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBES = ['/api/vehicles', '/api/energy-summary?days=30', '/api/auth/profile', '/api/vehicle/unit']
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0
+
+
+def login(conn, user):
+    resp, _ = loadtest.request(conn, 'POST', '/api/auth/login',
+                               {'username': f'bench{user}', 'password': datagen.BENCH_PASSWORD})
+    return resp
+
+
+def prober(port, user, stop, latencies):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    cookie = login(conn, user).getheader('Set-Cookie').split(';', 1)[0]
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        loadtest.request(conn, 'GET', PROBES[i % len(PROBES)], cookie=cookie)
+        latencies.append(time.perf_counter() - started)
+        i += 1
+
+
+def stormer(port, user, stop, outcomes):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while not stop.is_set():
+        try:
+            outcomes.append(login(conn, user).status)
+        except (OSError, http.client.HTTPException):
+            outcomes.append(0)
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+
+
+def phase(port, args, storm):
+    stop = threading.Event()
+    latencies, outcomes = [], []
+    threads = [threading.Thread(target=prober, args=(port, i, stop, latencies)) for i in range(args.probes)]
+    if storm:
+        threads += [threading.Thread(target=stormer, args=(port, args.probes + i, stop, outcomes))
+                    for i in range(args.storm)]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies, outcomes
+
+
+def run(database_url, hash_workers, args):
+    port = loadtest.free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, BIND=f'127.0.0.1:{port}',
+               WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+               START_BACKGROUND_WORKERS='0', PASSWORD_HASH_WORKERS=str(hash_workers),
+               LOGIN_IP_RATE='1e9', LOGIN_IP_BURST='1000000000')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        loadtest.wait_ready(port)
+        quiet, _ = phase(port, args, storm=False)
+        loaded, outcomes = phase(port, args, storm=True)
+    finally:
+        server.terminate()
+        server.wait()
+    return {'hash_workers': hash_workers,
+            'logins_per_s': outcomes.count(200) / args.duration,
+            'shed': outcomes.count(503), 'failed': sum(1 for s in outcomes if s not in (200, 503)),
+            'quiet_p50_ms': percentile(quiet, 0.50), 'quiet_p95_ms': percentile(quiet, 0.95),
+            'storm_p50_ms': percentile(loaded, 0.50), 'storm_p95_ms': percentile(loaded, 0.95),
+            'probe_rps': len(loaded) / args.duration}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--storm', type=int, default=16, help='clients logging in continuously')
+    parser.add_argument('--probes', type=int, default=4, help='clients calling other endpoints')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per phase')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--hash-workers', type=int, nargs='+', default=[0, 2],
+                        help='PASSWORD_HASH_WORKERS settings to compare (0 hashes on the request thread)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'auth.db')}"
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'ARCHIVE_DIR': os.path.join(tmp, 'archive')})
+        smart.init_db(app)
+        with app.app_context():
+            datagen.generate(users=args.probes + args.storm, days=30, stations=200)
+            smart.db.engine.dispose()
+        print(f"method {app.config['PASSWORD_HASH_METHOD']}, {args.workers} workers x {args.threads} threads, "
+              f"{args.storm} storm clients, {args.probes} probes, {args.duration:.0f}s phases")
+        print(f"{'hash workers':>12} {'logins/s':>9} {'shed':>6} {'failed':>7} {'quiet p50':>10} {'quiet p95':>10} "
+              f"{'storm p50':>10} {'storm p95':>10} {'probe req/s':>12}")
+        for hash_workers in args.hash_workers:
+            r = run(database_url, hash_workers, args)
+            print(f"{r['hash_workers']:>12} {r['logins_per_s']:>9.1f} {r['shed']:>6} {r['failed']:>7} "
+                  f"{r['quiet_p50_ms']:>10.1f} {r['quiet_p95_ms']:>10.1f} {r['storm_p50_ms']:>10.1f} "
+                  f"{r['storm_p95_ms']:>10.1f} {r['probe_rps']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare the vectorized GeoPoints ranking against the original per-station closure.
+
+Usage: python benchmarks/bench_geo.py [--sizes 10000 100000 1000000] [--limit 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import GeoPoints
+
+
+def closure_nearest(stations, latitude, longitude, limit):
+    """The ranking /api/stations used before the geo module existed"""
+    def distance(lat1, lon1, lat2, lon2):
+        from math import radians, sin, cos, sqrt, atan2
+        R = 6371  # Earth radius in km
+        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+        dlat = lat2 - lat1
+        dlon = lon2 - lon1
+        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+        c = 2 * atan2(sqrt(a), sqrt(1-a))
+        return R * c
+
+    stations = sorted(stations, key=lambda s: distance(latitude, longitude, s[1], s[2]))
+    return [s[0] for s in stations[:limit]]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    query = (28.6, 77.2)
+    print(f"{'stations':>10} {'closure ms':>12} {'build ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for n in args.sizes:
+        lats = rng.uniform(8, 37, n)
+        lons = rng.uniform(68, 97, n)
+        ids = np.arange(n)
+        rows = list(zip(ids.tolist(), lats.tolist(), lons.tolist()))
+
+        closure_s, expected = best_of(lambda: closure_nearest(rows, *query, args.limit), args.repeat)
+        build_s, points = best_of(lambda: GeoPoints(ids, lats, lons), args.repeat)
+        vector_s, (got, _) = best_of(lambda: points.nearest(*query, args.limit), args.repeat)
+
+        assert got.tolist() == expected, 'vectorized ranking disagrees with closure'
+        print(f"{n:>10} {closure_s * 1e3:>12.1f} {build_s * 1e3:>10.1f} {vector_s * 1e3:>10.2f} "
+              f"{closure_s / vector_s:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
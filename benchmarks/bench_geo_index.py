@@ -0,0 +1,178 @@
+"""SOS lookups from the in-memory geohash indexes vs bounding-box SQL, with 100k active alerts.
+
+Usage: python benchmarks/bench_geo_index.py [--alerts 100000] [--stations 20000] [--queries 2000] [--radii 1 2 5 25]
+
+Seeds a scratch SQLite database with --alerts active alerts, half spread
+uniformly over India and half clustered around the datagen cities, plus
+datagen's city-clustered stations. Query points follow the same mix, so
+half of them land in the dense clusters.
+
+Reports the time to load the indexes, add/remove cost per alert, the
+cost of one incremental sync poll, and p50/p99 latency of "active alerts
+within R km" (uncapped, and capped at the SOS response's 50) and
+"nearest K stations" from the indexes. The baseline is what the tree
+would otherwise run: a bounding-box query on an indexed latitude and
+longitude (an index added just for the baseline) ranked with GeoPoints,
+and nearest_stations() as /api/stations uses it. Results are checked
+against the baseline for every baseline query.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as smart
+import datagen
+from geo import GeoPoints
+
+INDIA = ((8.0, 35.0), (68.0, 97.0))  # latitude, longitude ranges
+ALERT_TYPES = ['accident', 'mechanical', 'fuel_empty']
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0
+
+
+def positions(rng, count):
+    """Half uniform over India, half within a few km of a city centre"""
+    uniform = count // 2
+    lats = rng.uniform(*INDIA[0], uniform)
+    lons = rng.uniform(*INDIA[1], uniform)
+    city = rng.choice(len(datagen.CITIES), size=count - uniform, p=datagen.CITY_WEIGHTS)
+    clustered = np.array(datagen.CITIES)[city] + rng.normal(0, 0.05, (count - uniform, 2))
+    return np.concatenate([lats, clustered[:, 0]]), np.concatenate([lons, clustered[:, 1]])
+
+
+def timed(fn, points):
+    latencies, results = [], []
+    for lat, lon in points:
+        started = time.perf_counter()
+        results.append(fn(lat, lon))
+        latencies.append(time.perf_counter() - started)
+    return latencies, results
+
+
+def sql_within(lat, lon, radius_km):
+    query = smart.filter_by_bounding_box(
+        smart.EmergencyAlert.query.filter(smart.EmergencyAlert.status == 'active'),
+        smart.EmergencyAlert.latitude, smart.EmergencyAlert.longitude, lat, lon, radius_km)
+    points = GeoPoints.from_rows(query.with_entities(
+        smart.EmergencyAlert.id, smart.EmergencyAlert.latitude, smart.EmergencyAlert.longitude))
+    return points.nearest(lat, lon, len(points), radius_km=radius_km)[0].tolist()
+
+
+def sql_nearest_stations(lat, lon, k, radius_km):
+    rows = smart.nearest_stations(smart.Station.query, lat, lon, radius_km, k, ('id',))
+    return [row['id'] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--alerts', type=int, default=100_000, help='active alerts')
+    parser.add_argument('--stations', type=int, default=20_000)
+    parser.add_argument('--queries', type=int, default=2000, help='index queries per radius')
+    parser.add_argument('--baseline-queries', type=int, default=200, help='SQL queries per radius')
+    parser.add_argument('--radii', type=float, nargs='+', default=[1, 2, 5, 25], help='km')
+    parser.add_argument('--k', type=int, default=5, help='nearest stations')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'geo.db')}",
+                                'PASSWORD_HASH_WORKERS': 0, 'GEO_INDEX_SYNC_SECONDS': 3600,
+                                'STATION_INDEX_SYNC_SECONDS': 3600, 'SOS_NEAREST_STATIONS': args.k})
+        smart.init_db(app)
+        with app.app_context():
+            smart.db.session.execute(smart.db.insert(smart.User), [{
+                'username': 'bench', 'email': 'bench@example.com', 'password_hash': 'x'}])
+            lats, lons = positions(rng, args.alerts)
+            now = datetime.utcnow()
+            raised = now - timedelta(hours=1)  # outside the sync overlap, as in steady state
+            kinds = rng.choice(ALERT_TYPES, size=args.alerts)
+            datagen.insert(smart.EmergencyAlert, [
+                {'user_id': 1, 'alert_type': str(kinds[i]), 'latitude': float(lats[i]), 'longitude': float(lons[i]),
+                 'status': 'active', 'timestamp': raised} for i in range(args.alerts)])
+            datagen.generate_stations(rng, args.stations)
+            smart.db.session.execute(smart.db.text(
+                'CREATE INDEX bench_alert_lat_lon ON emergency_alert (latitude, longitude)'))
+            smart.db.session.execute(smart.db.text('ANALYZE'))
+            smart.db.session.commit()
+
+            started = time.perf_counter()
+            smart.sync_alert_index()
+            alert_load_s = time.perf_counter() - started
+            started = time.perf_counter()
+            smart.load_station_index()
+            station_load_s = time.perf_counter() - started
+
+            index = smart.alert_index
+            new = list(zip(*positions(rng, 10_000)))
+            started = time.perf_counter()
+            for i, (lat, lon) in enumerate(new):
+                index.add(10_000_000 + i, lat, lon, ('accident', now, 1))
+            add_us = (time.perf_counter() - started) / len(new) * 1e6
+            started = time.perf_counter()
+            for i in range(len(new)):
+                index.remove(10_000_000 + i)
+            remove_us = (time.perf_counter() - started) / len(new) * 1e6
+
+            polls = []
+            for _ in range(20):
+                smart.geo_index_state['alerts_checked'] = 0.0
+                started = time.perf_counter()
+                smart.sync_alert_index()
+                polls.append(time.perf_counter() - started)
+
+            print(f"{len(index)} active alerts indexed in {alert_load_s:.2f}s, "
+                  f"{len(smart.station_indexes[None])} stations in {station_load_s:.2f}s")
+            print(f"add {add_us:.1f} us, remove {remove_us:.1f} us per alert; "
+                  f"sync poll p50 {percentile(polls, 0.5):.2f} ms")
+            print()
+
+            points = list(zip(*positions(rng, args.queries)))
+            stride = max(1, len(points) // args.baseline_queries)
+            baseline_points = points[::stride]  # same uniform/city mix as points
+            print(f"{'query':<22} {'hits':>7} {'index p50':>10} {'index p99':>10} {'sql p50':>9} {'sql p99':>9} "
+                  f"{'speedup':>8}")
+            rows = []
+            for radius in args.radii:
+                fast, found = timed(lambda lat, lon: index.within(lat, lon, radius), points)
+                slow, expected = timed(lambda lat, lon: sql_within(lat, lon, radius), baseline_points)
+                for got, want in zip(found[::stride], expected):
+                    assert sorted(i for i, _, _ in got) == sorted(want), 'index disagrees with SQL'
+                hits = np.mean([len(r) for r in found])
+                rows.append((f'alerts within {radius:g} km', hits, fast, slow))
+
+            # What an SOS runs: the nearest DEFAULT_NEARBY_ALERT_LIMIT alerts within ALERT_NEARBY_RADIUS_KM
+            radius, limit = app.config['ALERT_NEARBY_RADIUS_KM'], smart.DEFAULT_NEARBY_ALERT_LIMIT
+            fast, found = timed(lambda lat, lon: index.within(lat, lon, radius, limit), points)
+            slow, expected = timed(lambda lat, lon: sql_within(lat, lon, radius)[:limit], baseline_points)
+            rows.append((f'SOS {limit} within {radius:g} km', np.mean([len(r) for r in found]), fast, slow))
+
+            max_radius = app.config['SOS_STATION_MAX_RADIUS_KM']
+            fast, found = timed(lambda lat, lon: smart.nearest_responder_stations(lat, lon), points)
+            slow, expected = timed(lambda lat, lon: sql_nearest_stations(lat, lon, args.k, max_radius),
+                                   baseline_points)
+            for got, want in zip(found[::stride], expected):
+                assert [s['distance_km'] for s in got] == sorted(s['distance_km'] for s in got)
+                assert len(got) == len(want), 'index disagrees with SQL'
+            rows.append((f'nearest {args.k} stations', np.mean([len(r) for r in found]), fast, slow))
+
+            for label, hits, fast, slow in rows:
+                print(f"{label:<22} {hits:>7.1f} {percentile(fast, 0.5):>10.3f} {percentile(fast, 0.99):>10.3f} "
+                      f"{percentile(slow, 0.5):>9.2f} {percentile(slow, 0.99):>9.2f} "
+                      f"{percentile(slow, 0.5) / percentile(fast, 0.5):>7.0f}x")
+            smart.db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Station lookups through the Overpass tile proxy: cold, warm, and concurrent.
+
+Usage: python benchmarks/bench_overpass.py [--latency 0.3] [--concurrency 16]
+
+Runs the app in-process against benchmarks/overpass_fixture.py and
+reports latency and how many upstream queries each scenario cost.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as smart
+from overpass_fixture import start_fixture_server
+
+
+def lookup(client, lat, lon):
+    resp = client.get(f'/api/stations/osm?latitude={lat}&longitude={lon}&radius_km=5')
+    assert resp.status_code == 200, resp.json
+    return len(resp.json)
+
+
+def scenario(name, fixture, fn):
+    before = fixture.queries
+    start = time.perf_counter()
+    found = fn()
+    ms = (time.perf_counter() - start) * 1000
+    print(f"{name:<34} {ms:>9.1f} {fixture.queries - before:>9} {found:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help='simulated Overpass latency (s)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    fixture = start_fixture_server(latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                                'OVERPASS_URL': fixture.url})
+        smart.init_db(app)
+        client = app.test_client()
+
+        def concurrent(lat, lon):
+            counts = []
+            threads = [threading.Thread(target=lambda: counts.append(lookup(app.test_client(), lat, lon)))
+                       for _ in range(args.concurrency)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return counts[0]
+
+        print(f"{'scenario':<34} {'ms':>9} {'upstream':>9} {'stations':>9}")
+        scenario('cold lookup', fixture, lambda: lookup(client, 12.9716, 77.5946))
+        scenario('warm lookup (same spot)', fixture, lambda: lookup(client, 12.9716, 77.5946))
+        scenario('nearby user (shared tiles)', fixture, lambda: lookup(client, 12.9751, 77.6010))
+        scenario(f'{args.concurrency} concurrent cold lookups', fixture, lambda: concurrent(19.0760, 72.8777))
+        scenario(f'{args.concurrency} concurrent warm lookups', fixture, lambda: concurrent(19.0760, 72.8777))
+    fixture.shutdown()
+
+
+if __name__ == '__main__':
+    main()
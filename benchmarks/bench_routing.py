@@ -0,0 +1,85 @@
+"""Route planning queries/sec on a synthetic city graph, with and without landmarks.
+
+Usage: python benchmarks/bench_routing.py [--size 200x200] [--queries 200] [--landmarks 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import GeoPoints
+from routing import ROUTE_TYPES, RoadGraph, RouteNotFound, plan_route, synthetic_city
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - start:>8.2f}s")
+    return result
+
+
+def run_queries(graph, pairs, route_type, use_landmarks):
+    settled, found = 0, 0
+    start = time.perf_counter()
+    for source, target in pairs:
+        try:
+            settled += graph.shortest_path(source, target, route_type, use_landmarks).settled
+            found += 1
+        except RouteNotFound:
+            pass
+    seconds = time.perf_counter() - start
+    return len(pairs) / seconds, seconds / len(pairs) * 1000, settled / max(found, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='200x200', help='grid ROWSxCOLS (200x200 is a 40 km city)')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--landmarks', type=int, default=8)
+    parser.add_argument('--stations', type=int, default=300)
+    args = parser.parse_args()
+    rows, cols = (int(n) for n in args.size.lower().split('x'))
+
+    graph = timed('build graph', lambda: synthetic_city(rows, cols))
+    print(f"{len(graph)} nodes, {graph.edge_count} edges")
+    timed(f'preprocess ({args.landmarks} landmarks)', lambda: graph.preprocess(landmarks=args.landmarks))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'graph.npz')
+        timed('save', lambda: graph.save(path))
+        print(f"{'file size':<28} {os.path.getsize(path) / 1e6:>8.1f}MB")
+        graph = timed('load', lambda: RoadGraph.load(path))
+
+    rng = np.random.default_rng(1)
+    pairs = rng.integers(0, len(graph), size=(args.queries, 2)).tolist()
+    print(f"\n{'route type':<14} {'search':<8} {'q/s':>8} {'ms/query':>9} {'settled':>9}")
+    for route_type in ROUTE_TYPES:
+        for use_landmarks, name in ((False, 'A*'), (True, 'ALT')):
+            qps, ms, settled = run_queries(graph, pairs, route_type, use_landmarks)
+            print(f"{route_type:<14} {name:<8} {qps:>8.0f} {ms:>9.2f} {settled:>9.0f}")
+
+    # Range-limited trips that need stops: a full tank covers ~40% of the city diagonal
+    idx = rng.choice(len(graph), size=min(args.stations, len(graph)), replace=False)
+    stations = GeoPoints(idx, graph.latitudes[idx], graph.longitudes[idx])
+    diagonal = graph.summarize(graph.shortest_path(0, len(graph) - 1, 'efficient').edges)[2]
+    full = diagonal * 0.4
+    trips = pairs[:max(args.queries // 4, 1)]
+    stops, failed = 0, 0
+    start = time.perf_counter()
+    for source, target in trips:
+        try:
+            stops += len(plan_route(graph, source, target, 'efficient', full * 0.5, full, stations,
+                                    reserve_km=full * 0.1)[1])
+        except RouteNotFound:
+            failed += 1
+    seconds = time.perf_counter() - start
+    print(f"\nplan with stops: {len(trips) / seconds:.0f} plans/s, {seconds / len(trips) * 1000:.1f} ms/plan, "
+          f"{stops / max(len(trips) - failed, 1):.2f} stops/plan, {failed} unreachable")
+
+
+if __name__ == '__main__':
+    main()
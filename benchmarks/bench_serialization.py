@@ -0,0 +1,76 @@
+"""Compare ORM to_dict() + stdlib JSON with column tuples + the fast encoder.
+
+Usage: python benchmarks/bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as smart
+from serialization import brotli, dumps, orjson
+
+
+def seed(rows):
+    user = smart.User(username='bench', email='bench@example.com', password_hash='x')
+    smart.db.session.add(user)
+    smart.db.session.flush()
+    vehicle = smart.Vehicle(user_id=user.id, vehicle_name='Bench', vehicle_type='ev')
+    smart.db.session.add(vehicle)
+    smart.db.session.flush()
+    now = datetime.utcnow()
+    smart.db.session.execute(smart.db.insert(smart.EnergyLog), [{
+        'user_id': user.id, 'vehicle_id': vehicle.id, 'energy_consumed': 10 + i % 7,
+        'distance_traveled': 60 + i % 13, 'cost': 8.5, 'efficiency': 6.0, 'co2_emissions': 1.2,
+        'date': now - timedelta(minutes=i), 'notes': 'bench' if i % 5 == 0 else None
+    } for i in range(rows)])
+    smart.db.session.commit()
+
+
+def before():
+    logs = smart.EnergyLog.query.all()
+    return json.dumps([log.to_dict() for log in logs], sort_keys=True).encode()
+
+
+def after():
+    fields = smart.EnergyLog.api_fields
+    rows = smart.select_columns(smart.EnergyLog.query, smart.EnergyLog, fields).all()
+    return dumps(smart.rows_to_dicts(rows, fields))
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        smart.db.session.expunge_all()
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = smart.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        smart.db.create_all()
+        seed(args.rows)
+        print(f"encoder: {'orjson' if orjson else 'stdlib json'}, brotli: {'yes' if brotli else 'no'}")
+        print(f"{'path':>8} {'ms/10k rows':>12} {'bytes':>10} {'gzip':>9} {'br':>9}")
+        for name, fn in (('before', before), ('after', after)):
+            seconds, body = best_of(fn, args.repeat)
+            br = len(brotli.compress(body, quality=4)) if brotli else '-'
+            print(f"{name:>8} {seconds * 1e3 * 10_000 / args.rows:>12.1f} {len(body):>10} "
+                  f"{len(gzip.compress(body, 6)):>9} {br:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,434 @@
+"""Reproducible load scenarios for the API with latency, throughput and memory reports.
+
+Usage:
+    python benchmarks/bench_suite.py [--scenarios dashboard ingest stations sos routes]
+        [--target client|server] [--users 50] [--days 90] [--stations 5000]
+        [--requests 400] [--concurrency 8] [--output benchmarks/results]
+        [--compare OLD.json] [--threshold 0.15]
+
+Seeds a scratch SQLite database with benchmarks/datagen.py, then has
+--concurrency virtual users replay each scenario against the Flask test
+client in this process or against gunicorn started with gunicorn.conf.py.
+Every virtual user follows its own seeded script, so two runs issue the
+same requests. Per endpoint the report gives p50/p95/p99 latency,
+throughput and the peak RSS seen while it was being served (summed over
+the gunicorn master and workers for --target server).
+
+Results are saved as JSON named after the current commit. --compare loads
+an earlier result, prints p95 and throughput changes, and exits with
+status 1 when an endpoint regressed by more than --threshold.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as smart
+import datagen
+import loadtest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BULK_BURST = 200
+
+
+# ----- targets -----
+
+class ClientTarget:
+    """Requests go through the Flask test client inside this process"""
+
+    name = 'client'
+
+    def __init__(self, app, database_url, args):
+        self.app = app
+
+    def session(self):
+        return self.app.test_client()
+
+    def request(self, session, method, path, body=None):
+        resp = session.open(path, method=method, json=body)
+        return resp.status_code, resp.get_data()
+
+    def pids(self):
+        return [os.getpid()]
+
+    def close(self):
+        pass
+
+
+class ServerTarget:
+    """Requests go over HTTP to a gunicorn started for the run"""
+
+    name = 'server'
+
+    def __init__(self, app, database_url, args):
+        self.port = loadtest.free_port()
+        env = dict(os.environ, DATABASE_URL=database_url, BIND=f'127.0.0.1:{self.port}',
+                   WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+                   START_BACKGROUND_WORKERS='0')
+        self.process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        loadtest.wait_ready(self.port)
+
+    def session(self):
+        return {'conn': http.client.HTTPConnection('127.0.0.1', self.port), 'cookie': None}
+
+    def request(self, session, method, path, body=None):
+        try:
+            resp, data = loadtest.request(session['conn'], method, path, body, session['cookie'])
+        except (OSError, http.client.HTTPException):
+            session['conn'] = http.client.HTTPConnection('127.0.0.1', self.port)
+            return 0, b''
+        cookie = resp.getheader('Set-Cookie')
+        if cookie:
+            session['cookie'] = cookie.split(';', 1)[0]
+        return resp.status, data
+
+    def pids(self):
+        try:
+            with open(f'/proc/{self.process.pid}/task/{self.process.pid}/children') as f:
+                children = [int(pid) for pid in f.read().split()]
+        except OSError:
+            children = []
+        return [self.process.pid] + children
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+TARGETS = {'client': ClientTarget, 'server': ServerTarget}
+
+
+# ----- memory -----
+
+def rss_bytes(pid):
+    """Resident set size of a process, from /proc where available"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        # Peak rather than current, but the best portable figure
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return 0
+
+
+class RSSSampler(threading.Thread):
+    """Poll the combined RSS of the target's processes"""
+
+    def __init__(self, pids, interval=0.05):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.get_pids = pids
+        self.interval = interval
+        self.current = 0
+        self.peak = 0
+        self.stop = threading.Event()
+
+    def sample(self):
+        self.current = sum(rss_bytes(pid) for pid in self.get_pids())
+        self.peak = max(self.peak, self.current)
+        return self.current
+
+    def reset(self):
+        self.peak = self.sample()
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            self.sample()
+
+
+# ----- virtual users and scenarios -----
+
+class VirtualUser:
+    """One logged-in client replaying a seeded script"""
+
+    def __init__(self, target, sampler, index, users, seed):
+        self.target = target
+        self.sampler = sampler
+        self.rng = random.Random(seed * 1000 + index)
+        self.session = target.session()
+        self.alerts = []
+        self.samples = []  # (label, seconds, status, rss)
+        status, _ = target.request(self.session, 'POST', '/api/auth/login',
+                                   {'username': f'bench{index % users}', 'password': datagen.BENCH_PASSWORD})
+        if status != 200:
+            raise RuntimeError(f'login failed for bench{index % users}: {status}')
+        _, data = target.request(self.session, 'GET', '/api/vehicles')
+        self.vehicles = [(v['id'], v['vehicle_type']) for v in json.loads(data)]
+        self.home = datagen.CITIES[index % len(datagen.CITIES)]
+
+    def call(self, label, method, path, body=None):
+        started = time.perf_counter()
+        status, data = self.target.request(self.session, method, path, body)
+        self.samples.append((label, time.perf_counter() - started, status, self.sampler.current))
+        return status, data
+
+    def vehicle(self):
+        return self.rng.choice(self.vehicles)
+
+    def trip(self):
+        vehicle_id, vehicle_type = self.vehicle()
+        distance = round(min(self.rng.lognormvariate(math.log(12), 0.75), 400), 2)
+        energy = round(distance / smart.REFERENCE_EFFICIENCY.get(vehicle_type, 12), 3)
+        return {'vehicle_id': vehicle_id, 'distance_traveled': distance, 'energy_consumed': energy,
+                'cost': round(energy * datagen.UNIT_PRICE.get(vehicle_type, 100), 2),
+                'co2_emissions': round(energy * datagen.CO2_PER_UNIT.get(vehicle_type, 2.31), 3)}
+
+    def nearby(self):
+        lat, lon = self.home
+        return lat + self.rng.gauss(0, 0.05), lon + self.rng.gauss(0, 0.05)
+
+
+def dashboard_metrics(vu):
+    vu.call('GET /api/dashboard/metrics', 'GET', f'/api/dashboard/metrics?vehicle_type={vu.vehicle()[1]}')
+
+
+def dashboard_forecast(vu):
+    vu.call('GET /api/dashboard/forecast', 'GET', f'/api/dashboard/forecast?vehicle_type={vu.vehicle()[1]}')
+
+
+def dashboard_behavior(vu):
+    vu.call('GET /api/dashboard/behavior', 'GET', f'/api/dashboard/behavior?vehicle_type={vu.vehicle()[1]}')
+
+
+def energy_summary(vu):
+    days = vu.rng.choice([7, 30, 90])
+    group_by = vu.rng.choice(['day', 'week', 'vehicle'])
+    vu.call('GET /api/energy-summary', 'GET', f'/api/energy-summary?days={days}&group_by={group_by}')
+
+
+def energy_logs_page(vu):
+    vu.call('GET /api/energy-logs', 'GET', '/api/energy-logs?days=30&limit=50')
+
+
+def vehicle_list(vu):
+    vu.call('GET /api/vehicles', 'GET', '/api/vehicles')
+
+
+def fleet_range(vu):
+    vu.call('GET /api/vehicles/remaining-range', 'GET', '/api/vehicles/remaining-range')
+
+
+def log_trip(vu):
+    vu.call('POST /api/energy-logs', 'POST', '/api/energy-logs', vu.trip())
+
+
+def log_burst(vu):
+    vu.call('POST /api/energy-logs/bulk', 'POST', '/api/energy-logs/bulk', [vu.trip() for _ in range(BULK_BURST)])
+
+
+def station_search(vu):
+    lat, lon = vu.nearby()
+    radius = vu.rng.choice([5, 10, 25])
+    vu.call('GET /api/stations', 'GET', f'/api/stations?latitude={lat:.4f}&longitude={lon:.4f}&radius_km={radius}')
+
+
+def station_search_by_type(vu):
+    lat, lon = vu.nearby()
+    kind = vu.rng.choice(datagen.STATION_TYPES)
+    vu.call('GET /api/stations?station_type', 'GET',
+            f'/api/stations?latitude={lat:.4f}&longitude={lon:.4f}&station_type={kind}')
+
+
+def raise_alert(vu):
+    lat, lon = vu.nearby()
+    status, data = vu.call('POST /api/emergency-alert', 'POST', '/api/emergency-alert',
+                           {'vehicle_id': vu.vehicle()[0], 'alert_type': vu.rng.choice(['breakdown', 'accident']),
+                            'latitude': lat, 'longitude': lon})
+    if status == 201:
+        vu.alerts.append(json.loads(data)['id'])
+
+
+def alert_status(vu):
+    if not vu.alerts:
+        return raise_alert(vu)
+    vu.call('GET /api/emergency-alert/<id>/notifications', 'GET',
+            f'/api/emergency-alert/{vu.rng.choice(vu.alerts)}/notifications')
+
+
+def route_page(vu):
+    vu.call('GET /api/routes', 'GET', '/api/routes?limit=50')
+
+
+def route_stream(vu):
+    vu.call('GET /api/routes?format=ndjson', 'GET', '/api/routes?format=ndjson')
+
+
+# scenario -> [(weight, step)]
+SCENARIOS = {
+    'dashboard': [(3, dashboard_metrics), (2, dashboard_forecast), (1, dashboard_behavior), (3, energy_summary),
+                  (2, energy_logs_page), (2, vehicle_list), (1, fleet_range)],
+    'ingest': [(6, log_trip), (1, log_burst)],
+    'stations': [(3, station_search), (1, station_search_by_type)],
+    'sos': [(1, raise_alert), (2, alert_status)],
+    'routes': [(3, route_page), (1, route_stream)],
+}
+
+
+def run_scenario(name, vus, requests, sampler):
+    """Have every virtual user issue its share of requests; returns the scenario report"""
+    weights, steps = zip(*SCENARIOS[name])
+    quota = math.ceil(requests / len(vus))
+    for vu in vus:
+        vu.samples = []
+
+    def drive(vu):
+        for step in vu.rng.choices(steps, weights=weights, k=quota):
+            step(vu)
+
+    sampler.reset()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(vu,)) for vu in vus]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [s for vu in vus for s in vu.samples]
+    endpoints = {}
+    for label in sorted({s[0] for s in samples}):
+        rows = [s for s in samples if s[0] == label]
+        ms = np.array([s[1] for s in rows]) * 1000
+        endpoints[label] = {
+            'requests': len(rows),
+            'errors': sum(1 for s in rows if not 200 <= s[2] < 400),
+            'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p95_ms': round(float(np.percentile(ms, 95)), 2),
+            'p99_ms': round(float(np.percentile(ms, 99)), 2),
+            'mean_ms': round(float(ms.mean()), 2),
+            'throughput_rps': round(len(rows) / elapsed, 1),
+            'peak_rss_mb': round(max(s[3] for s in rows) / 2 ** 20, 1),
+        }
+    return {'seconds': round(elapsed, 3), 'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'peak_rss_mb': round(sampler.peak / 2 ** 20, 1), 'endpoints': endpoints}
+
+
+# ----- reporting -----
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def print_scenario(name, report):
+    print(f"\n{name}: {report['requests']} requests in {report['seconds']:.2f}s, "
+          f"{report['throughput_rps']:.0f} req/s, peak RSS {report['peak_rss_mb']:.0f} MB")
+    print(f"  {'endpoint':<48} {'n':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7} {'RSS MB':>7}")
+    for label, e in report['endpoints'].items():
+        print(f"  {label:<48} {e['requests']:>5} {e['errors']:>4} {e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} "
+              f"{e['p99_ms']:>8.1f} {e['throughput_rps']:>7.1f} {e['peak_rss_mb']:>7.0f}")
+
+
+def compare(old, new, threshold):
+    """Print p95/throughput deltas per endpoint; returns the regressed endpoints"""
+    regressions = []
+    print(f"\ncompared with {old['meta']['commit']} ({old['meta']['timestamp']})")
+    for key in ('target', 'users', 'days', 'requests', 'concurrency'):
+        if old['meta']['args'].get(key) != new['meta']['args'].get(key):
+            print(f"  warning: --{key} differs ({old['meta']['args'].get(key)} vs {new['meta']['args'].get(key)})")
+    print(f"  {'scenario / endpoint':<58} {'p95 ms':>17} {'change':>7} {'req/s':>15} {'change':>7}")
+    for scenario, report in new['scenarios'].items():
+        before = old['scenarios'].get(scenario, {}).get('endpoints', {})
+        for label, e in report['endpoints'].items():
+            if label not in before:
+                continue
+            b = before[label]
+            p95 = e['p95_ms'] / b['p95_ms'] - 1 if b['p95_ms'] else 0.0
+            rps = e['throughput_rps'] / b['throughput_rps'] - 1 if b['throughput_rps'] else 0.0
+            regressed = p95 > threshold or rps < -threshold
+            if regressed:
+                regressions.append(f'{scenario} {label}')
+            print(f"  {scenario + ' ' + label:<58} {b['p95_ms']:>8.1f}->{e['p95_ms']:<8.1f}{p95:>+7.0%} "
+                  f"{b['throughput_rps']:>7.0f}->{e['throughput_rps']:<7.0f}{rps:>+7.0%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--target', choices=list(TARGETS), default='client')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--stations', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=400, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='virtual users')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (--target server)')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results'))
+    parser.add_argument('--compare', help='earlier result JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'ARCHIVE_DIR': os.path.join(tmp, 'archive')})
+        smart.init_db(app)
+        with app.app_context():
+            dataset = datagen.generate(args.users, args.days, args.stations, args.seed)
+            smart.db.engine.dispose()
+        print(f"dataset: {dataset}")
+
+        target = TARGETS[args.target](app, database_url, args)
+        sampler = RSSSampler(target.pids)
+        sampler.start()
+        try:
+            vus = [VirtualUser(target, sampler, i, args.users, args.seed) for i in range(args.concurrency)]
+            scenarios = {}
+            for name in args.scenarios:
+                scenarios[name] = run_scenario(name, vus, args.requests, sampler)
+                print_scenario(name, scenarios[name])
+        finally:
+            sampler.stop.set()
+            target.close()
+
+    result = {
+        'meta': {'commit': commit, 'dirty': dirty, 'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpus': os.cpu_count(), 'args': vars(args), 'dataset': dataset},
+        'scenarios': scenarios,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{commit}{'-dirty' if dirty else ''}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Vehicle state update throughput and lost writes: PUT read-modify-write vs versioned PATCH.
+
+Usage: python benchmarks/bench_vehicle_updates.py [--vehicles 200] [--updates 2000] [--threads 8] [--batch 100]
+
+Throughput: --threads clients send --updates level changes in total to
+random vehicles through PUT (loads the row, setattr, commit, re-serialize),
+PATCH (one UPDATE per request) and batched PATCH (--batch vehicles per
+request).
+
+Lost writes: every client adds 1 km to the same vehicle's mileage
+--increments times. With PUT each client reads the vehicle and writes back
+mileage + 1, so concurrent increments overwrite each other. With PATCH
+the write carries the version that was read and is retried on 409, so
+the final mileage equals the number of increments.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as smart
+
+
+def client(app):
+    c = app.test_client()
+    c.post('/api/auth/login', json={'username': 'bench', 'password': 'bench-password'})
+    return c
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started
+
+
+def throughput(app, mode, vehicle_ids, args):
+    per_thread = args.updates // args.threads
+    failures = []
+
+    def work(index):
+        c = client(app)
+        rng = random.Random(index)
+        if mode == 'batch':
+            for _ in range(per_thread // args.batch):
+                body = [{'id': rng.choice(vehicle_ids), 'current_fuel': round(rng.uniform(0, 40), 2)}
+                        for _ in range(args.batch)]
+                resp = c.patch('/api/vehicles', json=body)
+                if resp.status_code != 200 or resp.json['errors']:
+                    failures.append(resp.status_code)
+            return
+        for _ in range(per_thread):
+            vehicle_id = rng.choice(vehicle_ids)
+            body = {'current_fuel': round(rng.uniform(0, 40), 2)}
+            resp = (c.put if mode == 'put' else c.patch)(f'/api/vehicles/{vehicle_id}', json=body)
+            if resp.status_code != 200:
+                failures.append(resp.status_code)
+
+    elapsed = run_threads(args.threads, work)
+    done = per_thread // args.batch * args.batch if mode == 'batch' else per_thread
+    return done * args.threads / elapsed, len(failures)
+
+
+def lost_writes(app, mode, vehicle_id, args):
+    retries = []
+
+    def work(index):
+        c = client(app)
+        for _ in range(args.increments):
+            while True:
+                vehicle = c.get(f'/api/vehicles/{vehicle_id}').json
+                if mode == 'put':
+                    c.put(f'/api/vehicles/{vehicle_id}', json={'mileage': vehicle['mileage'] + 1})
+                    break
+                resp = c.patch(f'/api/vehicles/{vehicle_id}',
+                               json={'mileage': vehicle['mileage'] + 1, 'version': vehicle['version']})
+                if resp.status_code == 200:
+                    break
+                retries.append(1)
+
+    c = client(app)
+    c.put(f'/api/vehicles/{vehicle_id}', json={'mileage': 0})
+    run_threads(args.threads, work)
+    expected = args.threads * args.increments
+    final = c.get(f'/api/vehicles/{vehicle_id}').json['mileage']
+    return expected, final, len(retries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vehicles', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=2000, help='level updates per throughput run')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--batch', type=int, default=100, help='vehicles per batched PATCH')
+    parser.add_argument('--increments', type=int, default=50, help='mileage increments per client')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = smart.create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                                'PASSWORD_HASH_WORKERS': 0})
+        smart.init_db(app)
+        c = app.test_client()
+        c.post('/api/auth/register', json={'username': 'bench', 'email': 'bench@example.com',
+                                           'password': 'bench-password'})
+        vehicle_ids = [c.post('/api/vehicles', json={'vehicle_name': f'Car {i}', 'vehicle_type': 'petrol',
+                                                     'fuel_capacity': 40, 'current_fuel': 20}).json['id']
+                       for i in range(args.vehicles)]
+
+        print(f"{args.threads} threads, {args.vehicles} vehicles")
+        print(f"{'mode':<14} {'updates/s':>10} {'failed':>7}")
+        for mode, label in (('put', 'PUT'), ('patch', 'PATCH'), ('batch', f'PATCH x{args.batch}')):
+            rate, failed = throughput(app, mode, vehicle_ids, args)
+            print(f"{label:<14} {rate:>10.0f} {failed:>7}")
+
+        print()
+        print(f"{'mode':<14} {'increments':>10} {'final':>7} {'lost':>6} {'retries':>8}")
+        for mode, label in (('put', 'PUT'), ('patch', 'PATCH+version')):
+            expected, final, retries = lost_writes(app, mode, vehicle_ids[0], args)
+            print(f"{label:<14} {expected:>10} {final:>7.0f} {expected - final:>6.0f} {retries:>8}")
+
+
+if __name__ == '__main__':
+    main()
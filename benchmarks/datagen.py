@@ -0,0 +1,192 @@
+"""Synthetic users, vehicles, energy logs, routes, stations and alerts for benchmarks.
+
+Usage: python benchmarks/datagen.py DATABASE_URL [--users 200] [--days 180] [--stations 5000] [--seed 7]
+
+Distributions are chosen to look like the real workload rather than be
+uniform: most users own one vehicle, petrol dominates the fleet, trips
+cluster around commute hours with log-normal distances, per-vehicle
+efficiency scatters around the dashboard's reference figures and stations
+cluster around a handful of cities. Every user can log in as
+bench<N> with password BENCH_PASSWORD. The same seed always produces the
+same data.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as smart
+from credentials import hash_password
+
+BENCH_PASSWORD = 'bench-password'
+INSERT_CHUNK = 5000
+
+# Delhi, Mumbai, Bengaluru, Chennai, Kolkata
+CITIES = [(28.6139, 77.2090), (19.0760, 72.8777), (12.9716, 77.5946), (13.0827, 80.2707), (22.5726, 88.3639)]
+CITY_WEIGHTS = [0.3, 0.25, 0.2, 0.15, 0.1]
+
+VEHICLE_TYPES = ['petrol', 'ev', 'hybrid', 'cnc']
+VEHICLE_TYPE_WEIGHTS = [0.5, 0.25, 0.15, 0.1]
+UNIT_PRICE = {'petrol': 102.0, 'ev': 8.0, 'hybrid': 102.0, 'cnc': 76.0}  # per L, kWh or kg
+CO2_PER_UNIT = {'petrol': 2.31, 'ev': 0.82, 'hybrid': 2.31, 'cnc': 2.75}  # kg
+STATION_TYPES = ['Petrol', 'EV_Charging', 'CNC']
+STATION_TYPE_WEIGHTS = [0.55, 0.3, 0.15]
+ROUTE_TYPES = ['shortest', 'efficient', 'traffic-aware']
+
+
+def insert(model, rows):
+    for i in range(0, len(rows), INSERT_CHUNK):
+        smart.db.session.execute(smart.db.insert(model), rows[i:i + INSERT_CHUNK])
+
+
+def trip_hours(rng, n):
+    """Hour of day for n trips: morning and evening commute peaks plus daytime noise"""
+    kind = rng.choice(3, size=n, p=[0.4, 0.4, 0.2])
+    hours = np.where(kind == 0, rng.normal(8.5, 1.2, n),
+                     np.where(kind == 1, rng.normal(18.0, 1.5, n), rng.uniform(6, 23, n)))
+    return np.clip(hours, 0, 23.99)
+
+
+def generate_users(rng, count, password_hash):
+    now = datetime.utcnow()
+    insert(smart.User, [{'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password_hash': password_hash,
+                         'full_name': f'Bench User {i}', 'created_at': now} for i in range(count)])
+    return [row[0] for row in smart.db.session.query(smart.User.id).filter(
+        smart.User.username.like('bench%')).order_by(smart.User.id)]
+
+
+def generate_vehicles(rng, user_ids):
+    per_user = np.clip(1 + rng.poisson(0.6, len(user_ids)), 1, 4)
+    rows = []
+    for user_id, count in zip(user_ids, per_user):
+        for n in range(count):
+            vehicle_type = rng.choice(VEHICLE_TYPES, p=VEHICLE_TYPE_WEIGHTS)
+            ev = vehicle_type == 'ev'
+            rows.append({'user_id': user_id, 'vehicle_name': f'{vehicle_type.upper()} {n + 1}',
+                         'vehicle_type': str(vehicle_type), 'year': int(rng.integers(2012, 2025)),
+                         'fuel_capacity': None if ev else float(rng.choice([35, 40, 45, 50])),
+                         'battery_capacity': float(rng.choice([30, 40, 60, 75])) if ev else None,
+                         'current_fuel': None if ev else float(rng.uniform(5, 40)),
+                         'current_battery': float(rng.uniform(10, 100)) if ev else None})
+    insert(smart.Vehicle, rows)
+    return smart.db.session.query(smart.Vehicle.id, smart.Vehicle.user_id, smart.Vehicle.vehicle_type).filter(
+        smart.Vehicle.user_id.in_(user_ids)).all()
+
+
+def generate_logs(rng, vehicles, days):
+    """Daily trips per vehicle with log-normal distances and noisy per-vehicle efficiency"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for vehicle_id, user_id, vehicle_type in vehicles:
+        efficiency = smart.REFERENCE_EFFICIENCY.get(vehicle_type, 12) * rng.normal(1.0, 0.12)
+        trips = rng.poisson(rng.lognormal(np.log(1.2), 0.5), days)
+        n = int(trips.sum())
+        if not n:
+            continue
+        day = np.repeat(np.arange(days), trips)
+        hours = trip_hours(rng, n)
+        distance = np.clip(rng.lognormal(np.log(12), 0.75, n), 0.5, 400)
+        trip_efficiency = efficiency * np.clip(rng.normal(1.0, 0.08, n), 0.6, 1.4)
+        energy = distance / trip_efficiency
+        cost = energy * UNIT_PRICE[vehicle_type] * rng.normal(1.0, 0.05, n)
+        co2 = energy * CO2_PER_UNIT[vehicle_type]
+        for i in range(n):
+            rows.append({'user_id': user_id, 'vehicle_id': vehicle_id,
+                         'date': today - timedelta(days=int(day[i])) + timedelta(hours=float(hours[i])),
+                         'energy_consumed': round(float(energy[i]), 3),
+                         'distance_traveled': round(float(distance[i]), 2), 'cost': round(float(cost[i]), 2),
+                         'efficiency': round(float(trip_efficiency[i]), 2), 'co2_emissions': round(float(co2[i]), 3)})
+    insert(smart.EnergyLog, rows)
+    return len(rows)
+
+
+def generate_routes(rng, vehicles, days):
+    now = datetime.utcnow()
+    rows = []
+    for vehicle_id, _, vehicle_type in vehicles:
+        for _ in range(rng.poisson(3)):
+            distance = float(np.clip(rng.lognormal(np.log(25), 0.9), 1, 800))
+            estimate = distance / smart.REFERENCE_EFFICIENCY.get(vehicle_type, 12)
+            completed = bool(rng.random() < 0.7)
+            rows.append({'vehicle_id': vehicle_id, 'start_location': f'Place {rng.integers(1000)}',
+                         'end_location': f'Place {rng.integers(1000)}', 'distance': round(distance, 1),
+                         'estimated_energy': round(estimate, 2),
+                         'actual_energy': round(estimate * rng.normal(1.0, 0.1), 2) if completed else None,
+                         'route_type': str(rng.choice(ROUTE_TYPES)), 'completed': completed,
+                         'timestamp': now - timedelta(days=float(rng.uniform(0, days)))})
+    insert(smart.Route, rows)
+    return len(rows)
+
+
+def generate_stations(rng, count):
+    """Stations scattered around the cities, denser toward each centre"""
+    city = rng.choice(len(CITIES), size=count, p=CITY_WEIGHTS)
+    centres = np.array(CITIES)[city]
+    points = centres + rng.normal(0, 0.08, (count, 2))
+    kinds = rng.choice(STATION_TYPES, size=count, p=STATION_TYPE_WEIGHTS)
+    rows = []
+    for i in range(count):
+        kind = str(kinds[i])
+        rows.append({'name': f'{kind} Station {i}', 'latitude': float(points[i, 0]), 'longitude': float(points[i, 1]),
+                     'station_type': kind, 'rating': round(float(rng.uniform(3, 5)), 1),
+                     'open_24_7': bool(rng.random() < 0.3),
+                     'price_per_unit': round(float(rng.normal(12 if kind == 'EV_Charging' else 100, 4)), 2)})
+    insert(smart.Station, rows)
+    return count
+
+
+def generate_alerts(rng, vehicles, days):
+    """A few resolved alerts per hundred vehicles"""
+    now = datetime.utcnow()
+    rows = []
+    for vehicle_id, user_id, _ in vehicles:
+        if rng.random() < 0.03:
+            lat, lon = CITIES[rng.choice(len(CITIES), p=CITY_WEIGHTS)]
+            rows.append({'user_id': user_id, 'vehicle_id': vehicle_id,
+                         'alert_type': str(rng.choice(['breakdown', 'accident', 'low_energy'])),
+                         'latitude': lat + rng.normal(0, 0.05), 'longitude': lon + rng.normal(0, 0.05),
+                         'status': 'resolved', 'timestamp': now - timedelta(days=float(rng.uniform(0, days)))})
+    insert(smart.EmergencyAlert, rows)
+    return len(rows)
+
+
+def generate(users=200, days=180, stations=5000, seed=7):
+    """Populate the current app's database; returns row counts. Call inside an app context."""
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    user_ids = generate_users(rng, users, hash_password(BENCH_PASSWORD, current_app.config['PASSWORD_HASH_METHOD']))
+    vehicles = generate_vehicles(rng, user_ids)
+    counts = {'users': len(user_ids), 'vehicles': len(vehicles),
+              'energy_logs': generate_logs(rng, vehicles, days), 'routes': generate_routes(rng, vehicles, days),
+              'stations': generate_stations(rng, stations), 'alerts': generate_alerts(rng, vehicles, days)}
+    smart.db.session.commit()
+    smart.rebuild_rollups()
+    smart.retrain_efficiency_models()
+    smart.compute_dashboard_metrics()
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database_url', help='e.g. sqlite:////tmp/bench.db')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--stations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    app = smart.create_app({'SQLALCHEMY_DATABASE_URI': args.database_url})
+    smart.init_db(app)
+    with app.app_context():
+        print(generate(args.users, args.days, args.stations, args.seed))
+
+
+if __name__ == '__main__':
+    main()
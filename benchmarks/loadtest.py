@@ -0,0 +1,139 @@
+"""Measure requests/sec against gunicorn as the worker count grows.
+
+Usage: python benchmarks/loadtest.py [--workers 1 2 4] [--clients 32] [--duration 10]
+
+Each run boots gunicorn with gunicorn.conf.py on a scratch SQLite database,
+seeds one user with a vehicle and some energy logs, then drives a mix of
+authenticated GET and POST requests from client threads.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIO = [
+    ('GET', '/api/vehicles', None),
+    ('GET', '/api/energy-summary?days=30', None),
+    ('GET', '/api/energy-logs?limit=50', None),
+    ('GET', '/api/stations?latitude=28.6&longitude=77.2', None),
+    ('POST', '/api/energy-logs', 'log'),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(conn, method, path, body=None, cookie=None):
+    headers = {'Content-Type': 'application/json'}
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    return resp, data
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            request(conn, 'GET', '/api/vehicle/unit')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+def seed(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    resp, _ = request(conn, 'POST', '/api/auth/register',
+                      {'username': 'load', 'email': 'load@example.com', 'password': 'load-test'})
+    cookie = resp.getheader('Set-Cookie').split(';', 1)[0]
+    _, data = request(conn, 'POST', '/api/vehicles', {'vehicle_name': 'Load', 'vehicle_type': 'ev'}, cookie)
+    vehicle_id = json.loads(data)['id']
+    for i in range(200):
+        request(conn, 'POST', '/api/energy-logs', {'vehicle_id': vehicle_id, 'energy_consumed': 10,
+                                                   'distance_traveled': 50 + i % 20, 'cost': 8}, cookie)
+    return cookie, vehicle_id
+
+
+def client(port, cookie, vehicle_id, stop, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    log = {'vehicle_id': vehicle_id, 'energy_consumed': 10, 'distance_traveled': 60, 'cost': 8}
+    i = 0
+    while not stop.is_set():
+        method, path, body = SCENARIO[i % len(SCENARIO)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            resp, _ = request(conn, method, path, log if body == 'log' else None, cookie)
+            if resp.status >= 400:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(workers, clients, duration, threads):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}",
+                   WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+                   BIND=f'127.0.0.1:{port}', START_BACKGROUND_WORKERS='0')
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(port)
+            cookie, vehicle_id = seed(port)
+            stop = threading.Event()
+            latencies, errors = [], []
+            pool = [threading.Thread(target=client, args=(port, cookie, vehicle_id, stop, latencies, errors))
+                    for _ in range(clients)]
+            for t in pool:
+                t.start()
+            time.sleep(duration)
+            stop.set()
+            for t in pool:
+                t.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+    return {'workers': workers, 'requests': len(latencies), 'errors': len(errors),
+            'rps': len(latencies) / duration, 'p50_ms': pct(0.50), 'p95_ms': pct(0.95)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for workers in args.workers:
+        r = run(workers, args.clients, args.duration, args.threads)
+        print(f"{r['workers']:>8} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8.0f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Local stand-in for the Overpass API serving deterministic synthetic stations.
+
+Usage: python benchmarks/overpass_fixture.py [--port 8765] [--latency 0.3]
+Then run the app with OVERPASS_URL=http://127.0.0.1:8765/api/interpreter.
+
+Stations sit on a fixed 0.01 degree lattice, so overlapping bounding boxes
+return the same elements. GET /stats reports how many queries were served.
+"""
+import argparse
+import json
+import math
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRID_DEGREES = 0.01
+BBOX_RE = re.compile(r'\((-?[\d.]+),(-?[\d.]+),(-?[\d.]+),(-?[\d.]+)\)')
+
+
+def synthetic_elements(south, west, north, east):
+    """Stations on lattice points inside the box; about one point in five has one"""
+    elements = []
+    for i in range(math.ceil(south / GRID_DEGREES), math.floor(north / GRID_DEGREES) + 1):
+        for j in range(math.ceil(west / GRID_DEGREES), math.floor(east / GRID_DEGREES) + 1):
+            key = (i * 73856093) ^ (j * 19349663)
+            if key % 5:
+                continue
+            lat, lon = i * GRID_DEGREES, j * GRID_DEGREES
+            element_id = abs(key) % 10 ** 10
+            tags = {'name': f'Station {element_id}'}
+            if key % 3 == 0:
+                tags.update(amenity='charging_station', **{'charging:price': '12'})
+            else:
+                tags.update(amenity='fuel', **{'fuel:price': '96.5', 'opening_hours': '24/7'})
+                if key % 7 == 0:
+                    tags['fuel:cng'] = 'yes'
+            if key % 2:
+                elements.append({'type': 'node', 'id': element_id, 'lat': lat, 'lon': lon, 'tags': tags})
+            else:
+                elements.append({'type': 'way', 'id': element_id, 'center': {'lat': lat, 'lon': lon}, 'tags': tags})
+    return elements
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, FixtureHandler)
+        self.latency = latency
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/api/interpreter'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send(200, {'queries': self.server.queries})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        ql = urllib.parse.parse_qs(self.rfile.read(length).decode()).get('data', [''])[0]
+        match = BBOX_RE.search(ql)
+        if not match:
+            self._send(400, {'error': 'query has no bounding box'})
+            return
+        with self.server.lock:
+            self.server.queries += 1
+        time.sleep(self.server.latency)
+        self._send(200, {'elements': synthetic_elements(*map(float, match.groups()))})
+
+
+def start_fixture_server(port=0, latency=0.0):
+    """Serve in a background thread; returns the server (see .url, .queries)"""
+    server = FixtureServer(('127.0.0.1', port), latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds added to every query')
+    args = parser.parse_args()
+    server = FixtureServer(('127.0.0.1', args.port), latency=args.latency)
+    print(f'Overpass fixture listening on {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
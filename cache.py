@@ -0,0 +1,188 @@
+"""Pluggable response cache backends with namespace invalidation"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class LocalGenerations:
+    """Namespace generation counters held in this process only"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespaces):
+        with self._lock:
+            return {ns: self._values.get(ns, 0) for ns in namespaces}
+
+    def bump(self, namespaces):
+        with self._lock:
+            for ns in namespaces:
+                self._values[ns] = self._values.get(ns, 0) + 1
+
+
+class TableGenerations:
+    """Namespace generation counters in a database table, shared by every worker process.
+
+    model needs a string primary key `namespace` and an integer
+    `generation`. A read fetches just the requested namespaces by primary
+    key with one prebuilt Core statement, the list bound as an expanding
+    parameter. A bump is one upsert committed on its own connection, so
+    call it after the write it announces has committed.
+    """
+
+    def __init__(self, db, model):
+        self.db = db
+        self.model = model
+        table = model.__table__
+        self._select = db.select(table.c.namespace, table.c.generation).where(
+            table.c.namespace.in_(db.bindparam('namespaces', expanding=True)))
+
+    def get(self, namespaces):
+        namespaces = list(namespaces)
+        with self.db.engine.connect() as conn:
+            values = dict(conn.execute(self._select, {'namespaces': namespaces}).all())
+        return {ns: values.get(ns, 0) for ns in namespaces}
+
+    def bump(self, namespaces):
+        table = self.model.__table__
+        insert = postgresql.insert if self.db.engine.dialect.name == 'postgresql' else sqlite.insert
+        stmt = insert(table).on_conflict_do_update(
+            index_elements=['namespace'], set_={'generation': table.c.generation + 1})
+        # Sorted, so concurrent bumps lock rows in the same order
+        with self.db.engine.begin() as conn:
+            conn.execute(stmt, [{'namespace': ns, 'generation': 1} for ns in sorted(set(namespaces))])
+
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL.
+
+    Namespaces are invalidated by bumping a generation counter that callers
+    fold into their keys, so stale entries simply stop being addressed and
+    age out through LRU eviction or TTL. Entries are private to the process;
+    with several worker processes pass shared generations (TableGenerations)
+    so a write in one worker retires the entries of all of them.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, generations=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = generations or LocalGenerations()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, namespace):
+        return self._generations.get([namespace])[namespace]
+
+    def generations(self, namespaces):
+        return self._generations.get(namespaces)
+
+    def invalidate(self, *namespaces):
+        self._generations.bump(namespaces)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+class RedisCache:
+    """Redis-backed cache sharing entries across worker processes.
+
+    Requires the optional ``redis`` package; any Redis-compatible server
+    (including a local stand-in) works.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', ttl=60, prefix='smart:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl or self.ttl)
+
+    def generation(self, namespace):
+        return int(self.client.get(f'{self.prefix}gen:{namespace}') or 0)
+
+    def generations(self, namespaces):
+        namespaces = list(namespaces)
+        if not namespaces:
+            return {}
+        values = self.client.mget([f'{self.prefix}gen:{ns}' for ns in namespaces])
+        return {ns: int(value or 0) for ns, value in zip(namespaces, values)}
+
+    def invalidate(self, *namespaces):
+        pipe = self.client.pipeline()
+        for ns in namespaces:
+            pipe.incr(f'{self.prefix}gen:{ns}')
+        pipe.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+    def stats(self):
+        info = self.client.info('stats')
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': info.get('evicted_keys', 0)
+        }
+
+
+def create_cache(backend='memory', **options):
+    """Build a cache backend by name ('memory' or 'redis')"""
+    if backend == 'redis':
+        return RedisCache(**options)
+    if backend == 'memory':
+        return LRUCache(**options)
+    raise ValueError(f'Unknown cache backend: {backend}')
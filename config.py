@@ -0,0 +1,135 @@
+"""Application configuration, read from environment variables"""
+import os
+
+
+def database_uri():
+    """DATABASE_URL with the legacy postgres:// scheme normalized for SQLAlchemy"""
+    uri = os.environ.get('DATABASE_URL', 'sqlite:///smart_energy_vehicle.db')
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri):
+    """Connection pool settings for the configured database"""
+    if uri.startswith('sqlite') and (':memory:' in uri or uri in ('sqlite://', 'sqlite:///')):
+        # In-memory SQLite uses a single static connection; pool sizing does not apply
+        return {'connect_args': {'check_same_thread': False}}
+
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+    if uri.startswith('sqlite'):
+        options['connect_args'] = {'timeout': 30, 'check_same_thread': False}
+    return options
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Seconds a login's session-cached user claims are trusted before reloading the user
+    USER_CLAIMS_TTL = int(os.environ.get('USER_CLAIMS_TTL', 300))
+
+    # Passwords are hashed in a pool of processes; scrypt:n:r:p, pbkdf2:sha256:iterations or
+    # argon2:time_cost:memory_kib:parallelism (needs argon2-cffi). Older hashes are upgraded at login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes on the request thread
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 8))  # running or queued
+    PASSWORD_HASH_ADMISSION_TIMEOUT = float(os.environ.get('PASSWORD_HASH_ADMISSION_TIMEOUT', 0.5))  # then 503
+    PASSWORD_HASH_TIMEOUT = 10
+
+    # Login attempts per second and burst per client IP, and failed attempts per username.
+    # Counted per worker process, so N workers allow up to N times these rates.
+    LOGIN_IP_RATE = float(os.environ.get('LOGIN_IP_RATE', 5))
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 30))
+    LOGIN_FAILURE_RATE = float(os.environ.get('LOGIN_FAILURE_RATE', 0.1))
+    LOGIN_FAILURE_BURST = int(os.environ.get('LOGIN_FAILURE_BURST', 10))
+    # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted; without
+    # this every client behind the proxy shares one IP bucket. Leave 0 when clients connect directly.
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))
+
+    # SQLite pragmas applied to every new connection
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+    # Weight of the newest trip in each vehicle's learned efficiency
+    EFFICIENCY_EWMA_ALPHA = float(os.environ.get('EFFICIENCY_EWMA_ALPHA', 0.1))
+    # Days between a vehicle's first and last log before its daily consumption is forecast
+    FORECAST_MIN_HISTORY_DAYS = float(os.environ.get('FORECAST_MIN_HISTORY_DAYS', 7))
+
+    # Cost per km of a reference petrol car (100/L at 15 km/L); savings are measured against it
+    BASELINE_COST_PER_KM = float(os.environ.get('BASELINE_COST_PER_KM', 100 / 15))
+
+    # Preprocessed road graph written by `flask build-road-graph`
+    ROAD_GRAPH_PATH = os.environ.get('ROAD_GRAPH_PATH', 'road_graph.npz')
+
+    # Station lookups are proxied to Overpass and cached per slippy-map tile
+    OVERPASS_URL = os.environ.get('OVERPASS_URL', 'https://overpass-api.de/api/interpreter')
+    OVERPASS_TIMEOUT = 30
+    OSM_TILE_ZOOM = 12  # ~10 km tiles at the equator
+    OSM_TILE_TTL = int(os.environ.get('OSM_TILE_TTL', 86400))  # seconds
+
+    # SOS responses list the nearest stations and other active alerts, from in-memory geohash indexes
+    SOS_NEAREST_STATIONS = 5
+    SOS_STATION_MAX_RADIUS_KM = 100
+    ALERT_NEARBY_RADIUS_KM = 2.0
+    GEO_INDEX_SYNC_SECONDS = 1.0  # how stale another worker's new or resolved alerts may be
+    STATION_INDEX_SYNC_SECONDS = 60
+
+    # Energy logs and resolved alerts older than the horizon move to monthly archive files
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+    ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', 365))
+
+    # Live telemetry is buffered and written once either bound is reached. Accepted
+    # frames are only in memory until then, so a killed worker loses that window.
+    TELEMETRY_FLUSH_FRAMES = 500
+    TELEMETRY_FLUSH_SECONDS = 1.0
+    TELEMETRY_MAX_PENDING = 50000  # frames; beyond this ingestion answers 503
+    TELEMETRY_MAX_RETRIES = 5  # failed flushes in a row before the batch is dead-lettered
+    TELEMETRY_DEAD_LETTER_DIR = os.environ.get('TELEMETRY_DEAD_LETTER_DIR', 'telemetry_dead_letter')  # '' drops
+    # Open SSE/WebSocket streams per process (0 = unbounded); each pins a thread on gthread workers
+    TELEMETRY_MAX_STREAMS = int(os.environ.get('TELEMETRY_MAX_STREAMS', 0))
+    TELEMETRY_SSE_POLL = 5  # seconds between re-reads that catch other workers' updates (0 disables)
+    TELEMETRY_SSE_HEARTBEAT = 15
+
+    # Server-Timing header with SQL, JSON and total time on every response
+    SERVER_TIMING = True
+    # Requests slower than this get a folded-stack flame-graph profile in PROFILE_DIR (0 disables)
+    PROFILE_SLOW_MS = int(os.environ.get('PROFILE_SLOW_MS', 0))
+    PROFILE_INTERVAL_MS = 5  # stack sampling period
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+    # `flask build-assets` writes fingerprinted, precompressed JS/CSS here (relative to the app)
+    ASSETS_DIR = os.environ.get('ASSETS_DIR', 'static/dist')
+    ASSETS_MAX_AGE = 365 * 86400  # seconds; fingerprinted names change whenever content does
+
+    # Responses smaller than this are sent uncompressed
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+
+    # memory keeps entries per worker process, with invalidations shared through the database;
+    # redis shares both entries and invalidations
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')  # memory, redis
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_TTL = 60  # seconds
+    CACHE_MAX_ENTRIES = 4096
+
+    NOTIFY_TRANSPORT = os.environ.get('NOTIFY_TRANSPORT', 'fake')  # fake, http
+    NOTIFY_GATEWAY_URL = os.environ.get('NOTIFY_GATEWAY_URL')
+    NOTIFY_WORKERS = 2
+    NOTIFY_BATCH_SIZE = 50
+    OUTBOX_RETENTION_DAYS = int(os.environ.get('OUTBOX_RETENTION_DAYS', 30))
+
+    # Background jobs run in whichever worker holds the scheduler lease
+    SCHEDULER_POLL_INTERVAL = 5  # seconds
+    SCHEDULER_LEASE_SECONDS = 60
+    # Bearer token that unlocks job errors and worker ids on /api/jobs; unset shows them to no one
+    OPS_TOKEN = os.environ.get('OPS_TOKEN')
@@ -0,0 +1,218 @@
+"""Password hashing off the request thread, with admission control and rate limiting"""
+import multiprocessing
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+try:
+    import argon2
+except ImportError:  # pragma: no cover - argon2-cffi is optional
+    argon2 = None
+
+
+def canonical_method(method):
+    """Spell out a Werkzeug method's default parameters, as they appear in its hashes"""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def _argon2_hasher(method):
+    """argon2 or argon2:time_cost:memory_kib:parallelism"""
+    if argon2 is None:
+        raise RuntimeError('argon2 password hashing needs the argon2-cffi package')
+    _, *args = method.split(':')
+    if not args:
+        return argon2.PasswordHasher()
+    time_cost, memory_cost, parallelism = map(int, args)
+    return argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+def hash_password(password, method):
+    if method.startswith('argon2'):
+        return _argon2_hasher(method).hash(password)
+    return generate_password_hash(password, method=method)
+
+
+def verify_password(stored, password, method):
+    """(matches, replacement hash or None); a replacement is made when stored uses other parameters"""
+    if stored.startswith('$argon2'):
+        try:
+            matches = _argon2_hasher('argon2').verify(stored, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            matches = False
+        stale = not method.startswith('argon2') or _argon2_hasher(method).check_needs_rehash(stored)
+    else:
+        matches = check_password_hash(stored, password)
+        stale = stored.split('$', 1)[0] != canonical_method(method)
+    return matches, hash_password(password, method) if matches and stale else None
+
+
+def _warm():
+    return True
+
+
+class HasherBusy(Exception):
+    """Raised when no hashing slot frees up within the admission timeout"""
+
+    retry_after = 1
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a bounded process pool.
+
+    At most max_pending jobs are admitted at once, running or queued. A
+    caller that cannot get a slot within admission_timeout seconds gets
+    HasherBusy, so a login storm is shed with 503s instead of tying up
+    every request thread. The pool uses the spawn start method and is
+    created on first use, so each gunicorn worker gets its own. With
+    workers=0 hashing runs on the calling thread, still under admission
+    control.
+    """
+
+    def __init__(self, method, workers=2, max_pending=None, admission_timeout=0.25, timeout=10):
+        if method.startswith('argon2'):
+            _argon2_hasher(method)  # fail at startup, not on the first login
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending or max(workers, 1) * 4
+        self.admission_timeout = admission_timeout
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._in_flight = 0
+        self._dummy = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.counters = {'hashed': 0, 'rejected': 0, 'rehashed': 0, 'busy_ms': 0.0}
+
+    def start(self):
+        """Create the pool and its processes now rather than on the first login"""
+        if self.workers:
+            pool = self._executor()
+            for future in [pool.submit(_warm) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.admission_timeout):
+            self.counters['rejected'] += 1
+            raise HasherBusy()
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._release(started)
+        try:
+            try:
+                future = self._executor().submit(fn, *args)
+            except BrokenProcessPool:
+                # A hashing process died; replace the pool once
+                self.shutdown()
+                future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._release(started)
+            raise
+        # cancel() cannot stop a hash that has started, so the slot is only
+        # given back once the job really ends, not when this caller gives up
+        future.add_done_callback(lambda _: self._release(started))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy()
+
+    def _release(self, started):
+        self._slots.release()
+        with self._lock:
+            self._in_flight -= 1
+            self.counters['hashed'] += 1
+            self.counters['busy_ms'] += (time.perf_counter() - started) * 1000
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.method)
+
+    def verify(self, stored, password):
+        """(matches, replacement hash or None) for a stored hash; see verify_password().
+
+        stored=None is checked against a dummy hash and never matches, so a
+        missing account costs as much as a wrong password.
+        """
+        if stored is None:
+            if self._dummy is None:
+                self._dummy = self.hash(secrets.token_hex(16))
+            self._run(verify_password, self._dummy, password, self.method)
+            return False, None
+        matches, replacement = self._run(verify_password, stored, password, self.method)
+        if replacement is not None:
+            self.counters['rehashed'] += 1
+        return matches, replacement
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+
+class RateLimiter:
+    """Token buckets per key: rate tokens a second refill up to burst.
+
+    Only the max_keys most recently used keys are tracked; a key that has
+    been evicted starts again with a full bucket. Buckets live in this
+    process, so with N worker processes a key can get up to N times the
+    configured rate.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, key):
+        """Seconds until key may act again, without using a token (0 when allowed now)"""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def hit(self, key):
+        """Use a token if one is available; returns retry_after() as of before the hit"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
@@ -0,0 +1,229 @@
+"""Geo-distance helpers shared by station search, route/range features and alert lookups"""
+import threading
+from math import pi, radians, sin, cos, sqrt, atan2
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE_LAT = EARTH_RADIUS_KM * pi / 180  # on haversine_km's sphere, so boxes never clip a circle
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in km"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    return EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1-a))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, lon_ranges) enclosing a circle of radius_km.
+
+    lon_ranges holds one (min_lon, max_lon) pair, or two when the box
+    crosses the antimeridian.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(latitude - dlat, -90.0)
+    max_lat = min(latitude + dlat, 90.0)
+
+    # Near the poles the circle covers every longitude
+    cos_lat = cos(radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    min_lon = longitude - dlon
+    max_lon = longitude + dlon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+class GeoPoints:
+    """A set of points held as contiguous arrays for batch distance queries.
+
+    Radians and latitude cosines are computed once at construction so each
+    query is a handful of NumPy passes over the whole set.
+    """
+
+    def __init__(self, ids, latitudes, longitudes):
+        self.ids = np.ascontiguousarray(ids, dtype=np.int64)
+        self.lat_rad = np.radians(np.ascontiguousarray(latitudes, dtype=np.float64))
+        self.lon_rad = np.radians(np.ascontiguousarray(longitudes, dtype=np.float64))
+        self.cos_lat = np.cos(self.lat_rad)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from an iterable of (id, latitude, longitude) tuples"""
+        data = np.array(list(rows), dtype=np.float64).reshape(-1, 3)
+        return cls(data[:, 0], data[:, 1], data[:, 2])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances(self, latitude, longitude):
+        """Distances in km from one query point to every point in the set"""
+        lat = radians(latitude)
+        lon = radians(longitude)
+        a = (np.sin((self.lat_rad - lat) / 2) ** 2
+             + cos(lat) * self.cos_lat * np.sin((self.lon_rad - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def distances_many(self, latitudes, longitudes):
+        """Distance matrix in km of shape (len(queries), len(self))"""
+        lat = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None]
+        lon = np.radians(np.asarray(longitudes, dtype=np.float64))[:, None]
+        a = (np.sin((self.lat_rad - lat) / 2) ** 2
+             + np.cos(lat) * self.cos_lat * np.sin((self.lon_rad - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest(self, latitude, longitude, k, radius_km=None):
+        """Return (ids, distances) of the k closest points, nearest first"""
+        if len(self) == 0 or k <= 0:
+            return self.ids[:0], np.empty(0)
+        dist = self.distances(latitude, longitude)
+        idx = np.arange(len(dist))
+        if radius_km is not None:
+            idx = idx[dist <= radius_km]
+        if len(idx) > k:
+            idx = idx[np.argpartition(dist[idx], k - 1)[:k]]
+        idx = idx[np.argsort(dist[idx], kind='stable')]
+        return self.ids[idx], dist[idx]
+
+    def nearest_many(self, latitudes, longitudes, k):
+        """Return (ids, distances) arrays of shape (len(queries), k), nearest first"""
+        dist = self.distances_many(latitudes, longitudes)
+        k = min(k, dist.shape[1])
+        if k <= 0:
+            return np.empty((dist.shape[0], 0), dtype=np.int64), np.empty((dist.shape[0], 0))
+        idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1, kind='stable')
+        idx = np.take_along_axis(idx, order, axis=1)
+        return self.ids[idx], np.take_along_axis(dist, idx, axis=1)
+
+
+class GeohashIndex:
+    """Mutable in-memory point index over geohash cells at several precisions.
+
+    Cells are addressed by (row, column) in the geohash grid of each
+    precision rather than by their base32 string, so the cells covering a
+    search box are plain index ranges. Each point is filed under every
+    precision; a query uses the finest one whose covering cells number at
+    most max_cells, then ranks the candidates with vectorized haversine.
+    Per-cell coordinate arrays are cached and rebuilt only after the cell
+    changes. Safe to use from several threads.
+    """
+
+    def __init__(self, precisions=(3, 4, 5, 6), max_cells=16):
+        self.precisions = tuple(sorted(precisions, reverse=True))  # finest first
+        self.max_cells = max_cells
+        self._points = {}  # id -> (latitude, longitude, data)
+        self._grids = {}  # precision -> (lat span, lon span, rows, cols)
+        self._cells = {}  # (precision, row, col) -> set of ids
+        self._arrays = {}  # (precision, row, col) -> (ids, lat_rad, lon_rad, cos_lat, data)
+        self._lock = threading.RLock()
+        for precision in self.precisions:
+            lat_bits = 5 * precision // 2
+            lon_bits = 5 * precision - lat_bits
+            self._grids[precision] = (180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits, 2 ** lat_bits, 2 ** lon_bits)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, point_id):
+        return point_id in self._points
+
+    def _cell(self, precision, latitude, longitude):
+        lat_span, lon_span, rows, cols = self._grids[precision]
+        row = min(int((latitude + 90.0) / lat_span), rows - 1)
+        col = int((longitude + 180.0) / lon_span) % cols
+        return precision, row, col
+
+    def add(self, point_id, latitude, longitude, data=None):
+        """Insert or move a point; data is returned with it by queries"""
+        with self._lock:
+            point = self._points.get(point_id)
+            if point is not None and point[:2] == (latitude, longitude):
+                self._points[point_id] = (latitude, longitude, data)
+                return
+            self.remove(point_id)
+            self._points[point_id] = (latitude, longitude, data)
+            for precision in self.precisions:
+                key = self._cell(precision, latitude, longitude)
+                self._cells.setdefault(key, set()).add(point_id)
+                self._arrays.pop(key, None)
+
+    def remove(self, point_id):
+        """Drop a point; returns False if it was not indexed"""
+        with self._lock:
+            point = self._points.pop(point_id, None)
+            if point is None:
+                return False
+            for precision in self.precisions:
+                key = self._cell(precision, point[0], point[1])
+                cell = self._cells[key]
+                cell.discard(point_id)
+                if not cell:
+                    del self._cells[key]
+                self._arrays.pop(key, None)
+            return True
+
+    def _cell_arrays(self, key):
+        arrays = self._arrays.get(key)
+        if arrays is None:
+            ids = np.fromiter(self._cells[key], dtype=np.int64)
+            points = [self._points[i] for i in ids.tolist()]
+            coords = np.array([point[:2] for point in points], dtype=np.float64).reshape(-1, 2)
+            data = np.empty(len(points), dtype=object)
+            data[:] = [point[2] for point in points]
+            lat_rad = np.radians(coords[:, 0])
+            arrays = self._arrays[key] = (ids, lat_rad, np.radians(coords[:, 1]), np.cos(lat_rad), data)
+        return arrays
+
+    def _covering_cells(self, latitude, longitude, radius_km):
+        min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+        for precision in self.precisions:
+            lat_span, lon_span, rows, cols = self._grids[precision]
+            row_range = range(int((min_lat + 90.0) / lat_span), min(int((max_lat + 90.0) / lat_span), rows - 1) + 1)
+            col_ranges = [range(int((lo + 180.0) / lon_span), min(int((hi + 180.0) / lon_span), cols - 1) + 1)
+                          for lo, hi in lon_ranges]
+            count = len(row_range) * sum(len(r) for r in col_ranges)
+            if count <= self.max_cells:
+                return [(precision, row, col) for row in row_range for cols_ in col_ranges for col in cols_]
+        # Wider than max_cells even at the coarsest precision: take every occupied cell there
+        return [key for key in self._cells if key[0] == precision]
+
+    def within(self, latitude, longitude, radius_km, limit=None):
+        """[(id, distance km, data)] of points within radius_km, nearest first, at most limit of them"""
+        lat = radians(latitude)
+        lon = radians(longitude)
+        with self._lock:
+            cells = [key for key in self._covering_cells(latitude, longitude, radius_km) if key in self._cells]
+            if not cells:
+                return []
+            parts = [self._cell_arrays(key) for key in cells]
+        ids, lat_rad, lon_rad, cos_lat, data = (np.concatenate(column) for column in zip(*parts))
+        a = np.sin((lat_rad - lat) / 2) ** 2 + cos(lat) * cos_lat * np.sin((lon_rad - lon) / 2) ** 2
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        inside = np.flatnonzero(dist <= radius_km)
+        if limit is not None and len(inside) > limit:
+            inside = inside[np.argpartition(dist[inside], limit - 1)[:limit]]
+        inside = inside[np.argsort(dist[inside], kind='stable')]
+        return list(zip(ids[inside].tolist(), dist[inside].tolist(), data[inside].tolist()))
+
+    def nearest(self, latitude, longitude, k, max_radius_km=500.0, start_radius_km=1.0):
+        """[(id, distance km, data)] of the k nearest points within max_radius_km, nearest first.
+
+        Searches a circle that grows until it holds k points, doubling while
+        it holds some and quadrupling while it is empty; every point outside
+        it is farther than all those inside, so the answer is exact.
+        """
+        radius = min(start_radius_km, max_radius_km)
+        while True:
+            found = self.within(latitude, longitude, radius, limit=k)
+            if len(found) >= k or radius >= max_radius_km or len(found) == len(self):
+                return found
+            radius = min(radius * (2 if found else 4), max_radius_km)
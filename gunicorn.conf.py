@@ -0,0 +1,72 @@
+"""Gunicorn profile for production: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden through the environment, e.g.
+WEB_CONCURRENCY=8 GUNICORN_THREADS=4 gunicorn -c gunicorn.conf.py wsgi:app
+
+Live telemetry streams (/api/telemetry/stream and /api/telemetry/ws) stay
+open as long as the client does, and on gthread workers each one pins a
+thread. Serve them from a second gunicorn with an async worker class
+(requires `pip install gevent`) and route those two paths to it at the proxy:
+
+    GUNICORN_WORKER_CLASS=gevent BIND=0.0.0.0:5001 START_BACKGROUND_WORKERS=0 \
+        gunicorn -c gunicorn.conf.py wsgi:app
+
+On gthread, each worker holds at most TELEMETRY_MAX_STREAMS streams (by
+default half its threads) and answers 503 beyond that, so streams can
+never take every thread.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gthread':
+    os.environ.setdefault('TELEMETRY_MAX_STREAMS', str(max(threads // 2, 1)))
+else:
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # '-' for stdout
+errorlog = '-'
+
+
+def on_starting(server):
+    """Create tables and build static assets once in the master before any worker forks.
+
+    Workers import wsgi after forking, so each builds its own app and
+    connection pool; this app's connections are closed before the fork.
+    """
+    from app import build_static_assets, create_app, db, init_db
+
+    app = create_app()
+    init_db(app)
+    with app.app_context():
+        build_static_assets()
+        db.engine.dispose()
+
+
+def post_worker_init(worker):
+    """Start password hashing processes, the outbox dispatcher and job scheduler; one worker leads jobs"""
+    import app as smart
+
+    smart.password_hasher.start()
+    if os.environ.get('START_BACKGROUND_WORKERS', '1') == '1':
+        smart.notification_dispatcher.start()
+        smart.job_scheduler.start()
+
+
+def worker_exit(server, worker):
+    """Hand the scheduler lease over immediately, write buffered telemetry and stop hashing processes"""
+    import app as smart
+
+    if smart.job_scheduler is not None:
+        smart.job_scheduler.stop()
+    if smart.telemetry_buffer is not None:
+        smart.telemetry_buffer.stop()
+    if smart.password_hasher is not None:
+        smart.password_hasher.shutdown()
+
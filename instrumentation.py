@@ -0,0 +1,207 @@
+"""In-process request metrics in Prometheus text format and a stack-sampling profiler.
+
+Metrics live in the process that recorded them; under gunicorn each worker
+serves its own counters, so scrape every worker or aggregate by instance.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _labels(self.label_names, key), value) for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        out = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                out.append((f'{self.name}_bucket', _labels(self.label_names, key, ('le', _number(bound))),
+                            cumulative))
+            out.append((f'{self.name}_bucket', _labels(self.label_names, key, ('le', '+Inf')), series[-1]))
+            out.append((f'{self.name}_sum', _labels(self.label_names, key), series[-2]))
+            out.append((f'{self.name}_count', _labels(self.label_names, key), series[-1]))
+        return out
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns {label tuple: value}"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), callback=None, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self):
+        values = self.callback() if self.callback else {}
+        return [(self.name, _labels(self.label_names, key), value) for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, labels=(), callback=None, kind='gauge'):
+        return self.register(Gauge(name, help, labels, callback, kind))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class StackSampler:
+    """Periodically sample the stacks of profiled threads into folded flame-graph counts.
+
+    One daemon thread wakes every interval seconds while any thread is being
+    profiled and records each profiled thread's stack as a ';'-joined line,
+    the folded format read by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Begin sampling the calling thread"""
+        with self._lock:
+            self._active[threading.get_ident()] = TallyCounter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        """Stop sampling the calling thread; returns its folded stack counts"""
+        with self._lock:
+            counts = self._active.pop(threading.get_ident(), TallyCounter())
+            if not self._active:
+                self._wake.clear()
+        return counts
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, counts in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        counts[fold_stack(frame)] += 1
+
+
+def fold_stack(frame):
+    """Root-first 'func (file:line);...' line for a frame and its callers"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+def write_folded(path, counts):
+    """Write folded stack counts, one 'stack count' line each"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        for stack, count in counts.most_common():
+            f.write(f'{stack} {count}\n')
@@ -0,0 +1,166 @@
+"""Background delivery of emergency notifications from the outbox table"""
+import json
+import threading
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+
+class FakeTransport:
+    """Local sink that records messages instead of sending them; used for testing"""
+
+    def __init__(self, fail_recipients=()):
+        self.sent = []
+        self.fail_recipients = set(fail_recipients)
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        results = []
+        with self._lock:
+            for message in messages:
+                if message['recipient'] in self.fail_recipients:
+                    results.append('Recipient rejected')
+                else:
+                    self.sent.append(message)
+                    results.append(None)
+        return results
+
+
+class HTTPTransport:
+    """POST a JSON batch of messages to an SMS/email gateway.
+
+    The gateway is expected to answer with a JSON list holding one entry per
+    message: null on success or an error string.
+    """
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send_batch(self, messages):
+        body = json.dumps({'messages': messages}).encode()
+        req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+
+def create_transport(name='fake', **options):
+    """Build a notification transport by name ('fake' or 'http')"""
+    if name == 'http':
+        return HTTPTransport(**options)
+    if name == 'fake':
+        return FakeTransport(**options)
+    raise ValueError(f'Unknown notification transport: {name}')
+
+
+class OutboxDispatcher:
+    """Drain pending outbox rows through a transport on background threads.
+
+    Rows are claimed with a single UPDATE stamping a claim token, so several
+    threads or processes can drain the same table without double sends.
+    Failed sends are retried with exponential backoff up to max_attempts;
+    rows left in 'sending' past the lease by a crashed worker are reclaimed.
+    """
+
+    def __init__(self, app, db, model, transport, batch_size=50, workers=2,
+                 poll_interval=5, max_attempts=5, backoff_seconds=2, lease_seconds=60):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.transport = transport
+        self.batch_size = batch_size
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbox-dispatcher-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """Signal workers that new rows are waiting"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.dispatch_batch()
+            except Exception as e:
+                self.app.logger.exception('Outbox dispatch failed: %s', e)
+                processed = 0
+            if not processed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def drain(self):
+        """Dispatch batches until nothing is due; returns the number of rows handled"""
+        total = 0
+        while True:
+            processed = self.dispatch_batch()
+            if not processed:
+                return total
+            total += processed
+
+    def dispatch_batch(self):
+        """Claim and send one batch of due rows; returns the number claimed"""
+        with self.app.app_context():
+            rows = self._claim()
+            if not rows:
+                return 0
+
+            messages = [{'id': r.id, 'channel': r.channel, 'recipient': r.recipient, 'message': r.message}
+                        for r in rows]
+            try:
+                results = self.transport.send_batch(messages)
+            except Exception as e:
+                results = [str(e)] * len(rows)
+
+            now = datetime.utcnow()
+            for row, error in zip(rows, results):
+                row.attempts += 1
+                row.claim_token = None
+                if error is None:
+                    row.status = 'sent'
+                    row.sent_at = now
+                    row.last_error = None
+                elif row.attempts >= self.max_attempts:
+                    row.status = 'failed'
+                    row.last_error = error
+                else:
+                    row.status = 'pending'
+                    row.last_error = error
+                    row.next_attempt_at = now + timedelta(seconds=self.backoff_seconds * 2 ** (row.attempts - 1))
+            self.db.session.commit()
+            return len(rows)
+
+    def _claim(self):
+        model = self.model
+        session = self.db.session
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = self.db.or_(
+            self.db.and_(model.status == 'pending', model.next_attempt_at <= now),
+            self.db.and_(model.status == 'sending', model.claimed_at < now - timedelta(seconds=self.lease_seconds))
+        )
+        ids = session.query(model.id).filter(due).order_by(model.id).limit(self.batch_size).subquery()
+        session.query(model).filter(model.id.in_(self.db.select(ids.c.id)), due).update(
+            {'status': 'sending', 'claim_token': token, 'claimed_at': now}, synchronize_session=False)
+        session.commit()
+        return model.query.filter_by(claim_token=token).all()
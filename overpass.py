@@ -0,0 +1,130 @@
+"""Overpass API client with tile quantization and request coalescing"""
+import json
+import math
+import threading
+import urllib.parse
+import urllib.request
+
+DEFAULT_OVERPASS_URL = 'https://overpass-api.de/api/interpreter'
+AMENITIES = ('charging_station', 'fuel')
+
+
+def tile_for(latitude, longitude, zoom):
+    """Slippy-map (x, y) of the tile containing a point"""
+    n = 2 ** zoom
+    lat = math.radians(max(min(latitude, 85.0511), -85.0511))
+    x = int((longitude + 180.0) / 360.0 * n) % n
+    y = int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)
+    return x, min(max(y, 0), n - 1)
+
+
+def tile_bbox(x, y, zoom):
+    """(south, west, north, east) bounds of a tile in degrees"""
+    n = 2 ** zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def tiles_for_radius(min_lat, max_lat, lon_ranges, zoom):
+    """Every tile intersecting a bounding box from geo.bounding_box()"""
+    tiles = []
+    for min_lon, max_lon in lon_ranges:
+        x0, y0 = tile_for(max_lat, min_lon, zoom)
+        x1, y1 = tile_for(min_lat, max_lon, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                tiles.append((x, y))
+    return tiles
+
+
+def build_query(bbox, amenities=AMENITIES, timeout=25):
+    """Overpass QL for fuel and charging stations inside a bounding box"""
+    box = ','.join(f'{v:.7f}' for v in bbox)
+    parts = [f'{kind}["amenity"="{amenity}"]({box});'
+             for amenity in amenities for kind in ('node', 'way', 'relation')]
+    return f"[out:json][timeout:{timeout}];({''.join(parts)});out center;"
+
+
+class OverpassClient:
+    """POST Overpass QL queries and return the response elements"""
+
+    def __init__(self, url=DEFAULT_OVERPASS_URL, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def query(self, ql):
+        body = urllib.parse.urlencode({'data': ql}).encode()
+        req = urllib.request.Request(self.url, data=body,
+                                     headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read()).get('elements', [])
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs fn; callers arriving while it is in
+    flight wait and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = fn()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+
+def element_to_station(element):
+    """Map an Overpass element to Station column values, or None if it has no position"""
+    tags = element.get('tags') or {}
+    lat = element.get('lat', (element.get('center') or {}).get('lat'))
+    lon = element.get('lon', (element.get('center') or {}).get('lon'))
+    if lat is None or lon is None:
+        return None
+
+    if tags.get('amenity') == 'charging_station':
+        station_type = 'EV_Charging'
+    elif tags.get('fuel:cng') == 'yes' and tags.get('fuel:octane_95') != 'yes':
+        station_type = 'CNC'
+    else:
+        station_type = 'Petrol'
+
+    price = tags.get('fuel:price') or tags.get('charging:price')
+    try:
+        price = float(price) if price else None
+    except ValueError:
+        price = None
+    address = ', '.join(tags[k] for k in ('addr:housenumber', 'addr:street', 'addr:city') if tags.get(k))
+    return {
+        'osm_id': f"{element['type']}/{element['id']}",
+        'name': (tags.get('name') or tags.get('operator') or 'Unnamed station')[:120],
+        'latitude': lat,
+        'longitude': lon,
+        'station_type': station_type,
+        'address': address[:255] or None,
+        'phone': (tags.get('phone') or tags.get('contact:phone') or '')[:20] or None,
+        'open_24_7': tags.get('opening_hours') == '24/7',
+        'price_per_unit': price,
+    }
@@ -0,0 +1,450 @@
+"""Road graph loading, preprocessing and energy-aware route search.
+
+A RoadGraph holds a directed road network as CSR arrays with one edge
+weight per route type:
+
+- shortest: length in km
+- efficient: energy in reference km, i.e. km of flat driving at 60 km/h,
+  adjusted for speed (drag) and climb
+- traffic-aware: travel time in minutes
+
+Queries use A* with ALT (landmark) lower bounds. The landmark distance
+tables are the expensive part, so preprocess() runs once and save() keeps
+them in an .npz file that load() reads back.
+"""
+import heapq
+import json
+import random
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import numpy as np
+
+from geo import EARTH_RADIUS_KM, GeoPoints
+
+ROUTE_TYPES = ('shortest', 'efficient', 'traffic-aware')
+DEFAULT_SPEED_KMH = 50
+DEFAULT_LANDMARKS = 8
+ACTIVE_LANDMARKS = 4
+
+# Reference km of energy spent per metre of climb; descents recover part of it
+CLIMB_KM_PER_M = 0.027
+DESCENT_RECOVERY = 0.5
+
+OSM_SPEEDS = {
+    'motorway': 100, 'motorway_link': 60, 'trunk': 80, 'trunk_link': 50,
+    'primary': 60, 'primary_link': 40, 'secondary': 50, 'secondary_link': 40,
+    'tertiary': 40, 'tertiary_link': 30, 'unclassified': 30, 'residential': 30,
+    'living_street': 10, 'service': 20,
+}
+
+Path = namedtuple('Path', ['nodes', 'edges', 'cost', 'settled'])
+
+
+class RouteNotFound(Exception):
+    """No path exists, or the vehicle cannot reach the destination with the given stations"""
+
+
+def edge_energy(lengths_km, speeds_kmh, rises_m):
+    """Energy per edge in reference km: drag grows with speed squared, climbing costs extra"""
+    drag = 0.8 + 0.2 * (speeds_kmh / 60.0) ** 2
+    flat = lengths_km * drag
+    climb = np.where(rises_m > 0, rises_m, rises_m * DESCENT_RECOVERY) * CLIMB_KM_PER_M
+    # Regeneration never makes an edge free, which keeps every weight positive for A*
+    return np.maximum(flat + climb, 0.2 * flat)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _csr_offsets(count, sorted_sources):
+    """Start offset of each node's edges in an edge array sorted by source"""
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sorted_sources, minlength=count), out=offsets[1:])
+    return offsets
+
+
+def _dijkstra_all(offsets, targets, weights, source, count):
+    """Distances from source to every node; inf where unreachable"""
+    dist = [float('inf')] * count
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            nd = d + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return np.array(dist)
+
+
+class RoadGraph:
+    """A directed road network with per-route-type edge weights.
+
+    Nodes are addressed by their 0-based index; node_ids keeps the ids from
+    the source file. Edges are stored sorted by source node.
+    """
+
+    def __init__(self, node_ids, latitudes, longitudes, elevations, sources, targets, lengths_km, speeds_kmh,
+                 landmarks=None, landmark_from=None, landmark_to=None):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.elevations = np.asarray(elevations, dtype=np.float64)
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        self.sources = sources[order]
+        self.targets = np.asarray(targets, dtype=np.int64)[order]
+        self.lengths = np.asarray(lengths_km, dtype=np.float64)[order]
+        self.speeds = np.asarray(speeds_kmh, dtype=np.float64)[order]
+        self.offsets = _csr_offsets(len(self.node_ids), self.sources)
+
+        rises = self.elevations[self.targets] - self.elevations[self.sources]
+        self.weights = {
+            'shortest': self.lengths,
+            'efficient': edge_energy(self.lengths, self.speeds, rises),
+            'traffic-aware': self.lengths / self.speeds * 60,
+        }
+        # Lowest weight per straight-line km, so scale * haversine never overestimates
+        straight = _haversine(self.latitudes[self.sources], self.longitudes[self.sources],
+                              self.latitudes[self.targets], self.longitudes[self.targets])
+        moving = straight > 1e-9
+        self._scale = {name: float(np.min(w[moving] / straight[moving])) if moving.any() else 0.0
+                       for name, w in self.weights.items()}
+
+        self.landmarks = None if landmarks is None else np.asarray(landmarks, dtype=np.int64)
+        self.landmark_from = landmark_from
+        self.landmark_to = landmark_to
+        self.points = GeoPoints(np.arange(len(self.node_ids)), self.latitudes, self.longitudes)
+
+        # The search loop runs in Python, where list indexing beats NumPy scalars
+        self._offsets = self.offsets.tolist()
+        self._targets = self.targets.tolist()
+        self._sources = self.sources.tolist()
+        self._weights = {name: w.tolist() for name, w in self.weights.items()}
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    # ----- loading and persistence -----
+
+    @classmethod
+    def from_json(cls, path):
+        """Load {"nodes": [[id, lat, lon, elevation?], ...], "edges": [{"from", "to", ...}, ...]}.
+
+        Edges take optional length_km (defaults to the straight-line
+        distance), speed_kmh and oneway (defaults to false).
+        """
+        with open(path) as f:
+            data = json.load(f)
+        index = {node[0]: i for i, node in enumerate(data['nodes'])}
+        nodes = np.array([node[1:4] if len(node) > 3 else node[1:3] + [0.0] for node in data['nodes']],
+                         dtype=np.float64).reshape(-1, 3)
+        sources, targets, lengths, speeds = [], [], [], []
+        for edge in data['edges']:
+            u, v = index[edge['from']], index[edge['to']]
+            length = edge.get('length_km')
+            speed = edge.get('speed_kmh') or DEFAULT_SPEED_KMH
+            pairs = [(u, v)] if edge.get('oneway') else [(u, v), (v, u)]
+            for a, b in pairs:
+                sources.append(a)
+                targets.append(b)
+                lengths.append(np.nan if length is None else length)
+                speeds.append(speed)
+        return cls._build([node[0] for node in data['nodes']], nodes[:, 0], nodes[:, 1], nodes[:, 2],
+                          sources, targets, lengths, speeds)
+
+    @classmethod
+    def from_osm_xml(cls, path):
+        """Load drivable ways from an OpenStreetMap XML extract (.osm)"""
+        coords, ways = {}, []
+        for _, elem in ET.iterparse(path):
+            if elem.tag == 'node':
+                tags = {t.get('k'): t.get('v') for t in elem.iter('tag')}
+                try:
+                    ele = float(tags.get('ele', 0))
+                except ValueError:
+                    ele = 0.0
+                coords[int(elem.get('id'))] = (float(elem.get('lat')), float(elem.get('lon')), ele)
+                elem.clear()
+            elif elem.tag == 'way':
+                tags = {t.get('k'): t.get('v') for t in elem.iter('tag')}
+                highway = tags.get('highway')
+                if highway in OSM_SPEEDS:
+                    refs = [int(nd.get('ref')) for nd in elem.iter('nd')]
+                    speed = OSM_SPEEDS[highway]
+                    maxspeed = (tags.get('maxspeed') or '').split(' ')[0]
+                    if maxspeed.isdigit():
+                        speed = int(maxspeed)
+                    oneway = tags.get('oneway')
+                    if oneway == '-1':
+                        refs.reverse()
+                    ways.append((refs, speed, oneway in ('yes', 'true', '1', '-1') or highway == 'motorway'))
+                elem.clear()
+
+        index, node_ids = {}, []
+        sources, targets, speeds = [], [], []
+        for refs, speed, oneway in ways:
+            refs = [r for r in refs if r in coords]
+            for a, b in zip(refs, refs[1:]):
+                for ref in (a, b):
+                    if ref not in index:
+                        index[ref] = len(node_ids)
+                        node_ids.append(ref)
+                pairs = [(a, b)] if oneway else [(a, b), (b, a)]
+                for u, v in pairs:
+                    sources.append(index[u])
+                    targets.append(index[v])
+                    speeds.append(speed)
+        nodes = np.array([coords[ref] for ref in node_ids], dtype=np.float64).reshape(-1, 3)
+        return cls._build(node_ids, nodes[:, 0], nodes[:, 1], nodes[:, 2],
+                          sources, targets, [np.nan] * len(sources), speeds)
+
+    @classmethod
+    def _build(cls, node_ids, latitudes, longitudes, elevations, sources, targets, lengths, speeds):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        missing = np.isnan(lengths)
+        lengths[missing] = _haversine(latitudes[sources[missing]], longitudes[sources[missing]],
+                                      latitudes[targets[missing]], longitudes[targets[missing]])
+        return cls(node_ids, latitudes, longitudes, elevations, sources, targets,
+                   np.maximum(lengths, 1e-6), speeds)
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph saved by save(), or parse a .json/.osm source file"""
+        if path.endswith('.json'):
+            return cls.from_json(path)
+        if path.endswith('.osm'):
+            return cls.from_osm_xml(path)
+        with np.load(path) as data:
+            landmarks = data['landmarks'] if 'landmarks' in data else None
+            return cls(data['node_ids'], data['latitudes'], data['longitudes'], data['elevations'],
+                       data['sources'], data['targets'], data['lengths'], data['speeds'],
+                       landmarks=landmarks,
+                       landmark_from=data['landmark_from'] if landmarks is not None else None,
+                       landmark_to=data['landmark_to'] if landmarks is not None else None)
+
+    def save(self, path):
+        """Write the graph and any landmark tables to an uncompressed .npz"""
+        arrays = {
+            'node_ids': self.node_ids, 'latitudes': self.latitudes, 'longitudes': self.longitudes,
+            'elevations': self.elevations, 'sources': self.sources, 'targets': self.targets,
+            'lengths': self.lengths, 'speeds': self.speeds,
+        }
+        if self.landmarks is not None:
+            arrays.update(landmarks=self.landmarks, landmark_from=self.landmark_from,
+                          landmark_to=self.landmark_to)
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    # ----- preprocessing -----
+
+    def preprocess(self, landmarks=DEFAULT_LANDMARKS, seed=0):
+        """Pick landmarks by farthest-point selection and tabulate distances to and from them.
+
+        Fills landmark_from/landmark_to with float32 arrays of shape
+        (len(ROUTE_TYPES), landmarks, len(self)).
+        """
+        count = len(self)
+        reverse = np.argsort(self.targets, kind='stable')
+        rev_offsets = _csr_offsets(count, self.targets[reverse]).tolist()
+        rev_targets = self.sources[reverse].tolist()
+        rev_weights = {name: w[reverse].tolist() for name, w in self.weights.items()}
+
+        shortest = self._weights['shortest']
+        start = random.Random(seed).randrange(count)
+        far = _dijkstra_all(self._offsets, self._targets, shortest, start, count)
+        chosen = [int(np.argmax(np.where(np.isfinite(far), far, -1)))]
+        nearest = np.full(count, np.inf)
+        while len(chosen) < min(landmarks, count):
+            d = _dijkstra_all(self._offsets, self._targets, shortest, chosen[-1], count)
+            nearest = np.fmin(nearest, d)
+            chosen.append(int(np.argmax(np.where(np.isfinite(nearest), nearest, -1))))
+
+        frm = np.empty((len(ROUTE_TYPES), len(chosen), count), dtype=np.float32)
+        to = np.empty_like(frm)
+        for k, name in enumerate(ROUTE_TYPES):
+            for i, landmark in enumerate(chosen):
+                frm[k, i] = _dijkstra_all(self._offsets, self._targets, self._weights[name], landmark, count)
+                to[k, i] = _dijkstra_all(rev_offsets, rev_targets, rev_weights[name], landmark, count)
+        self.landmarks = np.array(chosen, dtype=np.int64)
+        self.landmark_from, self.landmark_to = frm, to
+
+    # ----- queries -----
+
+    def nearest_node(self, latitude, longitude):
+        """Return (node index, distance km) of the node closest to a point"""
+        ids, dists = self.points.nearest(latitude, longitude, 1)
+        if len(ids) == 0:
+            raise RouteNotFound('Road graph is empty')
+        return int(ids[0]), float(dists[0])
+
+    def _heuristic(self, source, target, route_type, use_landmarks):
+        """Admissible lower bound on the cost from every node to target"""
+        if use_landmarks and self.landmarks is not None:
+            k = ROUTE_TYPES.index(route_type)
+            frm, to = self.landmark_from[k], self.landmark_to[k]
+            with np.errstate(invalid='ignore'):
+                # Only the landmarks giving the tightest bound at the source are worth evaluating
+                at_source = np.fmax(frm[:, target] - frm[:, source], to[:, source] - to[:, target])
+                active = np.argsort(-np.nan_to_num(at_source, nan=-np.inf))[:ACTIVE_LANDMARKS]
+                bound = np.fmax.reduce(np.concatenate([
+                    frm[active, target][:, None] - frm[active],
+                    to[active] - to[active, target][:, None],
+                ]), axis=0)
+            # float32 tables round; shave the bound so it never overestimates
+            return np.nan_to_num(bound * (1 - 1e-5), nan=0.0, posinf=np.inf, neginf=0.0).tolist()
+        scale = self._scale[route_type]
+        return (scale * self.points.distances(self.latitudes[target], self.longitudes[target])).tolist()
+
+    def shortest_path(self, source, target, route_type='shortest', use_landmarks=True):
+        """A* search from source to target node; raises RouteNotFound if unreachable"""
+        if route_type not in self._weights:
+            raise ValueError(f"route_type must be one of: {', '.join(ROUTE_TYPES)}")
+        if source == target:
+            return Path([source], [], 0.0, 0)
+        weights = self._weights[route_type]
+        offsets, targets = self._offsets, self._targets
+        h = self._heuristic(source, target, route_type, use_landmarks)
+        inf = float('inf')
+        dist = {source: 0.0}
+        parent = {}
+        heap = [(h[source], 0.0, source)]
+        settled = 0
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if g > dist[u]:
+                continue
+            if u == target:
+                break
+            settled += 1
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                ng = g + weights[e]
+                if ng < dist.get(v, inf) and h[v] != inf:
+                    dist[v] = ng
+                    parent[v] = e
+                    heapq.heappush(heap, (ng + h[v], ng, v))
+        else:
+            raise RouteNotFound('No road connects these points')
+
+        edges = []
+        node = target
+        while node != source:
+            e = parent[node]
+            edges.append(e)
+            node = self._sources[e]
+        edges.reverse()
+        nodes = [source] + [targets[e] for e in edges]
+        return Path(nodes, edges, dist[target], settled)
+
+    def summarize(self, edges):
+        """Distance km, duration minutes and energy (reference km) along a list of edges"""
+        edges = np.asarray(edges, dtype=np.int64)
+        return (float(self.lengths[edges].sum()), float(self.weights['traffic-aware'][edges].sum()),
+                float(self.weights['efficient'][edges].sum()))
+
+    def coordinates(self, nodes):
+        """[[lat, lon], ...] for a list of node indexes"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return np.column_stack([self.latitudes[nodes], self.longitudes[nodes]]).round(6).tolist()
+
+
+def plan_route(graph, source, target, route_type, range_km, full_range_km, stations,
+               reserve_km=0.0, detour_km=3.0, max_stops=10, candidates_per_stop=8):
+    """Route source -> target, stopping at stations whenever range runs short.
+
+    range_km and full_range_km are the vehicle's current and refuelled
+    range in reference km, the unit of the 'efficient' weight. stations is
+    a GeoPoints of usable stations. Each time the remaining path needs more
+    energy than is left, the planner picks the station near the path that
+    lies furthest along it and is still reachable with reserve_km to spare.
+
+    Returns (legs, stops): a Path per leg, and for each stop a dict with
+    station_id, node and arrival_range_km.
+    """
+    legs, stops = [], []
+    current, budget = source, range_km
+    used = set()
+    for _ in range(max_stops + 1):
+        path = graph.shortest_path(current, target, route_type)
+        energy = np.concatenate([[0.0], np.cumsum(graph.weights['efficient'][np.asarray(path.edges, dtype=np.int64)])])
+        if energy[-1] <= budget:
+            legs.append(path)
+            return legs, stops
+        if len(stations) == 0 or full_range_km <= reserve_km:
+            break
+
+        # Stations close to the part of the path the vehicle can still cover
+        reach = max(int(np.searchsorted(energy, budget - reserve_km, side='right')), 1)
+        prefix = np.asarray(path.nodes[:reach], dtype=np.int64)
+        dist = stations.distances_many(graph.latitudes[prefix], graph.longitudes[prefix])
+        closest = dist.min(axis=0)
+        progress = energy[dist.argmin(axis=0)]
+        # Skip stations whose detour alone must exhaust the budget before running A* to them
+        lower_bound = progress + closest * graph._scale['efficient']
+        near = np.flatnonzero((closest <= detour_km) & (lower_bound <= budget - reserve_km))
+        near = near[np.argsort(-progress[near], kind='stable')]
+
+        for i in near[:candidates_per_stop]:
+            station_id = int(stations.ids[i])
+            if station_id in used:
+                continue
+            node, _ = graph.nearest_node(np.degrees(stations.lat_rad[i]), np.degrees(stations.lon_rad[i]))
+            try:
+                leg = graph.shortest_path(current, node, route_type)
+            except RouteNotFound:
+                continue
+            leg_energy = graph.summarize(leg.edges)[2]
+            if leg_energy <= budget - reserve_km:
+                legs.append(leg)
+                stops.append({'station_id': station_id, 'node': node,
+                              'arrival_range_km': round(budget - leg_energy, 1)})
+                used.add(station_id)
+                current, budget = node, full_range_km
+                break
+        else:
+            break
+    raise RouteNotFound('Destination is out of range and no reachable station was found along the way')
+
+
+def synthetic_city(rows, cols, spacing_km=0.2, origin=(28.6, 77.2), seed=0):
+    """Grid city with faster arterials every 10 blocks, hills, one-way streets and missing links"""
+    rng = np.random.default_rng(seed)
+    r, c = np.divmod(np.arange(rows * cols), cols)
+    lat = origin[0] + r * spacing_km / 111.32
+    lon = origin[1] + c * spacing_km / (111.32 * np.cos(np.radians(origin[0])))
+    elevation = (40 * np.sin(r / 37.0) * np.cos(c / 29.0) + rng.normal(0, 1.5, rows * cols))
+
+    sources, targets, speeds = [], [], []
+    for horizontal in (True, False):
+        a = np.arange(rows * cols).reshape(rows, cols)
+        if horizontal:
+            u, v, line = a[:, :-1].ravel(), a[:, 1:].ravel(), np.repeat(np.arange(rows), cols - 1)
+        else:
+            u, v, line = a[:-1, :].ravel(), a[1:, :].ravel(), np.tile(np.arange(cols), rows - 1)
+        arterial = line % 10 == 0
+        speed = np.where(arterial, 60.0, rng.choice([30.0, 40.0], len(u)))
+        keep = arterial | (rng.random(len(u)) > 0.05)
+        oneway = ~arterial & (rng.random(len(u)) < 0.1)
+        u, v, speed, oneway = u[keep], v[keep], speed[keep], oneway[keep]
+        sources += [u, v[~oneway]]
+        targets += [v, u[~oneway]]
+        speeds += [speed, speed[~oneway]]
+    return RoadGraph._build(np.arange(rows * cols), lat, lon, elevation,
+                            np.concatenate(sources), np.concatenate(targets),
+                            np.full(sum(len(s) for s in sources), np.nan), np.concatenate(speeds))
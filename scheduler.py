@@ -0,0 +1,208 @@
+"""Embedded periodic job scheduler with database leader election"""
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+
+class Job:
+    """A registered periodic job"""
+
+    def __init__(self, name, func, interval, initial_delay=None, description=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.initial_delay = interval if initial_delay is None else initial_delay
+        self.description = description or (func.__doc__ or '').strip().split('\n')[0]
+
+
+class JobScheduler:
+    """Run registered jobs on a background thread in whichever worker holds the lease.
+
+    Every gunicorn worker starts a scheduler, but only the one holding the
+    row in the lease table runs jobs. The lease is taken and renewed with a
+    conditional UPDATE, so it passes to another worker within lease_seconds
+    if the leader dies. Each run is also claimed by advancing the job's
+    next_run_at with a conditional UPDATE, so a job never runs twice for the
+    same slot even while leadership changes hands. Timings and outcomes are
+    kept on the job row.
+    """
+
+    LEASE_NAME = 'scheduler'
+
+    def __init__(self, app, db, job_model, lease_model, poll_interval=5, lease_seconds=60):
+        self.app = app
+        self.db = db
+        self.job_model = job_model
+        self.lease_model = lease_model
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, func, interval, initial_delay=None, description=None):
+        """Add a job running every interval seconds; the first run waits initial_delay (default interval)"""
+        self.jobs[name] = Job(name, func, interval, initial_delay, description)
+        return func
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        with self.app.app_context():
+            self._release_lease()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                self.app.logger.exception('Job scheduler tick failed: %s', e)
+            self._stop.wait(self.poll_interval)
+
+    def tick(self):
+        """Run every due job if this worker is the leader; returns the names run"""
+        with self.app.app_context():
+            self.sync_jobs()
+            ran = []
+            for name in self._due_jobs():
+                if self._stop.is_set() or not self._acquire_lease():
+                    break
+                if self._claim(name):
+                    self._execute(name)
+                    ran.append(name)
+            return ran
+
+    def run_now(self, name):
+        """Run a job immediately in this process, regardless of leadership or schedule"""
+        if name not in self.jobs:
+            raise KeyError(f'Unknown job: {name}')
+        with self.app.app_context():
+            self.sync_jobs()
+            return self._execute(name)
+
+    def sync_jobs(self):
+        """Create rows for registered jobs and keep their intervals current"""
+        model = self.job_model
+        session = self.db.session
+        rows = {row.name: row for row in model.query.filter(model.name.in_(list(self.jobs)))}
+        now = datetime.utcnow()
+        changed = False
+        for job in self.jobs.values():
+            row = rows.get(job.name)
+            if row is None:
+                session.add(model(name=job.name, interval_seconds=job.interval,
+                                  next_run_at=now + timedelta(seconds=job.initial_delay)))
+                changed = True
+            elif row.interval_seconds != job.interval:
+                row.interval_seconds = job.interval
+                changed = True
+        if changed:
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another worker registered the same jobs first
+                session.rollback()
+
+    def stats(self):
+        """Schedule and timing for every registered job"""
+        with self.app.app_context():
+            self.sync_jobs()
+            rows = self.job_model.query.filter(self.job_model.name.in_(list(self.jobs))).order_by(
+                self.job_model.name).all()
+            lease = self.db.session.get(self.lease_model, self.LEASE_NAME)
+            return {
+                'leader': lease.holder if lease is not None and lease.expires_at > datetime.utcnow() else None,
+                'worker': self.worker_id,
+                'jobs': [dict(row.to_dict(), description=self.jobs[row.name].description) for row in rows]
+            }
+
+    def _due_jobs(self):
+        model = self.job_model
+        rows = self.db.session.query(model.name).filter(
+            model.name.in_(list(self.jobs)), model.enabled.is_(True), model.next_run_at <= datetime.utcnow()
+        ).order_by(model.next_run_at)
+        return [name for (name,) in rows]
+
+    def _claim(self, name):
+        """Advance next_run_at if the job is still due; True when this worker won the run"""
+        model = self.job_model
+        now = datetime.utcnow()
+        claimed = model.query.filter(model.name == name, model.next_run_at <= now).update(
+            {'next_run_at': now + timedelta(seconds=self.jobs[name].interval)}, synchronize_session=False)
+        self.db.session.commit()
+        return claimed == 1
+
+    def _execute(self, name):
+        model = self.job_model
+        session = self.db.session
+        session.query(model).filter_by(name=name).update({'last_started_at': datetime.utcnow()})
+        session.commit()
+
+        started = time.perf_counter()
+        error = None
+        result = None
+        try:
+            result = self.jobs[name].func()
+        except Exception:
+            session.rollback()
+            error = traceback.format_exc(limit=5)
+            self.app.logger.exception('Job %s failed', name)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        row = session.get(model, name)
+        row.last_finished_at = datetime.utcnow()
+        row.last_duration_ms = duration_ms
+        row.total_duration_ms = (row.total_duration_ms or 0) + duration_ms
+        row.max_duration_ms = max(row.max_duration_ms or 0, duration_ms)
+        row.run_count = (row.run_count or 0) + 1
+        row.last_status = 'ok' if error is None else 'error'
+        row.last_error = error
+        if error is not None:
+            row.failure_count = (row.failure_count or 0) + 1
+        session.commit()
+        return {'job': name, 'status': row.last_status, 'duration_ms': round(duration_ms, 1),
+                'result': result, 'error': error}
+
+    def _acquire_lease(self):
+        """Take or renew the scheduler lease; True while this worker is the leader"""
+        model = self.lease_model
+        session = self.db.session
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.lease_seconds)
+        acquired = model.query.filter(
+            model.name == self.LEASE_NAME,
+            self.db.or_(model.holder == self.worker_id, model.expires_at < now)
+        ).update({'holder': self.worker_id, 'expires_at': expires}, synchronize_session=False)
+        session.commit()
+        if acquired:
+            return True
+        if session.get(model, self.LEASE_NAME) is None:
+            session.add(model(name=self.LEASE_NAME, holder=self.worker_id, expires_at=expires))
+            try:
+                session.commit()
+                return True
+            except IntegrityError:
+                session.rollback()
+        return False
+
+    def _release_lease(self):
+        model = self.lease_model
+        model.query.filter_by(name=self.LEASE_NAME, holder=self.worker_id).update(
+            {'expires_at': datetime.utcnow()}, synchronize_session=False)
+        self.db.session.commit()
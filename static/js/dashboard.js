@@ -0,0 +1,341 @@
+const API_BASE = "http://localhost:5000/api";
+
+// Tab Navigation
+document.querySelectorAll(".nav-link").forEach((link) => {
+  link.addEventListener("click", (e) => {
+    e.preventDefault();
+    const tabName = link.dataset.tab;
+    if (tabName) {
+      switchTab(tabName);
+      document
+        .querySelectorAll(".nav-link")
+        .forEach((l) => l.classList.remove("active"));
+      link.classList.add("active");
+    }
+  });
+});
+
+function switchTab(tabName) {
+  document
+    .querySelectorAll(".tab-content")
+    .forEach((tab) => tab.classList.remove("active"));
+  document.getElementById(tabName)?.classList.add("active");
+}
+
+// Modal Management
+function openModal(modalId) {
+  document.getElementById(modalId)?.classList.add("active");
+}
+
+function closeModal(modalId) {
+  document.getElementById(modalId)?.classList.remove("active");
+}
+
+window.onclick = (e) => {
+  if (e.target.classList.contains("modal")) {
+    e.target.classList.remove("active");
+  }
+};
+
+// Load User Profile
+async function loadUserProfile() {
+  try {
+    const response = await fetch(`${API_BASE}/auth/profile`);
+    const user = await response.json();
+    document.getElementById("userName").textContent =
+      user.full_name || user.username;
+    document.getElementById("userEmail").textContent = user.email;
+    document.getElementById("userAvatar").textContent = (
+      user.full_name || user.username
+    )
+      .charAt(0)
+      .toUpperCase();
+  } catch (error) {
+    console.error("Error loading profile:", error);
+  }
+}
+
+// Load Vehicles
+async function loadVehicles() {
+  try {
+    const response = await fetch(`${API_BASE}/vehicles`);
+    const vehicles = await response.json();
+    const vehiclesList = document.getElementById("vehiclesList");
+    vehiclesList.innerHTML = vehicles
+      .map(
+        (v) => `
+              <div class="vehicle-item">
+                  <div class="vehicle-info">
+                      <h3>${v.vehicle_name}</h3>
+                      <p>${v.make} ${v.model} (${v.year}) - ${v.vehicle_type}</p>
+                      <p class="vehicle-range" id="vehicleRange-${v.id}"></p>
+                  </div>
+                  <div class="vehicle-actions">
+                      <button class="btn btn-sm btn-secondary" onclick="editVehicle(${v.id})">Edit</button>
+                      <button class="btn btn-sm btn-danger" onclick="deleteVehicle(${v.id})">Delete</button>
+                  </div>
+              </div>
+          `
+      )
+      .join("");
+
+    // Update vehicle select in energy modal
+    const select = document.getElementById("energyVehicle");
+    select.innerHTML = vehicles
+      .map((v) => `<option value="${v.id}">${v.vehicle_name}</option>`)
+      .join("");
+
+    document.getElementById("vehicleCount").textContent = vehicles.length;
+    Object.values(vehicleStates).forEach(showVehicleState);
+  } catch (error) {
+    console.error("Error loading vehicles:", error);
+  }
+}
+
+// Add Vehicle
+async function addVehicle(e) {
+  e.preventDefault();
+  const form = e.target;
+  const formData = new FormData(form);
+
+  const vehicleData = {
+    vehicle_name:
+      formData.get("vehicle_name") ||
+      form.querySelector('input[placeholder="My Car"]').value,
+    vehicle_type: form.querySelector("select").value,
+    make: form.querySelector('input[placeholder="Toyota"]').value,
+    model: form.querySelector('input[placeholder="Fortuner"]').value,
+    year: parseInt(form.querySelector('input[placeholder="2023"]').value),
+    fuel_capacity: parseFloat(
+      form.querySelector('input[placeholder="60"]').value
+    ),
+  };
+
+  try {
+    const response = await fetch(`${API_BASE}/vehicles`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(vehicleData),
+    });
+
+    if (response.ok) {
+      closeModal("vehicleModal");
+      form.reset();
+      loadVehicles();
+    }
+  } catch (error) {
+    console.error("Error adding vehicle:", error);
+    alert("Error adding vehicle. Please try again.");
+  }
+}
+
+// Add Energy Log
+async function addEnergyLog(e) {
+  e.preventDefault();
+  const form = e.target;
+  const energyData = {
+    vehicle_id: parseInt(form.querySelector("#energyVehicle").value),
+    energy_consumed: parseFloat(
+      form.querySelectorAll('input[type="number"]')[0].value
+    ),
+    distance_traveled: parseFloat(
+      form.querySelectorAll('input[type="number"]')[1].value
+    ),
+    cost: parseFloat(
+      form.querySelectorAll('input[type="number"]')[2].value
+    ),
+    co2_emissions:
+      parseFloat(
+        form.querySelectorAll('input[type="number"]')[3].value
+      ) || 0,
+  };
+
+  try {
+    const response = await fetch(`${API_BASE}/energy-logs`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(energyData),
+    });
+
+    if (response.ok) {
+      closeModal("energyModal");
+      form.reset();
+      loadEnergyLogs();
+      loadDashboardStats();
+    }
+  } catch (error) {
+    console.error("Error adding energy log:", error);
+    alert("Error logging energy. Please try again.");
+  }
+}
+
+// Fetch every page of a paged list endpoint by following X-Next-Cursor
+async function fetchAllPages(url) {
+  const rows = [];
+  let cursor = null;
+  do {
+    const separator = url.includes("?") ? "&" : "?";
+    const response = await fetch(
+      cursor ? `${url}${separator}after=${encodeURIComponent(cursor)}` : url
+    );
+    rows.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return rows;
+}
+
+// Load Energy Logs
+async function loadEnergyLogs() {
+  try {
+    const logs = await fetchAllPages(`${API_BASE}/energy-logs?days=30&limit=1000`);
+    const logsList = document.getElementById("energyLogsList");
+    logsList.innerHTML = logs
+      .map(
+        (log) => `
+              <div style="padding: 1rem; border-bottom: 1px solid var(--glass-border);">
+                  <h4>${log.distance_traveled} km</h4>
+                  <p>Energy: ${log.energy_consumed} | Cost: $${
+          log.cost
+        } | Efficiency: ${log.efficiency.toFixed(2)} km/l</p>
+                  <p style="color: var(--text-muted); font-size: 0.9rem;">${new Date(
+                    log.date
+                  ).toLocaleDateString()}</p>
+              </div>
+          `
+      )
+      .join("");
+  } catch (error) {
+    console.error("Error loading energy logs:", error);
+  }
+}
+
+// Load Dashboard Stats
+async function loadDashboardStats() {
+  try {
+    const response = await fetch(`${API_BASE}/energy-summary?days=30`);
+    const summary = await response.json();
+    document.getElementById("avgEfficiency").textContent =
+      summary.average_efficiency.toFixed(2) + " km/l";
+    document.getElementById("co2Saved").textContent =
+      summary.total_co2.toFixed(2) + " kg";
+    document.getElementById("moneySaved").textContent =
+      "$" + summary.total_cost.toFixed(2);
+  } catch (error) {
+    console.error("Error loading stats:", error);
+  }
+}
+
+// Add Emergency Contact
+async function addEmergencyContact(e) {
+  e.preventDefault();
+  const form = e.target;
+  const contactData = {
+    contact_name: form.querySelector('input[placeholder="Mom"]').value,
+    phone: form.querySelector('input[placeholder="+1234567890"]').value,
+    relationship: form.querySelector('input[placeholder="Mother"]').value,
+    is_primary: form.querySelector('input[type="checkbox"]').checked,
+  };
+
+  try {
+    const response = await fetch(`${API_BASE}/emergency-contacts`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(contactData),
+    });
+
+    if (response.ok) {
+      closeModal("contactModal");
+      form.reset();
+      loadEmergencyContacts();
+    }
+  } catch (error) {
+    console.error("Error adding contact:", error);
+    alert("Error adding contact. Please try again.");
+  }
+}
+
+// Load Emergency Contacts
+async function loadEmergencyContacts() {
+  try {
+    const response = await fetch(`${API_BASE}/emergency-contacts`);
+    const contacts = await response.json();
+    const contactsList = document.getElementById("contactsList");
+    contactsList.innerHTML = contacts
+      .map(
+        (c) => `
+              <div class="vehicle-item">
+                  <div class="vehicle-info">
+                      <h3>${c.contact_name}</h3>
+                      <p>${c.phone} - ${c.relationship} ${
+          c.is_primary ? "(Primary)" : ""
+        }</p>
+                  </div>
+                  <div class="vehicle-actions">
+                      <button class="btn btn-sm btn-danger" onclick="deleteContact(${
+                        c.id
+                      })">Delete</button>
+                  </div>
+              </div>
+          `
+      )
+      .join("");
+  } catch (error) {
+    console.error("Error loading contacts:", error);
+  }
+}
+
+// Live vehicle levels and range pushed by the server as telemetry arrives
+const vehicleStates = {};
+
+function showVehicleState(state) {
+  vehicleStates[state.vehicle_id] = state;
+  const el = document.getElementById(`vehicleRange-${state.vehicle_id}`);
+  if (el) el.textContent = `Range: ${state.range_km} km (${state.details})`;
+}
+
+function subscribeTelemetry() {
+  if (!window.EventSource) return;
+  const source = new EventSource(`${API_BASE}/telemetry/stream`);
+  let refresh = null;
+  source.addEventListener("snapshot", (e) =>
+    JSON.parse(e.data).forEach(showVehicleState)
+  );
+  source.addEventListener("vehicle", (e) =>
+    showVehicleState(JSON.parse(e.data))
+  );
+  source.addEventListener("energy", () => {
+    // Trips arrive in bursts; reload the lists once the burst settles
+    clearTimeout(refresh);
+    refresh = setTimeout(() => {
+      loadEnergyLogs();
+      loadDashboardStats();
+    }, 1000);
+  });
+}
+
+// Logout
+document.getElementById("logoutBtn")?.addEventListener("click", (e) => {
+  e.preventDefault();
+  fetch(`${API_BASE}/auth/logout`, { method: "POST" }).then(() => {
+    window.location.href = "/";
+  });
+});
+
+// Button Event Listeners
+document
+  .getElementById("addVehicleBtn")
+  ?.addEventListener("click", () => openModal("vehicleModal"));
+document
+  .getElementById("addContactBtn")
+  ?.addEventListener("click", () => openModal("contactModal"));
+document
+  .getElementById("addEnergyLogBtn")
+  ?.addEventListener("click", () => openModal("energyModal"));
+
+// Initialize Dashboard
+loadUserProfile();
+loadVehicles();
+loadEnergyLogs();
+loadDashboardStats();
+loadEmergencyContacts();
+subscribeTelemetry();
@@ -0,0 +1,245 @@
+const API_BASE = "http://localhost:5000/api";
+
+// Mobile Menu Toggle
+const mobileMenuToggle = document.getElementById("mobileMenuToggle");
+const navLinks = document.getElementById("navLinks");
+
+if (mobileMenuToggle) {
+  mobileMenuToggle.addEventListener("click", () => {
+    navLinks.classList.toggle("active");
+    const icon = mobileMenuToggle.querySelector("i");
+    if (navLinks.classList.contains("active")) {
+      icon.classList.remove("fa-bars");
+      icon.classList.add("fa-times");
+    } else {
+      icon.classList.remove("fa-times");
+      icon.classList.add("fa-bars");
+    }
+  });
+}
+
+// Close mobile menu when clicking a link
+const navLinkItems = document.querySelectorAll(".nav-links a");
+navLinkItems.forEach((link) => {
+  link.addEventListener("click", () => {
+    navLinks.classList.remove("active");
+    const icon = mobileMenuToggle.querySelector("i");
+    icon.classList.remove("fa-times");
+    icon.classList.add("fa-bars");
+  });
+});
+
+// Header scroll effect
+const header = document.getElementById("header");
+let lastScroll = 0;
+
+window.addEventListener("scroll", () => {
+  const currentScroll = window.pageYOffset;
+
+  if (currentScroll > 100) {
+    header.classList.add("scrolled");
+  } else {
+    header.classList.remove("scrolled");
+  }
+
+  lastScroll = currentScroll;
+});
+
+// Smooth scroll for anchor links
+document.querySelectorAll('a[href^="#"]').forEach((anchor) => {
+  anchor.addEventListener("click", function (e) {
+    const href = this.getAttribute("href");
+    if (href !== "#" && href !== "#home") {
+      e.preventDefault();
+      const target = document.querySelector(href);
+      if (target) {
+        const headerHeight = header.offsetHeight;
+        const targetPosition = target.offsetTop - headerHeight;
+
+        window.scrollTo({
+          top: targetPosition,
+          behavior: "smooth",
+        });
+      }
+    }
+  });
+});
+
+// Scroll animation observer
+const observerOptions = {
+  threshold: 0.1,
+  rootMargin: "0px 0px -50px 0px",
+};
+
+const observer = new IntersectionObserver((entries) => {
+  entries.forEach((entry) => {
+    if (entry.isIntersecting) {
+      entry.target.classList.add("visible");
+    }
+  });
+}, observerOptions);
+
+// Observe all fade-in elements
+document.querySelectorAll(".fade-in").forEach((el) => {
+  observer.observe(el);
+});
+
+// Add stagger animation to feature cards
+const featureCards = document.querySelectorAll(".feature-card");
+featureCards.forEach((card, index) => {
+  card.style.transitionDelay = `${index * 0.1}s`;
+});
+
+// Hero button click animation
+const heroButtons = document.querySelectorAll(".hero-buttons a");
+heroButtons.forEach((button) => {
+  button.addEventListener("click", function (e) {
+    // Only add animation if it's not the "Get Started" link
+    if (!this.getAttribute("href").includes("index.html")) {
+      // Create ripple effect
+      const ripple = document.createElement("span");
+      ripple.style.position = "absolute";
+      ripple.style.borderRadius = "50%";
+      ripple.style.background = "rgba(255, 255, 255, 0.6)";
+      ripple.style.transform = "scale(0)";
+      ripple.style.animation = "ripple 0.6s linear";
+      ripple.style.left = "50%";
+      ripple.style.top = "50%";
+      ripple.style.width = "100px";
+      ripple.style.height = "100px";
+      ripple.style.marginLeft = "-50px";
+      ripple.style.marginTop = "-50px";
+
+      this.style.position = "relative";
+      this.style.overflow = "hidden";
+      this.appendChild(ripple);
+
+      setTimeout(() => ripple.remove(), 600);
+    }
+  });
+});
+
+// Add ripple animation keyframes
+const style = document.createElement("style");
+style.textContent = `
+      @keyframes ripple {
+          to {
+              transform: scale(4);
+              opacity: 0;
+          }
+      }
+  `;
+document.head.appendChild(style);
+
+// Authentication Modal Functions
+function openAuthModal() {
+  document.getElementById("authOverlay").classList.add("active");
+}
+
+function closeAuthModal() {
+  document.getElementById("authOverlay").classList.remove("active");
+}
+
+function toggleAuthForm() {
+  document.getElementById("loginForm").style.display =
+    document.getElementById("loginForm").style.display === "none"
+      ? "block"
+      : "none";
+  document.getElementById("registerForm").style.display =
+    document.getElementById("registerForm").style.display === "none"
+      ? "block"
+      : "none";
+}
+
+async function handleLogin(e) {
+  e.preventDefault();
+  const username = document.getElementById("loginUsername").value;
+  const password = document.getElementById("loginPassword").value;
+  const errorDiv = document.getElementById("loginError");
+
+  try {
+    const response = await fetch(`${API_BASE}/auth/login`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ username, password }),
+    });
+
+    if (response.ok) {
+      window.location.href = "/dashboard";
+    } else {
+      const error = await response.json();
+      errorDiv.textContent = error.error || "Login failed";
+      errorDiv.classList.add("show");
+    }
+  } catch (error) {
+    errorDiv.textContent = "An error occurred. Please try again.";
+    errorDiv.classList.add("show");
+  }
+}
+
+async function handleRegister(e) {
+  e.preventDefault();
+  const full_name = document.getElementById("registerName").value;
+  const email = document.getElementById("registerEmail").value;
+  const username = document.getElementById("registerUsername").value;
+  const password = document.getElementById("registerPassword").value;
+  const phone = document.getElementById("registerPhone").value;
+  const errorDiv = document.getElementById("registerError");
+
+  try {
+    const response = await fetch(`${API_BASE}/auth/register`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        full_name,
+        email,
+        username,
+        password,
+        phone,
+      }),
+    });
+
+    if (response.ok) {
+      window.location.href = "/dashboard";
+    } else {
+      const error = await response.json();
+      errorDiv.textContent = error.error || "Registration failed";
+      errorDiv.classList.add("show");
+    }
+  } catch (error) {
+    errorDiv.textContent = "An error occurred. Please try again.";
+    errorDiv.classList.add("show");
+  }
+}
+
+// Get Started Buttons
+// navigate to main app page
+document
+  .getElementById("getStartedBtn")
+  ?.addEventListener("click", () => {
+    // open the app and jump directly to Vehicle Setup
+    window.location.href = "/app#vehicle";
+  });
+document
+  .getElementById("heroGetStarted")
+  ?.addEventListener("click", () => {
+    // open the app and jump directly to Vehicle Setup
+    window.location.href = "/app#vehicle";
+  });
+
+// Close modal on overlay click
+document.getElementById("authOverlay")?.addEventListener("click", (e) => {
+  if (e.target.id === "authOverlay") {
+    closeAuthModal();
+  }
+});
+
+// Console message for developers
+console.log(
+  "%c⚡ Smart Energy Vehicle Platform",
+  "font-size: 20px; font-weight: bold; color: #6366f1;"
+);
+console.log(
+  "%cWelcome to our premium landing page!",
+  "font-size: 14px; color: #94a3b8;"
+);
@@ -35,9 +35,14 @@ let stationMap = null,
   stationLayer = null,
   lastLocation = null;
 
-const OVERPASS_URL = "https://overpass-api.de/api/interpreter";
 const DEFAULT_CENTER = { lat: 12.9716, lng: 77.5946 };
 const DEFAULT_RADIUS = 5000;
+const STATION_TYPE_LABELS = {
+  EV_Charging: "EV Charging",
+  Petrol: "Petrol",
+  CNC: "CNC",
+  Hybrid: "Hybrid",
+};
 
 function safeAddEvent(el, event, handler) {
   if (el) el.addEventListener(event, handler);
@@ -523,39 +528,17 @@ function initStationMap() {
   stationLayer = L.layerGroup().addTo(stationMap);
 }
 
-function buildOverpassQuery(lat, lng, radius, vehicleType) {
-  const filters = [];
-  if (vehicleType === "ev") filters.push("[amenity=charging_station]");
-  else if (vehicleType === "petrol") filters.push("[amenity=fuel]");
-  else if (vehicleType === "hybrid") {
-    filters.push("[amenity=charging_station]");
-    filters.push("[amenity=fuel]");
-  } else if (vehicleType === "cnc") filters.push("[amenity=fuel]");
-  else {
-    filters.push("[amenity=charging_station]");
-    filters.push("[amenity=fuel]");
-  }
-
-  const parts = [];
-  filters.forEach((f) => {
-    parts.push(`node(around:${radius},${lat},${lng})${f};`);
-    parts.push(`way(around:${radius},${lat},${lng})${f};`);
-    parts.push(`relation(around:${radius},${lat},${lng})${f};`);
-  });
-
-  return `[out:json][timeout:25];(${parts.join("\n")});out center;`;
-}
-
-async function queryOverpass(lat, lng, radius, vehicleType) {
-  const q = buildOverpassQuery(lat, lng, radius, vehicleType);
-  const res = await fetch(OVERPASS_URL, {
-    method: "POST",
-    body: q,
-    headers: { "Content-Type": "application/x-www-form-urlencoded" },
+async function fetchNearbyStations(lat, lng, radius, vehicleType) {
+  // The server proxies OpenStreetMap (Overpass) and caches results per map tile
+  const params = new URLSearchParams({
+    latitude: lat,
+    longitude: lng,
+    radius_km: radius / 1000,
   });
-  if (!res.ok) throw new Error("Overpass request failed");
-  const data = await res.json();
-  return data.elements || [];
+  if (vehicleType) params.set("vehicle_type", vehicleType);
+  const res = await fetch(`/api/stations/osm?${params}`);
+  if (!res.ok) throw new Error("Station lookup failed");
+  return res.json();
 }
 
 function haversineDistance(lat1, lon1, lat2, lon2) {
@@ -577,21 +560,22 @@ function clearStationResults() {
   if (stationLayer) stationLayer.clearLayers();
 }
 
-function renderStations(elements, userLat, userLng) {
+function renderStations(stations, userLat, userLng) {
   const list = $("#stationList");
   if (!list) return;
   if (stationLayer) stationLayer.clearLayers();
 
-  const items = elements
-    .map((el) => {
-      const lat = el.lat ?? el.center?.lat;
-      const lon = el.lon ?? el.center?.lon;
-      const tags = el.tags || {};
-      const name = tags.name || tags.operator || "Unnamed station";
-      const type = tags.amenity || "station";
-      const price = tags["fuel:price"] || tags["charging:price"] || null;
+  const items = stations
+    .map((st) => {
+      const lat = st.latitude;
+      const lon = st.longitude;
+      const name = st.name || "Unnamed station";
+      const type =
+        STATION_TYPE_LABELS[st.station_type] || st.station_type || "Station";
+      const price = st.price_per_unit ?? null;
       const dist =
-        lat && userLat ? haversineDistance(userLat, userLng, lat, lon) : null;
+        st.distance_km ??
+        (lat && userLat ? haversineDistance(userLat, userLng, lat, lon) : null);
       return { lat, lon, name, type, price, dist };
     })
     .filter((i) => i.lat && i.lon);
@@ -666,8 +650,8 @@ async function getAndShowNearbyStations(useCurrentLocation = true) {
   if (!vehicleType && vtSelect) vehicleType = vtSelect.value || null;
 
   try {
-    const elements = await queryOverpass(lat, lng, DEFAULT_RADIUS, vehicleType);
-    renderStations(elements, lat, lng);
+    const stations = await fetchNearbyStations(lat, lng, DEFAULT_RADIUS, vehicleType);
+    renderStations(stations, lat, lng);
   } catch (err) {
     console.error("Failed to load stations:", err);
     const list = $("#stationList");
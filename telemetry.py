@@ -0,0 +1,205 @@
+"""Buffered telemetry ingestion and in-process fan-out of live vehicle updates"""
+import queue
+import threading
+import time
+
+
+class TelemetryBuffer:
+    """Collect telemetry and hand it to flush_fn in batches bounded by size and age.
+
+    Level readings (fuel, battery, odometer) are coalesced per vehicle, so a
+    batch writes only the newest value of each; trip samples carrying energy
+    and distance are all kept. A background thread flushes once max_batch
+    frames are pending or the oldest has waited max_delay seconds. If
+    flush_fn raises, the batch is put back and retried on the next cycle;
+    after max_retries failures in a row everything pending is handed to
+    on_drop(levels, trips, error) instead and counted as dropped.
+    add_* return False instead of buffering past max_pending frames.
+
+    Buffered frames live only in memory: a process killed before a flush
+    loses up to max_delay seconds of them, or (max_retries + 1) * max_delay
+    while flushes are failing. stop() writes what is left.
+    """
+
+    def __init__(self, flush_fn, max_batch=500, max_delay=1.0, max_pending=50000, max_retries=5,
+                 on_error=None, on_drop=None):
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.on_error = on_error
+        self.on_drop = on_drop
+        self._retries = 0
+        self._levels = {}  # vehicle_id -> (user_id, {field: value})
+        self._trips = []
+        self._frames = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'frames': 0, 'flushes': 0, 'trips_written': 0, 'levels_written': 0,
+                      'rejected': 0, 'failures': 0, 'dropped': 0, 'last_flush_ms': None}
+
+    @property
+    def pending(self):
+        return self._frames
+
+    def _accept(self):
+        if self._frames >= self.max_pending:
+            self.stats['rejected'] += 1
+            return False
+        self._frames += 1
+        self.stats['frames'] += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if self._frames >= self.max_batch:
+            self._wake.set()
+        return True
+
+    def add_level(self, user_id, vehicle_id, values):
+        """Buffer level readings for a vehicle, overriding older unflushed ones"""
+        with self._lock:
+            if not self._accept():
+                return False
+            _, current = self._levels.get(vehicle_id, (user_id, {}))
+            self._levels[vehicle_id] = (user_id, {**current, **values})
+            return True
+
+    def add_trip(self, row):
+        """Buffer one trip sample (an energy log row)"""
+        with self._lock:
+            if not self._accept():
+                return False
+            self._trips.append(row)
+            return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='telemetry-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the flusher thread and write whatever is still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.max_delay / 4)
+            self._wake.clear()
+            oldest = self._oldest
+            if oldest is not None and (self._frames >= self.max_batch
+                                       or time.monotonic() - oldest >= self.max_delay):
+                self.flush()
+
+    def flush(self):
+        """Write the buffered batch now; returns the number of frames flushed"""
+        with self._flush_lock:
+            with self._lock:
+                levels, trips, frames = self._levels, self._trips, self._frames
+                self._levels, self._trips, self._frames, self._oldest = {}, [], 0, None
+            if not frames:
+                return 0
+            started = time.perf_counter()
+            try:
+                self.flush_fn(levels, trips)
+            except Exception as e:
+                self.stats['failures'] += 1
+                if self.on_error is not None:
+                    self.on_error(e)
+                self._retries += 1
+                if self._retries <= self.max_retries:
+                    self._requeue(levels, trips, frames)
+                    return 0
+                self._retries = 0
+                self.stats['dropped'] += frames
+                if self.on_drop is not None:
+                    self.on_drop(levels, trips, e)
+                return 0
+            self._retries = 0
+            self.stats['flushes'] += 1
+            self.stats['trips_written'] += len(trips)
+            self.stats['levels_written'] += len(levels)
+            self.stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return frames
+
+    def _requeue(self, levels, trips, frames):
+        with self._lock:
+            for vehicle_id, (user_id, values) in levels.items():
+                # Readings that arrived during the failed flush are newer
+                _, newer = self._levels.get(vehicle_id, (user_id, {}))
+                self._levels[vehicle_id] = (user_id, {**values, **newer})
+            self._trips[:0] = trips
+            self._frames += frames
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+
+class Subscription:
+    """Queue of events for one subscriber"""
+
+    def __init__(self, topic, size):
+        self.topic = topic
+        self.events = queue.Queue(size)
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broker:
+    """Publish events to every subscriber of a topic within this process.
+
+    A subscriber that falls behind loses its oldest events rather than
+    blocking the publisher.
+    """
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        subscription = Subscription(topic, self.queue_size)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def publish(self, topic, event):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            while True:
+                try:
+                    subscription.events.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscription.events.get_nowait()
+                    except queue.Empty:
+                        pass
+        return len(subscribers)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._topics.values())
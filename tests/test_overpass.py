@@ -0,0 +1,114 @@
+"""Overpass element mapping and the per-tile station cache, against benchmarks/overpass_fixture.py"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import app as smart
+from overpass import element_to_station
+from overpass_fixture import start_fixture_server
+
+BANGALORE = (12.9716, 77.5946)
+
+
+def test_charging_node():
+    row = element_to_station({'type': 'node', 'id': 7, 'lat': 12.9, 'lon': 77.5, 'tags': {
+        'amenity': 'charging_station', 'name': 'Hub', 'charging:price': '12', 'phone': '+91 80 1234 5678'}})
+    assert row['osm_id'] == 'node/7'
+    assert (row['latitude'], row['longitude']) == (12.9, 77.5)
+    assert row['station_type'] == 'EV_Charging'
+    assert row['price_per_unit'] == 12.0
+    assert row['phone'] == '+91 80 1234 5678'
+    assert row['open_24_7'] is False
+
+
+def test_fuel_way_uses_center_and_address():
+    row = element_to_station({'type': 'way', 'id': 3, 'center': {'lat': 19.0, 'lon': 72.8}, 'tags': {
+        'amenity': 'fuel', 'operator': 'HP', 'opening_hours': '24/7', 'fuel:price': 'n/a',
+        'addr:street': 'MG Road', 'addr:city': 'Mumbai'}})
+    assert row['osm_id'] == 'way/3'
+    assert (row['latitude'], row['longitude']) == (19.0, 72.8)
+    assert row['station_type'] == 'Petrol'
+    assert row['name'] == 'HP'
+    assert row['address'] == 'MG Road, Mumbai'
+    assert row['open_24_7'] is True
+    assert row['price_per_unit'] is None
+
+
+def test_cng_only_station_is_cnc():
+    tags = {'amenity': 'fuel', 'fuel:cng': 'yes'}
+    assert element_to_station({'type': 'node', 'id': 1, 'lat': 1, 'lon': 2, 'tags': tags})['station_type'] == 'CNC'
+    tags['fuel:octane_95'] = 'yes'
+    assert element_to_station({'type': 'node', 'id': 1, 'lat': 1, 'lon': 2, 'tags': tags})['station_type'] == 'Petrol'
+
+
+def test_element_without_position_is_skipped():
+    assert element_to_station({'type': 'relation', 'id': 1, 'tags': {'amenity': 'fuel'}}) is None
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    fixture = start_fixture_server()
+    database = tmp_path_factory.mktemp('overpass') / 'test.db'
+    app = smart.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'OVERPASS_URL': fixture.url,
+                            'PASSWORD_HASH_WORKERS': 0})
+    smart.init_db(app)
+    yield app, fixture
+    fixture.shutdown()
+    with app.app_context():
+        smart.db.engine.dispose()
+
+
+def lookup(client, **params):
+    query = '&'.join(f'{k}={v}' for k, v in {'latitude': BANGALORE[0], 'longitude': BANGALORE[1], **params}.items())
+    return client.get(f'/api/stations/osm?{query}')
+
+
+def test_tile_cache(client):
+    app, fixture = client
+    client = app.test_client()
+    before = fixture.queries
+    cold = lookup(client, radius_km=2)
+    assert cold.status_code == 200 and cold.json
+    fetched = fixture.queries - before
+    assert fetched > 0
+    assert [s['distance_km'] for s in cold.json] == sorted(s['distance_km'] for s in cold.json)
+    assert all(s['distance_km'] <= 2 for s in cold.json)
+
+    # Fresh tiles are served from the database without asking upstream
+    warm = lookup(client, radius_km=2)
+    assert fixture.queries - before == fetched
+    assert warm.json == cold.json
+
+    # Expired tiles are fetched again; if that fails the stale copy is served
+    with app.app_context():
+        smart.OsmTile.query.update({'fetched_at': datetime.utcnow() - timedelta(days=30)})
+        smart.db.session.commit()
+    url, smart.overpass_client.url = smart.overpass_client.url, 'http://127.0.0.1:9/api/interpreter'
+    try:
+        stale = lookup(client, radius_km=2)
+    finally:
+        smart.overpass_client.url = url
+    assert stale.status_code == 200
+    assert stale.json == cold.json
+    lookup(client, radius_km=2)
+    assert fixture.queries - before == 2 * fetched
+
+
+def test_vehicle_type_filter_and_radius_clamp(client):
+    app, _ = client
+    client = app.test_client()
+    ev = lookup(client, radius_km=2, vehicle_type='ev').json
+    assert ev and {s['station_type'] for s in ev} == {'EV_Charging'}
+    hybrid = lookup(client, radius_km=2, vehicle_type='hybrid').json
+    assert {s['station_type'] for s in hybrid} == {'EV_Charging', 'Petrol'}
+
+    tiny = lookup(client, radius_km=-5)
+    assert tiny.status_code == 200
+    assert all(s['distance_km'] <= smart.MIN_OSM_RADIUS_KM for s in tiny.json)
+    assert lookup(client, radius_km='nan').status_code == 400